@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Headless batch scraper for the IFDB scraper
+
+Walks a media directory, derives a title and year from each video filename
+(resources/lib/canonical.py), picks the best search result as the interactive
+search does (resources/lib/ranking.py), scrapes fanedit.org through the same search and detail logic as ifdb.py using
+a bounded worker pool, and writes a Kodi-compatible .nfo next to every video.
+Kodi is not needed; no xbmc* module is imported.
+
+Usage:
+    python batch_scrape.py /path/to/fanedits --api-key KEY --search-engine-id CX
+
+The API credentials can also be given in the IFDB_API_KEY and
+IFDB_SEARCH_ENGINE_ID environment variables.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resources.lib import scraper
+from resources.lib.cache import DetailsCache, SearchCache
+from resources.lib.canonical import VIDEO_EXTENSIONS, canonical_query, canonicalize
+from resources.lib.nfo import build_movie_nfo
+from resources.lib.quota import QuotaExceeded, QuotaGovernor
+from resources.lib.ranking import rank_hits
+from resources.lib.records import listing_id, parse_listing
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'metadata.fanedit.ifdb')
+USER_AGENT = scraper.user_agent('batch')
+
+# Longest a worker waits for the shared API rate limit or a backoff (seconds)
+QUOTA_MAX_WAIT = 120
+
+
+def find_videos(media_dir):
+    """
+    Walk a media directory and return (video_path, nfo_path) pairs
+    
+    A folder holding a single video gets movie.nfo; folders holding several
+    videos get one <video name>.nfo per video.
+    """
+    videos = []
+    for directory, dirnames, filenames in os.walk(media_dir):
+        dirnames.sort()
+        names = sorted(
+            name for name in filenames if os.path.splitext(name)[1][1:].lower() in VIDEO_EXTENSIONS
+        )
+        for name in names:
+            if len(names) == 1:
+                nfo_name = 'movie.nfo'
+            else:
+                nfo_name = os.path.splitext(name)[0] + '.nfo'
+            videos.append((os.path.join(directory, name), os.path.join(directory, nfo_name)))
+    return videos
+
+
+class BatchScraper:
+    """Scrapes videos concurrently; caches are opened once per worker thread"""
+    
+    def __init__(self, api_key, search_engine_id, cache_dir=None, overwrite=False, governor=None):
+        self.api_key = api_key
+        self.search_engine_id = search_engine_id
+        self.cache_dir = cache_dir
+        self.overwrite = overwrite
+        self.governor = governor
+        self._local = threading.local()
+    
+    def _caches(self):
+        """Return this thread's (SearchCache, DetailsCache), or (None, None) if caching is off"""
+        if self.cache_dir is None:
+            return None, None
+        if not hasattr(self._local, 'caches'):
+            self._local.caches = (
+                SearchCache(os.path.join(self.cache_dir, 'search_cache.db')),
+                DetailsCache(os.path.join(self.cache_dir, 'details_cache.db'))
+            )
+        return self._local.caches
+    
+    def search(self, query):
+        """Search fanedit.org listings, using the search cache (and its cached misses) if enabled"""
+        search_cache, _ = self._caches()
+        if search_cache is not None:
+            results = search_cache.get(query, self.search_engine_id)
+            if results is not None:
+                return results
+            if search_cache.is_miss(query, self.search_engine_id):
+                return []
+        results = scraper.search(self.api_key, self.search_engine_id, query, fetch_page=self._fetch_page)
+        if search_cache is not None:
+            if results:
+                search_cache.put(query, self.search_engine_id, results)
+            else:
+                search_cache.put_miss(query, self.search_engine_id)
+        return results
+    
+    def _fetch_page(self, api_url):
+        """Fetch one page of search results, through the quota governor if there is one"""
+        if self.governor is None:
+            return scraper.fetch_search_page(api_url)
+        return self.governor.call(scraper.fetch_search_page, api_url, max_wait=QUOTA_MAX_WAIT)
+    
+    def details(self, url):
+        """Fetch and parse a listing into a FaneditRecord, using and revalidating the details cache if enabled"""
+        _, details_cache = self._caches()
+        entry = details_cache.get(url) if details_cache is not None else None
+        if entry is not None and entry['fresh']:
+            return entry['record']
+        html, etag, last_modified, _ = scraper.fetch_listing(
+            url,
+            USER_AGENT,
+            etag=entry['etag'] if entry else None,
+            last_modified=entry['last_modified'] if entry else None
+        )
+        if html is None:
+            details_cache.mark_validated(url)
+            return entry['record']
+        listing = parse_listing(html)
+        if details_cache is not None:
+            details_cache.put(url, listing, etag, last_modified)
+        return listing
+    
+    def scrape(self, video_path, nfo_path):
+        """Scrape a single video and write its .nfo; returns a report record"""
+        start = time.perf_counter()
+        title, year = canonicalize(os.path.basename(video_path))
+        record = {
+            'path': video_path,
+            'nfo': nfo_path,
+            'title': title,
+            'year': year,
+            'status': None,
+            'url': None,
+            'timings': {},
+        }
+        
+        try:
+            if os.path.exists(nfo_path) and not self.overwrite:
+                record['status'] = 'skipped'
+                return record
+            
+            query = canonical_query(title, year)
+            phase = time.perf_counter()
+            results = self.search(query)
+            record['timings']['search'] = time.perf_counter() - phase
+            if not results:
+                record['status'] = 'no_match'
+                return record
+            
+            # The best match, as the interactive search ranks it
+            hits, _ = rank_hits([results], title, year)
+            record['url'] = hits[0].url
+            phase = time.perf_counter()
+            listing = self.details(record['url'])
+            record['timings']['details'] = time.perf_counter() - phase
+            
+            phase = time.perf_counter()
+            with open(nfo_path, 'w', encoding='utf-8') as f:
+                f.write(build_movie_nfo(listing, listing_id(record['url'])))
+            record['timings']['write'] = time.perf_counter() - phase
+            record['status'] = 'scraped'
+        
+        except QuotaExceeded as e:
+            # Left for a later run instead of failing
+            record['status'] = 'quota'
+            record['error'] = str(e)
+        
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = f"{type(e).__name__}: {e}"
+        
+        finally:
+            record['timings']['total'] = time.perf_counter() - start
+        
+        return record
+    
+    def run(self, videos, workers=4, progress=None):
+        """
+        Scrape videos with a bounded worker pool
+        
+        Args:
+            videos: List of (video_path, nfo_path) pairs
+            workers: Number of concurrent workers
+            progress: Optional callable called with each finished record
+        
+        Returns:
+            List of report records, in the order of videos
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.scrape, video, nfo) for video, nfo in videos]
+            records = []
+            for future in futures:
+                record = future.result()
+                if progress is not None:
+                    progress(record)
+                records.append(record)
+        return records
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Scrape fanedit.org metadata into .nfo files for a media directory')
+    parser.add_argument('media_dir', help='directory to scan for videos')
+    parser.add_argument('--api-key', default=os.environ.get('IFDB_API_KEY', ''), help='Google API key')
+    parser.add_argument('--search-engine-id', default=os.environ.get('IFDB_SEARCH_ENGINE_ID', ''),
+                        help='Custom Search Engine ID')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent workers (default: 4)')
+    parser.add_argument('--report', help='JSON report path (default: <media_dir>/ifdb_batch_report.json)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='do not use the search and details caches')
+    parser.add_argument('--overwrite', action='store_true', help='replace existing .nfo files')
+    parser.add_argument('--daily-budget', type=int, default=100,
+                        help='API queries per day, shared with other runs and Kodi (default: 100; 0 for no limit)')
+    parser.add_argument('--rate', type=float, default=1.0, help='API queries per second (default: 1.0)')
+    args = parser.parse_args(argv)
+    
+    if not args.api_key or not args.search_engine_id:
+        parser.error('API credentials are required (--api-key/--search-engine-id or IFDB_API_KEY/IFDB_SEARCH_ENGINE_ID)')
+    
+    videos = find_videos(args.media_dir)
+    print(f"Found {len(videos)} video(s) in {args.media_dir}")
+    
+    batch = BatchScraper(
+        args.api_key,
+        args.search_engine_id,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        overwrite=args.overwrite,
+        governor=QuotaGovernor(
+            os.path.join(args.cache_dir, 'quota.db'),
+            daily_budget=args.daily_budget if args.daily_budget > 0 else float('inf'),
+            rate=args.rate
+        )
+    )
+    
+    def progress(record):
+        print(f"  [{record['status']:>8}] {record['title']} ({record['year']}) "
+              f"{record['timings']['total'] * 1000:.0f}ms {record.get('error', '')}".rstrip())
+    
+    start = time.perf_counter()
+    records = batch.run(videos, workers=args.workers, progress=progress)
+    elapsed = time.perf_counter() - start
+    
+    summary = {}
+    for record in records:
+        summary[record['status']] = summary.get(record['status'], 0) + 1
+    
+    report_path = args.report or os.path.join(args.media_dir, 'ifdb_batch_report.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'media_dir': os.path.abspath(args.media_dir),
+            'workers': args.workers,
+            'elapsed': elapsed,
+            'summary': summary,
+            'quota': batch.governor.counters(),
+            'items': records,
+        }, f, indent=2)
+    
+    print(f"Done in {elapsed:.1f}s: " + ', '.join(f"{count} {status}" for status, count in sorted(summary.items())))
+    quota = batch.governor.counters()
+    print(f"API queries today: {quota['used']} used, {quota['remaining']} remaining"
+          + (f" (paused: {quota['block_reason']})" if quota['block_reason'] else ''))
+    print(f"Report written to {report_path}")
+    return 1 if summary.get('error') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Title canonicalisation benchmark
+
+Every distinct search query costs one Google Custom Search API call and one
+search cache entry. This script derives queries from a corpus of video
+filenames twice: as before canonicalisation (title and year from the
+filename, whitespace and case normalized) and with
+resources/lib/canonical.py. It reports the number of distinct queries for each,
+the rules that fired most often and the time per filename.
+
+Usage:
+    python benchmarks/benchmark_canonical.py [--corpus FILE] [--dir MEDIA_DIR] [--show]
+
+The corpus is a text file with one filename per line (default:
+benchmarks/data/filenames.txt). With --dir, the video files found under a
+media directory are used instead.
+"""
+
+import argparse
+import collections
+import os
+import re
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, ROOT)
+
+from resources.lib import canonical
+from resources.lib.cache import normalize_query
+
+DEFAULT_CORPUS = os.path.join(BENCHMARK_DIR, 'data', 'filenames.txt')
+
+# Title and year as batch_scrape.py derived them before canonicalisation
+_RAW_YEAR = re.compile(r'(?<![0-9])(19[0-9]{2}|20[0-9]{2})(?![0-9])')
+_RAW_BRACKETS = re.compile(r'\[[^\]]*\]|\{[^}]*\}')
+_RAW_SEPARATORS = re.compile(r'[._]+')
+
+
+def load_corpus(path):
+    """Read filenames from a corpus file, skipping blank lines and comments"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def scan_directory(media_dir):
+    """Return the video filenames found under a media directory"""
+    return [
+        name
+        for _, _, files in os.walk(media_dir)
+        for name in files
+        if os.path.splitext(name)[1][1:].lower() in canonical.VIDEO_EXTENSIONS
+    ]
+
+
+def raw_query(filename):
+    """The query (cache key) as derived before canonicalisation"""
+    stem = _RAW_SEPARATORS.sub(' ', _RAW_BRACKETS.sub(' ', os.path.splitext(filename)[0]))
+    years = [m for m in _RAW_YEAR.finditer(stem) if m.start() > 0]
+    title, year = (stem[:years[-1].start()], years[-1].group(1)) if years else (stem, '')
+    title = ' '.join(title.strip(' -([').split())
+    return normalize_query(f"{title} {year}" if year else title)
+
+
+def rule_hits(filenames):
+    """Count how many filenames each release-tag and noise-word rule matched"""
+    hits = collections.Counter()
+    for name, pattern in canonical.RELEASE_TAGS:
+        regex = re.compile(r'(?<![0-9a-z])(?:%s)(?![0-9a-z])' % pattern, re.IGNORECASE)
+        hits[f"tag:{name}"] = sum(1 for filename in filenames if regex.search(filename))
+    for name, pattern in canonical.NOISE_WORDS:
+        regex = re.compile(r'\b(?:%s)\b' % pattern)
+        hits[f"noise:{name}"] = sum(
+            1 for filename in filenames
+            if regex.search(' '.join(re.sub(r'[\W_]+', ' ', filename.casefold()).split()))
+        )
+    return hits
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Measure distinct search queries before and after canonicalisation')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='file with one video filename per line')
+    parser.add_argument('--dir', help='use the video files under this media directory instead of a corpus file')
+    parser.add_argument('--show', action='store_true', help='print every canonical query and its filenames')
+    args = parser.parse_args(argv)
+
+    filenames = scan_directory(args.dir) if args.dir else load_corpus(args.corpus)
+    if not filenames:
+        print("No filenames found")
+        return 1
+
+    raw = {raw_query(filename) for filename in filenames}
+
+    start = time.perf_counter()
+    queries = [canonical.canonical_query(filename) for filename in filenames]
+    elapsed = time.perf_counter() - start
+
+    groups = collections.defaultdict(list)
+    for filename, query in zip(filenames, queries):
+        groups[query].append(filename)
+    titles = {canonical.canonicalize(filename)[0] for filename in filenames}
+
+    print(f"Filenames:                      {len(filenames)}")
+    print(f"Distinct queries before:        {len(raw)}")
+    print(f"Distinct queries after:         {len(groups)} "
+          f"({(1 - len(groups) / len(raw)) * 100:.1f}% fewer API calls and cache entries)")
+    print(f"Distinct titles (ignoring year): {len(titles)}")
+    print(f"Canonicalisation time:          {elapsed / len(filenames) * 1e6:.1f} µs per filename")
+    print()
+    print("Rule hits:")
+    for rule, count in rule_hits(filenames).most_common():
+        print(f"  {rule:<20} {count}")
+
+    if args.show:
+        print()
+        for query in sorted(groups):
+            print(query)
+            for filename in groups[query]:
+                print(f"    {filename}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
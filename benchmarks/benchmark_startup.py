@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for ifdb.py
+
+Kodi runs the scraper in a fresh interpreter for every find/getdetails call,
+so every invocation pays for module imports and addon initialisation. This
+script runs ifdb.py in a fresh interpreter per invocation (using the stub
+xbmc modules in benchmarks/stubs) and reports the median time from the start
+of the script to the end of main() for each action.
+
+Usage:
+    python benchmarks/benchmark_startup.py [--runs N] [--baseline OLD_IFDB_PY]
+
+To compare against an earlier revision:
+    git show <rev>:ifdb.py > /tmp/ifdb_before.py
+    python benchmarks/benchmark_startup.py --baseline /tmp/ifdb_before.py
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+STUBS_DIR = os.path.join(BENCHMARK_DIR, 'stubs')
+LISTING = os.path.join(ROOT, 'test_data', 'listings', 'star-wars-despecialized.html')
+
+# Executed in the child interpreter: times the script from first line to end of main()
+RUNNER = '''
+import runpy, sys, time
+start = time.perf_counter()
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+print(time.perf_counter() - start)
+'''
+
+ACTIONS = [
+    ('NfoUrl', '?action=NfoUrl&nfo=no+url+here', {}),
+    ('unknown action', '?action=', {}),
+    ('find (no credentials)', '?action=find&title=Star+Wars&year=1977', {'api_key': ''}),
+    # The listing's poster is on fanedit.org; the artwork cache is off so no run touches the network
+    ('getdetails (local page)', '?action=getdetails&url=file://' + LISTING,
+     {'details_cache_enabled': 'false', 'artwork_cache_enabled': 'false'}),
+    ('getdetails (cache hit)', '?action=getdetails&url=file://' + LISTING, {'artwork_cache_enabled': 'false'}),
+]
+
+
+def time_invocation(script, query, settings, profile):
+    """Run one scraper invocation in a fresh interpreter and return its duration in seconds"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([STUBS_DIR, ROOT])
+    env['IFDB_STUB_SETTINGS'] = json.dumps(settings)
+    env['IFDB_STUB_PROFILE'] = profile
+    env['IFDB_STUB_LOG_LEVEL'] = '99'
+    output = subprocess.run(
+        [sys.executable, '-c', RUNNER, script, '1', query],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def benchmark(script, runs):
+    """Return {action: median seconds} for a scraper script"""
+    results = {}
+    with tempfile.TemporaryDirectory() as profile:
+        for name, query, settings in ACTIONS:
+            timings = [time_invocation(script, query, settings, profile) for _ in range(runs)]
+            results[name] = statistics.median(timings)
+    return results
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=15, help='invocations per action (default: 15)')
+    parser.add_argument('--baseline', help='another ifdb.py to compare against')
+    args = parser.parse_args()
+    
+    current = benchmark(os.path.join(ROOT, 'ifdb.py'), args.runs)
+    baseline = benchmark(os.path.abspath(args.baseline), args.runs) if args.baseline else None
+    
+    print("=" * 70)
+    print(f"IFDB Scraper - Startup Benchmark (median of {args.runs} runs)")
+    print("=" * 70)
+    if baseline:
+        print(f"{'Action':<28}{'Baseline':>12}{'Current':>12}{'Change':>12}")
+    else:
+        print(f"{'Action':<28}{'Current':>12}")
+    print("-" * 70)
+    for name, _, _ in ACTIONS:
+        if baseline:
+            change = (current[name] - baseline[name]) / baseline[name] * 100
+            print(f"{name:<28}{baseline[name] * 1000:>10.1f}ms{current[name] * 1000:>10.1f}ms{change:>+11.0f}%")
+        else:
+            print(f"{name:<28}{current[name] * 1000:>10.1f}ms")
+    print("=" * 70)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
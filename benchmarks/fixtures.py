@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Offline fixtures for the benchmark suite
+
+benchmarks/data holds a corpus of fanedit.org listing pages (listings/) and
+Google Custom Search JSON responses (cse/), plus the searches that use them
+(searches.json). install() replaces urllib.request.urlopen with a function
+that serves these files, so ifdb.py and resources/lib/scraper.py run their
+real network code paths without a network.
+
+A CSE response is stored as cse/<query>.json for the first page and
+cse/<query>.start<N>.json for later pages, with spaces in the query replaced
+by '-'. A listing is stored as listings/<slug>.html for
+https://fanedit.org/<slug>/.
+
+To refresh the corpus from the live services:
+    python benchmarks/fixtures.py record --api-key KEY --search-engine-id CX
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+LISTINGS_DIR = os.path.join(DATA_DIR, 'listings')
+CSE_DIR = os.path.join(DATA_DIR, 'cse')
+SEARCHES_FILE = os.path.join(DATA_DIR, 'searches.json')
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+class FixtureResponse(io.BytesIO):
+    """urlopen() response served from a fixture file"""
+
+    def __init__(self, data, url, headers=None):
+        super().__init__(data)
+        self.url = url
+        self.status = 200
+        self.headers = headers or {}
+
+    def geturl(self):
+        return self.url
+
+
+def load_searches():
+    """Return the recorded searches: dicts with title, year, query and the expected listing slug"""
+    with open(SEARCHES_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def listing_paths():
+    """Return the paths of the recorded listing pages, sorted by name"""
+    return sorted(
+        os.path.join(LISTINGS_DIR, name) for name in os.listdir(LISTINGS_DIR) if name.endswith('.html')
+    )
+
+
+def listing_url(path):
+    """Return the fanedit.org URL a recorded listing page was fetched from"""
+    return f"https://fanedit.org/{os.path.splitext(os.path.basename(path))[0]}/"
+
+
+def cse_fixture(query, start=1):
+    """Return the fixture path of a CSE response page"""
+    name = query.replace(' ', '-')
+    if int(start) > 1:
+        name += f".start{start}"
+    return os.path.join(CSE_DIR, f"{name}.json")
+
+
+def fixture_path(url):
+    """Return (path, content type) of the fixture for a CSE or fanedit.org URL, or (None, None)"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.netloc == 'www.googleapis.com':
+        params = dict(urllib.parse.parse_qsl(parts.query))
+        return cse_fixture(params.get('q', ''), params.get('start', 1)), 'application/json'
+    if parts.netloc in ('fanedit.org', 'www.fanedit.org'):
+        slug = parts.path.strip('/')
+        if slug and '/' not in slug:
+            return os.path.join(LISTINGS_DIR, f"{slug}.html"), 'text/html; charset=utf-8'
+    return None, None
+
+
+def urlopen(request, data=None, timeout=None, **kwargs):
+    """
+    Stand-in for urllib.request.urlopen serving the fixture corpus
+
+    Raises:
+        urllib.error.HTTPError: 404 for URLs without a fixture
+    """
+    url = request.full_url if isinstance(request, urllib.request.Request) else request
+    path, content_type = fixture_path(url)
+    if path is None or not os.path.exists(path):
+        raise urllib.error.HTTPError(url, 404, 'Not Found (no fixture)', {}, io.BytesIO(b''))
+    with open(path, 'rb') as f:
+        body = f.read()
+    return FixtureResponse(body, url, {'Content-Type': content_type, 'Content-Length': str(len(body))})
+
+
+@contextmanager
+def installed():
+    """Serve all urlopen() calls from the fixture corpus while the block runs"""
+    original = urllib.request.urlopen
+    urllib.request.urlopen = urlopen
+    try:
+        yield
+    finally:
+        urllib.request.urlopen = original
+
+
+def record(api_key, search_engine_id, agent):
+    """Fetch the CSE responses and listing pages of searches.json from the live services"""
+    from resources.lib import scraper
+    from resources.lib.records import is_listing_url
+
+    def fetch(url, path):
+        req = urllib.request.Request(url)
+        req.add_header('User-Agent', agent)
+        with urllib.request.urlopen(req, timeout=scraper.TIMEOUT) as response:
+            body = response.read()
+        with open(path, 'wb') as f:
+            f.write(body)
+        print(f"Recorded {path} ({len(body)} bytes)")
+        return body
+
+    for search in load_searches():
+        body = fetch(scraper.build_search_url(api_key, search_engine_id, search['query']), cse_fixture(search['query']))
+        data = json.loads(body.decode('utf-8'))
+        total = int(data.get('searchInformation', {}).get('totalResults', 0))
+        listings = [item['link'] for item in data.get('items', []) if is_listing_url(item['link'])]
+        # The pages scraper.search() would request for a thin first page
+        if len(listings) < scraper.MIN_RESULTS:
+            for page in range(1, scraper.MAX_PAGES):
+                start = 1 + page * scraper.PAGE_SIZE
+                if start <= total:
+                    fetch(scraper.build_search_url(api_key, search_engine_id, search['query'], start),
+                          cse_fixture(search['query'], start))
+        for url in listings[:1]:
+            slug = urllib.parse.urlsplit(url).path.strip('/')
+            fetch(url, os.path.join(LISTINGS_DIR, f"{slug}.html"))
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Benchmark fixture corpus')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    recorder = subparsers.add_parser('record', help='re-record the corpus from Google and fanedit.org')
+    recorder.add_argument('--api-key', default=os.environ.get('IFDB_API_KEY'), help='Google API key')
+    recorder.add_argument('--search-engine-id', default=os.environ.get('IFDB_SEARCH_ENGINE_ID'),
+                          help='Custom Search Engine ID')
+    subparsers.add_parser('list', help='list the searches and listing pages in the corpus')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for search in load_searches():
+            print(f"search  {search['query']!r} -> {search['listing']}")
+        for path in listing_paths():
+            print(f"listing {listing_url(path)} ({os.path.getsize(path)} bytes)")
+        return 0
+
+    if not args.api_key or not args.search_engine_id:
+        parser.error('API credentials are required (--api-key/--search-engine-id or IFDB_* environment variables)')
+    from resources.lib import scraper
+    record(args.api_key, args.search_engine_id, scraper.user_agent('benchmark'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
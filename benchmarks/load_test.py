@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for the scraper against the replay server
+
+Drives search_movie() and get_details() from ifdb.py (with the stub xbmc
+modules in benchmarks/stubs) at a target rate against benchmarks/replay_server.py,
+and reports the achieved scrapes per second and latency percentiles per
+action. Use it to tune concurrency, timeouts and caching under latency, rate
+limiting, server errors, stalls and slow links without spending API quota or
+loading fanedit.org.
+
+Calls are started on a fixed schedule (open loop): a call's latency is
+measured from the time it was due, so queueing behind slow calls counts. A call
+succeeds if it added at least one item for its plugin handle; errors only show
+up as missing items, as they would in Kodi.
+
+By default a replay server with the given faults runs in the background;
+--server uses one that is already running (its faults are its own).
+
+Usage:
+    python benchmarks/load_test.py [--rate 20] [--duration 10] [--concurrency 8]
+        [--actions find,getdetails] [--cache] [--latency 0.2] [--error-429 0.05] ...
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+STUBS_DIR = os.path.join(BENCHMARK_DIR, 'stubs')
+
+sys.path[:0] = [path for path in (BENCHMARK_DIR, STUBS_DIR, ROOT) if path not in sys.path]
+os.environ.setdefault('IFDB_STUB_LOG_LEVEL', '99')
+
+import fixtures
+import replay_server
+
+ACTIONS = ('find', 'getdetails')
+
+# Every call goes to the server unless --cache is given; no background work
+LOAD_SETTINGS = {
+    'api_key': 'load-test-key',
+    'search_engine_id': 'load-test-cx',
+    'search_cache_enabled': False,
+    'details_cache_enabled': False,
+    'prefetch_enabled': False,
+    'artwork_cache_enabled': False,
+    'quota_daily_budget': 0,
+    'quota_rate': 1000000,
+}
+
+
+def build_calls(ifdb, actions):
+    """
+    Return the calls of one pass over the corpus
+
+    Returns:
+        List of (action, function(handle)) tuples: one find per recorded search
+        and one getdetails per recorded listing, interleaved
+    """
+    finds = [
+        ('find', lambda handle, search=search: ifdb.search_movie(search['title'], search['year'], handle))
+        for search in fixtures.load_searches()
+    ] if 'find' in actions else []
+    details = [
+        ('getdetails', lambda handle, url=fixtures.listing_url(path): ifdb.get_details(url, handle))
+        for path in fixtures.listing_paths()
+    ] if 'getdetails' in actions else []
+    calls = []
+    for pair in itertools.zip_longest(finds, details):
+        calls.extend(call for call in pair if call is not None)
+    return calls
+
+
+def run_load(calls, rate, duration, concurrency):
+    """
+    Start calls at `rate` per second for `duration` seconds, cycling through `calls`
+
+    Returns:
+        Tuple of (samples, elapsed): samples are (action, latency, succeeded)
+        tuples, elapsed is the time until the last call finished
+    """
+    import xbmcplugin
+
+    samples = []
+    lock = threading.Lock()
+    handles = itertools.count(1)
+
+    def run(action, function, due):
+        handle = next(handles)
+        try:
+            function(handle)
+        except Exception:
+            pass
+        latency = time.perf_counter() - due
+        succeeded = bool(xbmcplugin.handles.pop(handle, None))
+        with lock:
+            samples.append((action, latency, succeeded))
+
+    total = max(1, int(rate * duration))
+    schedule = itertools.cycle(calls)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index in range(total):
+            due = start + index / rate
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            action, function = next(schedule)
+            executor.submit(run, action, function, due)
+    return samples, time.perf_counter() - start
+
+
+def report(samples, elapsed):
+    """
+    Aggregate samples per action
+
+    Returns:
+        Dict mapping each action and 'all' to {'calls', 'succeeded', 'rate',
+        'p50', 'p95', 'p99', 'max'}: rate is successful scrapes per second,
+        latencies are in seconds
+    """
+    from resources.lib.metrics import percentile
+
+    groups = {}
+    for action, latency, succeeded in samples:
+        for name in (action, 'all'):
+            groups.setdefault(name, []).append((latency, succeeded))
+    summary = {}
+    for name, values in groups.items():
+        latencies = [latency for latency, _ in values]
+        succeeded = sum(1 for _, ok in values if ok)
+        summary[name] = {
+            'calls': len(values),
+            'succeeded': succeeded,
+            'rate': succeeded / elapsed if elapsed else 0.0,
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+        }
+    return summary
+
+
+def point_at(cse_url, site_url):
+    """Send the scraper's requests to a stand-in server"""
+    from resources.lib import scraper
+
+    os.environ['IFDB_CSE_URL'] = scraper.CSE_URL = cse_url
+    os.environ['IFDB_SITE_URL'] = scraper.SITE_URL = site_url
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Load-test the scraper against the replay server')
+    parser.add_argument('--rate', type=float, default=20.0, help='calls started per second (default: 20)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to start calls for (default: 10)')
+    parser.add_argument('--concurrency', type=int, default=8, help='calls running at once (default: 8)')
+    parser.add_argument('--actions', default=','.join(ACTIONS), help='comma-separated actions (default: all)')
+    parser.add_argument('--cache', action='store_true', help='enable the search and details caches')
+    parser.add_argument('--settings', default='{}', help='JSON object of further addon settings')
+    parser.add_argument('--server', help='base URL of a running replay server (default: start one)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    replay_server.add_fault_arguments(parser)
+    args = parser.parse_args(argv)
+
+    actions = args.actions.split(',')
+    unknown = set(actions) - set(ACTIONS)
+    if unknown:
+        parser.error(f"unknown action(s): {', '.join(sorted(unknown))}")
+    if args.rate <= 0 or args.concurrency < 1:
+        parser.error('--rate and --concurrency must be positive')
+
+    server = None
+    if args.server:
+        base = args.server.rstrip('/')
+        point_at(base + replay_server.CSE_PATH, base)
+    else:
+        server = replay_server.ReplayServer(replay_server.faults_from_args(args)).start()
+        point_at(server.cse_url, server.site_url)
+
+    settings = dict(LOAD_SETTINGS, **json.loads(args.settings))
+    if args.cache:
+        settings.update(search_cache_enabled=True, details_cache_enabled=True)
+
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps(settings)
+            import ifdb
+            ifdb._addon = None
+            samples, elapsed = run_load(build_calls(ifdb, actions), args.rate, args.duration, args.concurrency)
+    finally:
+        if server is not None:
+            server.stop()
+
+    summary = report(samples, elapsed)
+    if args.json:
+        print(json.dumps({'summary': summary, 'server': server.stats if server else None}, indent=2, sort_keys=True))
+        return 0
+
+    print("=" * 70)
+    print(f"IFDB Scraper - Load Test ({args.rate:g} calls/s for {args.duration:g}s, "
+          f"{args.concurrency} concurrent)")
+    print("=" * 70)
+    print(f"{'Action':<14}{'Calls':>7}{'OK':>7}{'Scrapes/s':>11}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name in [action for action in ACTIONS if action in summary] + ['all']:
+        row = summary[name]
+        print(f"{name:<14}{row['calls']:>7}{row['succeeded']:>7}{row['rate']:>11.1f}"
+              + ''.join(f"{row[key] * 1000:>7.0f}ms" for key in ('p50', 'p95', 'p99', 'max')))
+    if server is not None:
+        print("-" * 70)
+        print("Server: " + ', '.join(f"{name}={value}" for name, value in sorted(server.stats.items())))
+    print("=" * 70)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Google Custom Search API and fanedit.org
+
+Serves the recorded corpus in benchmarks/data (see benchmarks/fixtures.py)
+over HTTP, so the scraper's real network code, timeouts and caches can be
+exercised without spending API quota or loading fanedit.org:
+
+- /customsearch/v1?q=...&start=N answers like googleapis.com/customsearch/v1
+- /<slug>/ answers like https://fanedit.org/<slug>/, with an ETag and 304
+  answers to If-None-Match
+
+Faults are injected at configurable rates: 429 rate limiting (with the
+Google error body and Retry-After), 5xx server errors and stalls (no answer
+for --stall seconds, then the connection is dropped, which the client sees as
+a timeout if its own timeout is shorter). Every answer can be delayed by a
+fixed latency plus random jitter, and response bodies can be throttled to a
+bandwidth limit. Connections are kept alive for clients that ask for it
+(HTTP/1.1); stats count the connections and the most requests in flight.
+
+Point the scraper at it with the IFDB_CSE_URL and IFDB_SITE_URL environment
+variables printed on start (see resources/lib/scraper.py).
+
+Usage:
+    python benchmarks/replay_server.py [--port 8765] [--latency 0.2] [--jitter 0.1]
+        [--error-429 0.05] [--error-5xx 0.02] [--timeouts 0.01] [--bandwidth 256]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+if BENCHMARK_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARK_DIR)
+
+import fixtures
+
+CSE_PATH = '/customsearch/v1'
+
+# Bodies are written in slices of this duration when a bandwidth limit is set
+BANDWIDTH_SLICE = 0.05
+
+_RATE_LIMITED = json.dumps({
+    'error': {
+        'code': 429,
+        'message': 'Quota exceeded (replay server)',
+        'errors': [{'domain': 'usageLimits', 'reason': 'rateLimitExceeded'}],
+    }
+}).encode('utf-8')
+
+
+class FaultConfig:
+    """
+    Latency, error rates and bandwidth of the replay server
+
+    Args:
+        latency: Delay before every answer (seconds)
+        jitter: Random extra delay, up to this many seconds
+        error_429: Fraction of requests answered 429 Too Many Requests
+        error_5xx: Fraction of requests answered 500, 502 or 503
+        timeouts: Fraction of requests that stall and then lose their connection
+        stall: How long a stalled request hangs (seconds)
+        bandwidth: Response body rate limit in KB/s per request (None: unlimited)
+        seed: Seed of the fault generator, for repeatable runs
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_429=0.0, error_5xx=0.0, timeouts=0.0, stall=60.0,
+                 bandwidth=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.timeouts = timeouts
+        self.stall = stall
+        self.bandwidth = bandwidth
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """Return the fault for the next request ('timeout', 429, 500/502/503 or None) and its delay"""
+        with self._lock:
+            roll = self._random.random()
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+            if roll < self.timeouts:
+                return 'timeout', delay
+            roll -= self.timeouts
+            if roll < self.error_429:
+                return 429, delay
+            roll -= self.error_429
+            if roll < self.error_5xx:
+                return self._random.choice((500, 502, 503)), delay
+            return None, delay
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Answers one request from the fixture corpus, with the server's faults"""
+
+    server_version = 'IFDBReplay/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            # A keep-alive client dropped the connection, e.g. after reading a listing only in part
+            self.server.count('client.closed')
+
+    def do_GET(self):
+        self.server.enter()
+        try:
+            self._answer()
+        finally:
+            self.server.leave()
+
+    def _answer(self):
+        server = self.server
+        fault, delay = server.faults.draw()
+        kind = 'cse' if urllib.parse.urlsplit(self.path).path == CSE_PATH else 'listing'
+        server.count(kind)
+        if delay:
+            time.sleep(delay)
+
+        if fault == 'timeout':
+            server.count('fault.timeout')
+            time.sleep(server.faults.stall)
+            # Drop the connection without an answer
+            self.close_connection = True
+            return
+        if fault == 429:
+            server.count('fault.429')
+            self._send(429, _RATE_LIMITED, 'application/json; charset=UTF-8', {'Retry-After': '1'})
+            return
+        if fault is not None:
+            server.count(f"fault.{fault}")
+            self._send(fault, b'Replay server error', 'text/plain')
+            return
+
+        path, content_type = fixtures.fixture_path(self._original_url(kind))
+        if path is None or not os.path.exists(path):
+            server.count('status.404')
+            self._send(404, b'Not Found (no fixture)', 'text/plain')
+            return
+        body = server.read(path)
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if kind == 'listing' and self.headers.get('If-None-Match') == etag:
+            server.count('status.304')
+            self._send(304, b'', None, {'ETag': etag})
+            return
+        server.count('status.200')
+        self._send(200, body, content_type, {'ETag': etag} if kind == 'listing' else None)
+
+    def _original_url(self, kind):
+        if kind == 'cse':
+            return 'https://www.googleapis.com' + self.path
+        return 'https://fanedit.org' + self.path
+
+    def _send(self, status, body, content_type, headers=None):
+        try:
+            self.send_response(status)
+            if content_type:
+                self.send_header('Content-Type', content_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            if status != 304:
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body:
+                self._write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading: the scraper stops listing downloads once all fields are in
+            self.server.count('client.closed')
+
+    def _write(self, body):
+        bandwidth = self.server.faults.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            self.server.count('bytes', len(body))
+            return
+        size = max(1, int(bandwidth * 1024 * BANDWIDTH_SLICE))
+        for offset in range(0, len(body), size):
+            chunk = body[offset:offset + size]
+            self.wfile.write(chunk)
+            self.wfile.flush()
+            self.server.count('bytes', len(chunk))
+            time.sleep(len(chunk) / (bandwidth * 1024))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server replaying the fixture corpus
+
+    Can be run in the background of another script:
+
+        with ReplayServer(FaultConfig(latency=0.1)) as server:
+            scraper.CSE_URL, scraper.SITE_URL = server.cse_url, server.site_url
+            ...
+        print(server.stats)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, faults=None, host='127.0.0.1', port=0, verbose=False):
+        super().__init__((host, port), ReplayHandler)
+        self.faults = faults or FaultConfig()
+        self.verbose = verbose
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._bodies = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def cse_url(self):
+        return self.url + CSE_PATH
+
+    @property
+    def site_url(self):
+        return self.url
+
+    def count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    def enter(self):
+        """Track a request in flight (stats['max_in_flight'] is the peak)"""
+        with self._stats_lock:
+            self._in_flight += 1
+            self.stats['max_in_flight'] = max(self.stats.get('max_in_flight', 0), self._in_flight)
+
+    def leave(self):
+        with self._stats_lock:
+            self._in_flight -= 1
+
+    def read(self, path):
+        """Return the content of a fixture file, read once"""
+        body = self._bodies.get(path)
+        if body is None:
+            with open(path, 'rb') as f:
+                body = self._bodies[path] = f.read()
+        return body
+
+    def start(self):
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_fault_arguments(parser):
+    """Add the latency, error rate and bandwidth options to an argument parser"""
+    group = parser.add_argument_group('injected faults')
+    group.add_argument('--latency', type=float, default=0.0, help='delay before every answer, in seconds')
+    group.add_argument('--jitter', type=float, default=0.0, help='random extra delay, up to this many seconds')
+    group.add_argument('--error-429', type=float, default=0.0, help='fraction of requests answered 429')
+    group.add_argument('--error-5xx', type=float, default=0.0, help='fraction of requests answered 500/502/503')
+    group.add_argument('--timeouts', type=float, default=0.0,
+                       help='fraction of requests that stall and lose their connection')
+    group.add_argument('--stall', type=float, default=60.0, help='how long a stalled request hangs (default: 60)')
+    group.add_argument('--bandwidth', type=float, help='response bandwidth per request, in KB/s')
+    group.add_argument('--seed', type=int, help='seed of the fault generator')
+
+
+def faults_from_args(args):
+    """Return the FaultConfig of options added by add_fault_arguments()"""
+    return FaultConfig(
+        latency=args.latency, jitter=args.jitter, error_429=args.error_429, error_5xx=args.error_5xx,
+        timeouts=args.timeouts, stall=args.stall, bandwidth=args.bandwidth, seed=args.seed
+    )
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Replay the fixture corpus as Custom Search API and fanedit.org')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on (default: 8765)')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    add_fault_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = ReplayServer(faults_from_args(args), args.host, args.port, args.verbose)
+    print(f"Replaying {len(fixtures.listing_paths())} listings and {len(fixtures.load_searches())} searches")
+    print(f"export IFDB_CSE_URL={server.cse_url}")
+    print(f"export IFDB_SITE_URL={server.site_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats, sort_keys=True))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite with regression baselines
+
+Runs the scraper against the fixture corpus in benchmarks/data (see
+benchmarks/fixtures.py) with the stub xbmc modules in benchmarks/stubs, so it
+needs neither Kodi nor network access nor API credentials. It measures:
+
+- parse: parse_listing() throughput over the recorded listing pages
+- getdetails: get_details() per listing, page served by the fixtures (no cache)
+- find: search_movie() end to end per recorded search (API responses served
+  by the fixtures), without and with a search cache hit, and with the query
+  variants (find.variants; the fixtures answer them instantly, so this is
+  their CPU cost)
+- startup.*: one fresh interpreter per invocation, as Kodi runs the scraper
+  (see benchmarks/benchmark_startup.py)
+
+Every measurement is preceded by a short reference workload, and results are
+stored in benchmarks/baselines.json as multiples of it. A baseline recorded on
+a faster or slower (or busier) machine therefore still applies. A result more than --tolerance slower than its
+baseline is a regression and the script exits with status 1.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--only parse,find] [--tolerance 0.3]
+    python benchmarks/run_benchmarks.py --update-baselines
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import re
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+STUBS_DIR = os.path.join(BENCHMARK_DIR, 'stubs')
+BASELINES_FILE = os.path.join(BENCHMARK_DIR, 'baselines.json')
+
+sys.path[:0] = [path for path in (BENCHMARK_DIR, STUBS_DIR, ROOT) if path not in sys.path]
+os.environ.setdefault('IFDB_STUB_LOG_LEVEL', '99')
+
+import fixtures
+
+GROUPS = ('parse', 'getdetails', 'find', 'startup')
+
+# Settings for the in-process runs: no background work, no throttling by the quota governor
+BENCHMARK_SETTINGS = {
+    'api_key': 'benchmark-key',
+    'search_engine_id': 'benchmark-cx',
+    'search_cache_enabled': False,
+    'details_cache_enabled': False,
+    'prefetch_enabled': False,
+    'artwork_cache_enabled': False,
+    'quota_daily_budget': 0,
+    'quota_rate': 1000000,
+}
+
+
+def _reference_workload():
+    """A fixed mix of regex matching, JSON encoding and arithmetic"""
+    text = _REFERENCE_TEXT
+    total = sum(len(m.group(2)) for m in _REFERENCE_PATTERN.finditer(text))
+    total += len(json.dumps({str(i): [i, str(i)] for i in range(500)}))
+    return total + sum(i * i for i in range(20000))
+
+
+_REFERENCE_PATTERN = re.compile(r'<div class="(\w+)">([^<]*)</div>')
+_REFERENCE_TEXT = ''.join(f'<div class="c{i}">value {i}</div>' for i in range(2000))
+
+
+def calibrate(rounds=3):
+    """Return the time of the reference workload on this machine right now"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        _reference_workload()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def measure(function, repeat, per_call=1, self_timed=False):
+    """
+    Time function() `repeat` times, each right after a calibration
+
+    With self_timed, function() returns its own duration in seconds (e.g. one
+    measured inside a child process).
+
+    Returns:
+        Tuple of (seconds, units): the median duration divided by per_call, in
+        seconds and in multiples of the reference workload. Units are what is
+        compared with the baselines: they cancel out the speed of the machine
+        and most of the load from other processes during the run.
+    """
+    timings = []
+    units = []
+    for _ in range(repeat):
+        reference = calibrate()
+        start = time.perf_counter()
+        value = function()
+        elapsed = value if self_timed else time.perf_counter() - start
+        timings.append(elapsed)
+        units.append(elapsed / reference)
+    return statistics.median(timings) / per_call, statistics.median(units) / per_call
+
+
+def bench_parse(repeat):
+    """parse_listing() time per recorded listing page, and throughput in MB/s"""
+    from resources.lib.records import parse_listing
+
+    pages = []
+    for path in fixtures.listing_paths():
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+    size = sum(len(page.encode('utf-8')) for page in pages)
+
+    def parse_all():
+        for page in pages:
+            parse_listing(page)
+
+    result = measure(parse_all, repeat * 10, per_call=len(pages))
+    return {'parse.page': result}, f"{len(pages)} pages, {size / (result[0] * len(pages)) / 1e6:.0f} MB/s"
+
+
+def _load_ifdb(profile, **settings):
+    import ifdb
+
+    os.environ['IFDB_STUB_PROFILE'] = profile
+    os.environ['IFDB_STUB_SETTINGS'] = json.dumps(dict(BENCHMARK_SETTINGS, **settings))
+    ifdb._addon = None
+    return ifdb
+
+
+def bench_getdetails(repeat):
+    """get_details() time per recorded listing, fetched through the fixtures"""
+    import xbmcplugin
+
+    urls = [fixtures.listing_url(path) for path in fixtures.listing_paths()]
+    with tempfile.TemporaryDirectory() as profile, fixtures.installed():
+        ifdb = _load_ifdb(profile)
+
+        def details_all():
+            del xbmcplugin.items[:]
+            for url in urls:
+                ifdb.get_details(url, 1)
+            if len(xbmcplugin.items) != len(urls):
+                raise RuntimeError('get_details() did not add an item for every listing')
+
+        result = measure(details_all, repeat * 3, per_call=len(urls))
+    return {'getdetails': result}, f"{len(urls)} listings"
+
+
+def bench_find(repeat):
+    """search_movie() latency per recorded search: one query, query variants, search cache hit"""
+    import xbmcplugin
+
+    searches = fixtures.load_searches()
+    results = {}
+    with fixtures.installed():
+        for name, cache_enabled, variants in (
+            ('find', False, False), ('find.variants', False, True), ('find.cache_hit', True, False)
+        ):
+            with tempfile.TemporaryDirectory() as profile:
+                ifdb = _load_ifdb(profile, search_cache_enabled=cache_enabled, search_variants=variants)
+
+                def find_all():
+                    for search in searches:
+                        del xbmcplugin.items[:]
+                        ifdb.search_movie(search['title'], search['year'], 1)
+                        if not any(search['listing'] in url for url, _, _ in xbmcplugin.items):
+                            raise RuntimeError(f"search_movie() did not find {search['listing']}")
+
+                if cache_enabled:
+                    find_all()
+                results[name] = measure(find_all, repeat, per_call=len(searches))
+    return results, f"{len(searches)} searches"
+
+
+def bench_startup(repeat):
+    """Time per fresh-interpreter invocation, per action (see benchmark_startup.py)"""
+    import benchmark_startup
+
+    script = os.path.join(ROOT, 'ifdb.py')
+    results = {}
+    with tempfile.TemporaryDirectory() as profile:
+        for name, query, settings in benchmark_startup.ACTIONS:
+            results[f"startup.{name}"] = measure(
+                lambda: benchmark_startup.time_invocation(script, query, settings, profile), max(3, repeat),
+                self_timed=True
+            )
+    return results, ''
+
+
+BENCHMARKS = {
+    'parse': bench_parse,
+    'getdetails': bench_getdetails,
+    'find': bench_find,
+    'startup': bench_startup,
+}
+
+
+def compare(results, baselines, tolerance):
+    """
+    Compare results with the stored baselines
+
+    Args:
+        results: {benchmark: (seconds, units)} as returned by measure()
+        baselines: {benchmark: units}
+        tolerance: Allowed slowdown as a fraction
+
+    Returns:
+        List of (name, seconds, expected seconds or None, regressed) tuples. The
+        expected time is the baseline converted to seconds at the speed of the
+        machine during this run.
+    """
+    rows = []
+    for name, (seconds, units) in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            rows.append((name, seconds, None, False))
+            continue
+        expected = seconds * baseline / units
+        rows.append((name, seconds, expected, units > baseline * (1 + tolerance)))
+    return rows
+
+
+def load_baselines(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Offline scraper benchmarks with regression baselines')
+    parser.add_argument('--only', help=f'comma-separated benchmark groups to run ({", ".join(GROUPS)})')
+    parser.add_argument('--repeat', type=int, default=15, help='repetitions per measurement (default: 15)')
+    parser.add_argument('--quick', action='store_true', help='fewer repetitions, for a smoke run')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='allowed slowdown against the baseline, as a fraction (default: 0.3)')
+    parser.add_argument('--baselines', default=BASELINES_FILE, help='baselines file (default: benchmarks/baselines.json)')
+    parser.add_argument('--update-baselines', action='store_true', help='store the results as the new baselines')
+    args = parser.parse_args(argv)
+
+    groups = args.only.split(',') if args.only else list(GROUPS)
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown benchmark group(s): {', '.join(sorted(unknown))}")
+    repeat = 3 if args.quick else args.repeat
+
+    results = {}
+    notes = {}
+    for group in groups:
+        timings, notes[group] = BENCHMARKS[group](repeat)
+        results.update(timings)
+
+    baselines = load_baselines(args.baselines)
+    rows = compare(results, baselines, args.tolerance)
+
+    print("=" * 70)
+    print(f"IFDB Scraper - Benchmark Suite (median of {repeat} runs)")
+    print("=" * 70)
+    for group in groups:
+        if notes[group]:
+            print(f"{group}: {notes[group]}")
+    print(f"reference workload: {calibrate(9) * 1000:.2f}ms")
+    print("-" * 70)
+    print(f"{'Benchmark':<36}{'Expected':>10}{'Current':>10}{'Change':>9}")
+    for name, seconds, expected, regressed in rows:
+        if expected is None:
+            print(f"{name:<36}{'-':>10}{seconds * 1000:>8.2f}ms{'new':>9}")
+        else:
+            change = (seconds - expected) / expected * 100
+            print(f"{name:<36}{expected * 1000:>8.2f}ms{seconds * 1000:>8.2f}ms{change:>+8.0f}%"
+                  + ("  REGRESSION" if regressed else ''))
+    print("=" * 70)
+
+    if args.update_baselines:
+        baselines.update({name: units for name, (_, units) in results.items()})
+        with open(args.baselines, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    regressions = [name for name, _, _, regressed in rows if regressed]
+    if regressions:
+        print(f"✗ {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("✓ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+Fake urlopen() response for tests that replace urllib.request.urlopen
+
+Importing this module also puts the stub xbmc modules next to it on sys.path,
+so the tests can import ifdb.py afterwards.
+"""
+
+import io
+import os
+import sys
+
+STUBS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+if STUBS_DIR not in sys.path:
+    sys.path.insert(0, STUBS_DIR)
+
+
+class FakeResponse(io.BytesIO):
+    """urlopen() response with headers"""
+
+    def __init__(self, data=b'', headers=None):
+        super().__init__(data)
+        self.headers = dict(headers or {})
@@ -0,0 +1,32 @@
+"""
+Minimal stand-in for Kodi's xbmc module, used to run ifdb.py outside Kodi
+"""
+
+import os
+import sys
+import time
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+LOGFATAL = 4
+
+_LOG_LEVEL = int(os.environ.get('IFDB_STUB_LOG_LEVEL', LOGWARNING))
+
+
+def log(msg, level=LOGDEBUG):
+    """Print log messages at or above IFDB_STUB_LOG_LEVEL to stderr"""
+    if level >= _LOG_LEVEL:
+        print(msg, file=sys.stderr)
+
+
+class Monitor:
+    """Stand-in for xbmc.Monitor: Kodi never asks to exit, and settings never change"""
+
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=None):
+        time.sleep(timeout if timeout is not None else 3600)
+        return False
@@ -0,0 +1,58 @@
+"""
+Minimal stand-in for Kodi's xbmcaddon module, used to run ifdb.py outside Kodi
+
+Settings default to the values in resources/settings.xml and can be
+overridden with a JSON object in the IFDB_STUB_SETTINGS environment variable.
+The profile directory is taken from IFDB_STUB_PROFILE.
+"""
+
+import json
+import os
+import re
+import tempfile
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _load_settings():
+    # A regex keeps the stub from adding an XML parser import to startup timings
+    with open(os.path.join(_ROOT, 'resources', 'settings.xml'), encoding='utf-8') as f:
+        settings = dict(re.findall(r'<setting id="([^"]+)"[^>]*?default="([^"]*)"', f.read()))
+    settings.update(json.loads(os.environ.get('IFDB_STUB_SETTINGS', '{}')))
+    return settings
+
+
+class Addon:
+    """Stand-in for xbmcaddon.Addon"""
+
+    def __init__(self, id=None):
+        self._settings = _load_settings()
+
+    def getAddonInfo(self, key):
+        info = {
+            'id': 'metadata.fanedit.ifdb',
+            'version': '0.0.0-stub',
+            'path': _ROOT,
+            'profile': os.environ.get(
+                'IFDB_STUB_PROFILE', os.path.join(tempfile.gettempdir(), 'metadata.fanedit.ifdb')
+            ),
+        }
+        return info[key]
+
+    def getSetting(self, key):
+        return str(self._settings.get(key, ''))
+
+    def getSettingString(self, key):
+        return str(self._settings.get(key, ''))
+
+    def getSettingBool(self, key):
+        value = self._settings.get(key, False)
+        if isinstance(value, str):
+            return value.lower() == 'true'
+        return bool(value)
+
+    def getSettingInt(self, key):
+        return int(self._settings.get(key) or 0)
+
+    def getSettingNumber(self, key):
+        return float(self._settings.get(key) or 0)
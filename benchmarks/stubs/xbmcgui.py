@@ -0,0 +1,62 @@
+"""
+Minimal stand-in for Kodi's xbmcgui module, used to run ifdb.py outside Kodi
+
+Notifications are printed to stderr and collected in `notifications`.
+"""
+
+import sys
+
+NOTIFICATION_INFO = 'info'
+NOTIFICATION_WARNING = 'warning'
+NOTIFICATION_ERROR = 'error'
+
+notifications = []
+
+
+class Dialog:
+    """Stand-in for xbmcgui.Dialog"""
+
+    def notification(self, heading, message, icon=NOTIFICATION_INFO, time=5000, sound=True):
+        notifications.append((heading, message, icon))
+        print(f'[notification] {heading}: {message}', file=sys.stderr)
+
+
+class InfoTagVideo:
+    """Records every value set on the info tag in the `values` dict"""
+
+    def __init__(self):
+        self.values = {}
+
+    def __getattr__(self, name):
+        if not name.startswith('set'):
+            raise AttributeError(name)
+
+        def setter(*args):
+            self.values[name[3:]] = args[0] if len(args) == 1 else args
+        return setter
+
+
+class ListItem:
+    """Stand-in for xbmcgui.ListItem"""
+
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        self.label = label
+        self.art = {}
+        self.properties = {}
+        self.unique_ids = {}
+        self._infotag = InfoTagVideo()
+
+    def getLabel(self):
+        return self.label
+
+    def getVideoInfoTag(self):
+        return self._infotag
+
+    def setArt(self, values):
+        self.art.update(values)
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def getProperty(self, key):
+        return self.properties.get(key, '')
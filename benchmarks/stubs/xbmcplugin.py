@@ -0,0 +1,23 @@
+"""
+Minimal stand-in for Kodi's xbmcplugin module, used to run ifdb.py outside Kodi
+
+Directory items added by the scraper are collected in `items`, and their URLs
+per plugin handle in `handles` (for callers running several actions at once).
+"""
+
+items = []
+handles = {}
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    items.append((url, listitem, isFolder))
+    handles.setdefault(handle, []).append(url)
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    pass
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    items.append((None, listitem, False))
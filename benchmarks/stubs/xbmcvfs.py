@@ -0,0 +1,9 @@
+"""
+Minimal stand-in for Kodi's xbmcvfs module, used to run ifdb.py outside Kodi
+"""
+
+import os
+
+
+def translatePath(path):
+    return os.path.expanduser(path)
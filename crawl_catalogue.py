@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Crawl the fanedit.org catalogue into a local metadata store
+
+Enumerates listings from the site's sitemaps (or the given sitemap/category
+URLs), fetches them politely (per-host rate limit and concurrency cap,
+robots.txt respected) on the asyncio fetch engine, which reuses connections,
+and stores the parsed fields in an SQLite catalogue.
+The title search index used by the addon's local search is rebuilt at the end,
+and the listings are exported to a compact record store (catalogue.rec next to
+the database) that serves getdetails without a request.
+The crawl frontier is stored in the same file: an interrupted crawl resumes
+where it stopped when the command is run again.
+
+Usage:
+    python crawl_catalogue.py [--db PATH] [--seed URL ...] [--interval 1.0] [--concurrency 2]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from resources.lib import scraper
+from resources.lib.catalogue import DEFAULT_SITE, LISTING, CatalogueStore, Crawler
+from resources.lib.record_store import store_path, write_store
+from resources.lib.records import FaneditRecord
+from resources.lib.title_index import TitleIndex
+
+DEFAULT_DB = os.path.join(os.path.expanduser('~'), '.cache', 'metadata.fanedit.ifdb', 'catalogue.db')
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Crawl the fanedit.org catalogue into a local metadata store')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'catalogue database (default: {DEFAULT_DB})')
+    parser.add_argument('--seed', action='append', default=[],
+                        help='sitemap or category page URL to start from (repeatable; default: sitemaps from robots.txt)')
+    parser.add_argument('--site', default=DEFAULT_SITE, help=f'site to discover sitemaps for (default: {DEFAULT_SITE})')
+    parser.add_argument('--listing-pattern', help='only queue listing URLs matching this regular expression')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='minimum seconds between requests to the same host (default: 1.0)')
+    parser.add_argument('--concurrency', type=int, default=2,
+                        help='maximum concurrent requests per host (default: 2)')
+    parser.add_argument('--limit', type=int, help='stop after processing this many frontier entries')
+    parser.add_argument('--refresh-days', type=float,
+                        help='re-crawl sitemaps, categories and listings not crawled in this many days')
+    parser.add_argument('--retry-failed', action='store_true', help='retry entries that failed on earlier runs')
+    parser.add_argument('--threads', action='store_true',
+                        help='fetch on a thread pool instead of the asyncio fetch engine')
+    parser.add_argument('--no-index', action='store_true',
+                        help='do not rebuild the title search index after the crawl')
+    parser.add_argument('--no-store', action='store_true',
+                        help='do not export the listings to the record store after the crawl')
+    parser.add_argument('--quiet', action='store_true', help='only print the summary')
+    args = parser.parse_args(argv)
+    
+    store = CatalogueStore(args.db)
+    crawler = Crawler(
+        store,
+        scraper.user_agent('crawler'),
+        interval=args.interval,
+        concurrency=args.concurrency,
+        listing_pattern=args.listing_pattern,
+        log=None if args.quiet else print
+    )
+    
+    try:
+        if args.retry_failed:
+            print(f"Retrying {store.requeue(failed=True)} failed entries")
+        if args.refresh_days is not None:
+            requeued = store.requeue(kind='sitemap') + store.requeue(kind='category')
+            requeued += store.requeue(kind=LISTING, older_than=time.time() - args.refresh_days * 86400)
+            print(f"Re-queued {requeued} entries for refresh")
+        
+        added = crawler.seed(args.seed, site=args.site)
+        if added:
+            print(f"Seeded {added} new frontier entries")
+        
+        start = time.perf_counter()
+        try:
+            if args.threads:
+                processed = crawler.run(limit=args.limit)
+            else:
+                processed = crawler.run_async(limit=args.limit)
+        except KeyboardInterrupt:
+            print("Interrupted; run again to resume")
+            return 130
+        elapsed = time.perf_counter() - start
+        
+        print(f"Processed {processed} entries in {elapsed:.1f}s; {len(store)} listings stored in {args.db}")
+        for (kind, state), count in sorted(store.counts().items()):
+            print(f"  {kind:<9} {state:<8} {count}")
+        
+        if not args.no_index:
+            index = TitleIndex(args.db)
+            try:
+                print(f"Indexed {index.rebuild(store.listings())} titles for local search")
+            finally:
+                index.close()
+        if not args.no_store:
+            path = store_path(args.db)
+            written = write_store(path, (
+                (url, FaneditRecord.from_dict(fields)) for url, fields in store.listings()
+            ))
+            print(f"Exported {written} listings to {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,18 +3,85 @@ IFDB (Internet Fanedit Database) Scraper for Kodi
 Scrapes movie metadata from fanedit.org using Google Custom Search API
 """
 
-import json
-import re
+import os
 import sys
 import urllib.parse
-import urllib.request
 import xbmc
-import xbmcaddon
-import xbmcgui
-import xbmcplugin
 
-ADDON = xbmcaddon.Addon()
-ADDON_ID = ADDON.getAddonInfo('id')
+# Kodi starts a fresh interpreter for every scraper call, so only the modules
+# every action needs are imported here. Everything else (json, urllib.request,
+# sqlite3, xbmcgui, the field patterns, ...) is imported by the function that
+# uses it, and the xbmcaddon.Addon object is created on first use.
+
+ADDON_ID = 'metadata.fanedit.ifdb'
+
+# Maximum number of listings fetched concurrently by the prefetch stage
+PREFETCH_WORKERS = 2
+
+# Maximum number of posters downloaded concurrently, and the largest accepted download
+ARTWORK_WORKERS = 2
+ARTWORK_MAX_BYTES = 20 * 1024 * 1024
+
+# Socket timeout for poster downloads; the script waits for them before it exits
+ARTWORK_TIMEOUT = 10
+
+# Values of the search_source setting
+SEARCH_GOOGLE = 0
+SEARCH_LOCAL = 1
+SEARCH_LOCAL_FIRST = 2
+
+# Maximum number of results returned by a local catalogue search
+LOCAL_SEARCH_RESULTS = 10
+
+# Background revalidation of stale listings: at most this many at once across
+# all scraper processes, with this socket timeout. A claim lapses after
+# REFRESH_LEASE seconds if its process died.
+REFRESH_LIMIT = 2
+REFRESH_TIMEOUT = 10
+REFRESH_LEASE = 60
+
+# Longest a find call waits for the shared API rate limit or a backoff (seconds)
+QUOTA_MAX_WAIT = 10
+
+# With search variants enabled, the rate-limit bucket holds enough queries for
+# one search's variants (see ranking.query_variants()); variants only take a
+# query that is free right away
+QUOTA_BURST = 3
+
+# Metrics file in the addon profile (see summarize_metrics.py)
+METRICS_FILE = 'metrics.jsonl'
+
+# The scraper service (service.py) keeps up to SERVICE_MEMORY_ENTRIES fresh
+# listings in memory, for at most SERVICE_MEMORY_TTL seconds, and up to
+# SERVICE_CONNECTIONS keep-alive connections per host
+SERVICE_MEMORY_ENTRIES = 500
+SERVICE_MEMORY_TTL = 600
+SERVICE_CONNECTIONS = 4
+
+_addon = None
+_prefetch_executor = None
+_artwork_executor = None
+
+# Set by start_service() in the scraper service only
+_fetcher = None
+_details_memory = None
+
+
+def get_addon():
+    """Return the xbmcaddon.Addon instance, creating it on first use"""
+    global _addon
+    if _addon is None:
+        import xbmcaddon
+        _addon = xbmcaddon.Addon()
+    return _addon
+
+
+def get_fetcher():
+    """Return what makes network requests: the scraper module, or the service's pooled EngineThread"""
+    if _fetcher is not None:
+        return _fetcher
+    from resources.lib import scraper
+    return scraper
 
 
 def log(msg, level=xbmc.LOGDEBUG):
@@ -34,20 +101,223 @@ def get_params():
     return params
 
 
+def get_profile_path():
+    """Return the addon profile directory, creating it if needed"""
+    import xbmcvfs
+    
+    profile = xbmcvfs.translatePath(get_addon().getAddonInfo('profile'))
+    os.makedirs(profile, exist_ok=True)
+    return profile
+
+
+def open_search_cache():
+    """
+    Open the persistent search cache if it is enabled in the addon settings
+
+    Returns:
+        SearchCache instance, or None if caching is disabled or unavailable
+    """
+    from resources.lib.cache import SearchCache
+    
+    if not get_addon().getSettingBool('search_cache_enabled'):
+        return None
+    try:
+        return SearchCache(
+            os.path.join(get_profile_path(), 'search_cache.db'),
+            ttl=get_addon().getSettingInt('search_cache_ttl') * 3600,
+            max_entries=get_addon().getSettingInt('search_cache_max_entries'),
+            negative_ttl=get_addon().getSettingInt('search_cache_negative_ttl') * 3600,
+            negative_max_ttl=get_addon().getSettingInt('search_cache_negative_max_ttl') * 24 * 3600
+        )
+    except Exception as e:
+        log(f"Search cache unavailable: {str(e)}", xbmc.LOGWARNING)
+        return None
+
+
+def add_search_results(results, handle, scores=None):
+    """
+    Add search results to the Kodi directory listing
+
+    Args:
+        results: List of SearchHit (title, url) tuples, best match first
+        handle: Kodi plugin handle
+        scores: Relevance of each result (see ranking.relevance()), which
+            Kodi uses to auto-select a match (optional)
+    """
+    import xbmcgui
+    import xbmcplugin
+    
+    from resources.lib import metrics
+    
+    with metrics.phase('listitem'):
+        for index, (item_title, item_url) in enumerate(results):
+            # Create list item
+            listitem = xbmcgui.ListItem(item_title, offscreen=True)
+            if scores is not None:
+                listitem.setProperty('relevance', f"{scores[index]:.2f}")
+            
+            # Set URL for getdetails action
+            url = f"?action=getdetails&url={urllib.parse.quote(item_url)}"
+            
+            # Add to results
+            xbmcplugin.addDirectoryItem(
+                handle=handle,
+                url=url,
+                listitem=listitem,
+                isFolder=True
+            )
+
+
+def get_catalogue_path():
+    """Return the path of the local catalogue database (see crawl_catalogue.py)"""
+    path = get_addon().getSetting('catalogue_path')
+    if path:
+        import xbmcvfs
+        return xbmcvfs.translatePath(path)
+    return os.path.join(get_profile_path(), 'catalogue.db')
+
+
+def search_local(title, year):
+    """
+    Search the title index of the local catalogue
+    
+    Args:
+        title: Movie title to search for
+        year: Release year (optional)
+    
+    Returns:
+        List of SearchHit (title, url) tuples, or None if no index is available
+    """
+    from resources.lib.records import SearchHit
+    from resources.lib.title_index import TitleIndex
+    
+    index = TitleIndex(get_catalogue_path())
+    try:
+        if not index.exists():
+            log(f"No local title index at {index.path}", xbmc.LOGWARNING)
+            return None
+        matches = index.search(title, year, limit=LOCAL_SEARCH_RESULTS)
+    except Exception as e:
+        log(f"Local search failed: {str(e)}", xbmc.LOGWARNING)
+        return None
+    finally:
+        index.close()
+    
+    return [
+        SearchHit(f"{match['title']} ({match['year']})" if match['year'] else match['title'], match['url'])
+        for match in matches
+    ]
+
+
+def open_quota_governor():
+    """
+    Open the API quota governor shared by all scraper processes
+
+    Returns:
+        QuotaGovernor instance, or None if it is unavailable
+    """
+    from resources.lib.quota import QuotaGovernor
+    
+    budget = get_addon().getSettingInt('quota_daily_budget')
+    rate = get_addon().getSettingNumber('quota_rate')
+    burst = QUOTA_BURST if get_addon().getSettingBool('search_variants') else 1
+    try:
+        return QuotaGovernor(
+            os.path.join(get_profile_path(), 'quota.db'),
+            daily_budget=budget if budget > 0 else float('inf'),
+            rate=rate if rate > 0 else 1.0,
+            burst=max(burst, rate)
+        )
+    except Exception as e:
+        log(f"Quota governor unavailable: {str(e)}", xbmc.LOGWARNING)
+        return None
+
+
+def notify_quota(governor, reason):
+    """Show one notification per quota block, not one per scanned item"""
+    import xbmcgui
+    
+    if governor is not None and not governor.claim_notification():
+        return
+    xbmcgui.Dialog().notification(
+        "IFDB Scraper",
+        f"Searches paused: {reason}",
+        xbmcgui.NOTIFICATION_WARNING
+    )
+
+
+def rank_results(results, title, year):
+    """Order search results by relevance; returns (results, scores) (see ranking.rank_hits())"""
+    from resources.lib.ranking import rank_hits
+    
+    return rank_hits([results], title, year)
+
+
 def search_movie(title, year, handle):
     """
-    Search for movies using Google Custom Search API
+    Search for movies in the local catalogue and/or with Google Custom Search API
     
     Args:
         title: Movie title to search for
         year: Release year (optional)
         handle: Kodi plugin handle
     """
+    results, scores = find_movie(title, year)
+    add_search_results(results, handle, scores)
+
+
+def find_movie(title, year):
+    """
+    Search for movies without listing them (see search_movie())
+    
+    The scraper service runs this for find calls forwarded to it. Errors are
+    logged and notified here, and give no results.
+    
+    Args:
+        title: Movie title to search for
+        year: Release year (optional)
+    
+    Returns:
+        Tuple of (results, scores): SearchHit (title, url) tuples, best match
+        first, and the relevance of each (see ranking.relevance())
+    """
+    import xbmcgui
+    
+    from resources.lib import metrics
+    from resources.lib.canonical import canonicalize
+    
     log(f"Searching for: {title} ({year})", xbmc.LOGINFO)
+    kodi_title, kodi_year = title, year
+    
+    # Equivalent spellings of a title share one API query and one cache entry
+    with metrics.phase('canonicalize'):
+        title, year = canonicalize(title, year)
+    log(f"Canonical title: {title} ({year})", xbmc.LOGDEBUG)
+    
+    source = get_addon().getSettingInt('search_source')
+    if source in (SEARCH_LOCAL, SEARCH_LOCAL_FIRST):
+        with metrics.phase('local_search'):
+            results = search_local(title, year)
+        if results:
+            log(f"Local search: {len(results)} result(s)", xbmc.LOGINFO)
+            results, scores = rank_results(results, title, year)
+            start_prefetch(results)
+            return results, scores
+        if source == SEARCH_LOCAL:
+            if results is None:
+                xbmcgui.Dialog().notification(
+                    "IFDB Scraper Error",
+                    "Local catalogue not found, see addon settings",
+                    xbmcgui.NOTIFICATION_ERROR
+                )
+            else:
+                log("No local search results found", xbmc.LOGINFO)
+            return [], []
+        log("No local search results, searching with Google", xbmc.LOGINFO)
     
     # Get API credentials from settings
-    api_key = ADDON.getSetting('api_key')
-    search_engine_id = ADDON.getSetting('search_engine_id')
+    api_key = get_addon().getSetting('api_key')
+    search_engine_id = get_addon().getSetting('search_engine_id')
     
     if not api_key or not search_engine_id:
         log("API credentials not configured", xbmc.LOGERROR)
@@ -56,56 +326,100 @@ def search_movie(title, year, handle):
             "Please configure API credentials in addon settings",
             xbmcgui.NOTIFICATION_ERROR
         )
-        return
+        return [], []
     
     # Build search query
-    search_query = title
-    if year:
-        search_query = f"{title} {year}"
+    search_query = f"{title} {year}" if year else title
+    
+    # Answer repeat searches from the local cache without spending API quota
+    cache = open_search_cache()
+    if cache is not None:
+        try:
+            cached_results = cache.get(search_query, search_engine_id)
+        except Exception as e:
+            log(f"Search cache lookup failed: {str(e)}", xbmc.LOGWARNING)
+            cached_results = None
+        metrics.count('search_cache.hit' if cached_results is not None else 'search_cache.miss')
+        if cached_results is not None:
+            log(f"Search cache hit: {len(cached_results)} result(s)", xbmc.LOGINFO)
+            cache.close()
+            cached_results, scores = rank_results(cached_results, title, year)
+            start_prefetch(cached_results)
+            return cached_results, scores
+        try:
+            known_miss = cache.is_miss(search_query, search_engine_id)
+        except Exception as e:
+            log(f"Search cache lookup failed: {str(e)}", xbmc.LOGWARNING)
+            known_miss = False
+        if known_miss:
+            # Searched before without fanedit.org listings (e.g. a retail movie)
+            log("Search cache hit: no fanedit.org listings for this query", xbmc.LOGINFO)
+            metrics.count('search_cache.negative_hit')
+            cache.close()
+            return [], []
+    
+    # Network modules are only needed on a cache miss
+    import urllib.error
+    from resources.lib import scraper
+    from resources.lib.quota import QuotaExceeded
+    from resources.lib.ranking import query_variants, rank_hits
+    
+    # The primary query is search_query; the others catch a wrong year or a dropped word
+    queries = [search_query]
+    if get_addon().getSettingBool('search_variants'):
+        queries = query_variants(kodi_title, kodi_year)
+    log(f"API queries: {queries}", xbmc.LOGDEBUG)
     
-    # Build API URL with proper parameter encoding
-    base_url = "https://www.googleapis.com/customsearch/v1"
-    params = {
-        'key': api_key,
-        'cx': search_engine_id,
-        'q': search_query
-    }
-    api_url = f"{base_url}?{urllib.parse.urlencode(params)}"
+    governor = open_quota_governor()
     
-    log(f"API URL: {api_url}", xbmc.LOGDEBUG)
+    fetch_search_page = get_fetcher().fetch_search_page
+    
+    def fetch_page(api_url):
+        # Every result page waits for the shared rate limit and counts against the quota
+        if governor is None:
+            return fetch_search_page(api_url)
+        return governor.call(fetch_search_page, api_url, max_wait=QUOTA_MAX_WAIT)
+    
+    def fetch_variant(api_url):
+        # Variants never delay the search: without a free query they are dropped
+        # (a dropped variant is not a denied query)
+        if governor is None:
+            return fetch_search_page(api_url)
+        if not governor.try_acquire():
+            return [], 0
+        return governor.run(fetch_search_page, api_url)
     
     try:
-        # Fetch search results
-        with urllib.request.urlopen(api_url, timeout=30) as response:
-            data = json.loads(response.read().decode('utf-8'))
+        # Fetch search results concurrently (further pages only if the primary one is thin)
+        results, scores = rank_hits(
+            scraper.search_variants(
+                api_key, search_engine_id, queries, fetch_page=fetch_page, fetch_variant=fetch_variant
+            ),
+            title, year
+        )
         
-        if 'items' not in data:
+        if not results:
             log("No search results found", xbmc.LOGINFO)
-            return
+            if cache is not None:
+                try:
+                    ttl = cache.put_miss(search_query, search_engine_id)
+                    log(f"Not searching this query again for {ttl / 3600:.0f} hour(s)", xbmc.LOGDEBUG)
+                except Exception as e:
+                    log(f"Search cache update failed: {str(e)}", xbmc.LOGWARNING)
+            return [], []
         
-        # Process search results
-        for item in data['items']:
-            item_title = item.get('title', '')
-            item_url = item.get('link', '')
-            
-            # Only include results from fanedit.org
-            if 'fanedit.org' not in item_url:
-                continue
-            
-            # Create list item
-            listitem = xbmcgui.ListItem(item_title, offscreen=True)
-            
-            # Set URL for getdetails action
-            url = f"?action=getdetails&url={urllib.parse.quote(item_url)}"
-            
-            # Add to results
-            xbmcplugin.addDirectoryItem(
-                handle=handle,
-                url=url,
-                listitem=listitem,
-                isFolder=True
-            )
+        if cache is not None:
+            try:
+                cache.put(search_query, search_engine_id, results)
+            except Exception as e:
+                log(f"Search cache update failed: {str(e)}", xbmc.LOGWARNING)
+        
+        start_prefetch(results)
+        return results, scores
     
+    except QuotaExceeded as e:
+        log(f"Search skipped: {str(e)}", xbmc.LOGWARNING)
+        notify_quota(governor, e.reason)
     except urllib.error.HTTPError as e:
         log(f"HTTP Error: {e.code} - {e.reason}", xbmc.LOGERROR)
         xbmcgui.Dialog().notification(
@@ -120,136 +434,561 @@ def search_movie(title, year, handle):
             f"Search failed: {str(e)}",
             xbmcgui.NOTIFICATION_ERROR
         )
+    
+    finally:
+        if cache is not None:
+            cache.close()
+    return [], []
+
+
+def open_details_cache():
+    """
+    Open the persistent listing details cache if it is enabled in the addon settings
+
+    Returns:
+        DetailsCache instance, or None if caching is disabled or unavailable
+    """
+    from resources.lib.cache import DetailsCache
+    
+    if not get_addon().getSettingBool('details_cache_enabled'):
+        return None
+    try:
+        return DetailsCache(
+            os.path.join(get_profile_path(), 'details_cache.db'),
+            fresh_ttl=get_addon().getSettingInt('details_cache_ttl') * 3600,
+            max_age=get_addon().getSettingInt('details_cache_max_age') * 24 * 3600,
+            max_entries=get_addon().getSettingInt('details_cache_max_entries')
+        )
+    except Exception as e:
+        log(f"Details cache unavailable: {str(e)}", xbmc.LOGWARNING)
+        return None
+
+
+def fetch_listing(url, etag=None, last_modified=None, timeout=None):
+    """
+    Fetch a fanedit.org listing page, revalidating a cached copy if validators are given
+    
+    Args:
+        url: URL of the fanedit.org page
+        etag: ETag of the cached copy (optional)
+        last_modified: Last-Modified date of the cached copy (optional)
+        timeout: Socket timeout in seconds (default: scraper.TIMEOUT)
+    
+    Returns:
+        Tuple of (html, etag, last_modified). html is None if the server
+        answered 304 Not Modified.
+    """
+    from resources.lib import scraper
+    
+    html, etag, last_modified, truncated = get_fetcher().fetch_listing(
+        url,
+        scraper.user_agent(get_addon().getAddonInfo('version')),
+        etag=etag,
+        last_modified=last_modified,
+        timeout=timeout or scraper.TIMEOUT
+    )
+    if truncated:
+        log(f"Stopped download after {len(html)} characters", xbmc.LOGDEBUG)
+    return html, etag, last_modified
+
+
+def parse_details(html):
+    """
+    Extract movie metadata from a fanedit.org listing page
+    
+    Args:
+        html: Page content
+    
+    Returns:
+        FaneditRecord
+    """
+    from resources.lib.records import parse_listing
+    
+    return parse_listing(html)
+
+
+def create_details_listitem(record, listing_id=None):
+    """
+    Build a Kodi ListItem from a parsed listing
+    
+    Args:
+        record: FaneditRecord returned by parse_details()
+        listing_id: fanedit.org listing ID, set as the default unique ID (optional)
+    
+    Returns:
+        xbmcgui.ListItem with the video info tag populated
+    """
+    import xbmcgui
+    
+    listitem = xbmcgui.ListItem(offscreen=True)
+    infotag = listitem.getVideoInfoTag()
+    infotag.setMediaType('movie')
+    
+    if listing_id is not None:
+        # Lets Kodi refresh the movie by ID instead of searching again
+        from resources.lib.records import UNIQUE_ID_TYPE
+        infotag.setUniqueIDs({UNIQUE_ID_TYPE: listing_id}, UNIQUE_ID_TYPE)
+        log(f"Unique ID: {listing_id}", xbmc.LOGDEBUG)
+    
+    if record.title is not None:
+        infotag.setTitle(record.title)
+        log(f"Title: {record.title}", xbmc.LOGDEBUG)
+    
+    if record.plot is not None:
+        infotag.setPlot(record.plot)
+        log(f"Plot: {record.plot[:50]}...", xbmc.LOGDEBUG)
+    
+    if record.year is not None:
+        infotag.setYear(record.year)
+        log(f"Year: {record.year}", xbmc.LOGDEBUG)
+    
+    if record.genres:
+        infotag.setGenres(list(record.genres))
+        log(f"Genres: {', '.join(record.genres)}", xbmc.LOGDEBUG)
+    
+    if record.directors:
+        infotag.setDirectors(list(record.directors))
+        log(f"Directors: {', '.join(record.directors)}", xbmc.LOGDEBUG)
+    
+    if record.rating is not None:
+        infotag.setRating(record.rating)
+        log(f"Rating: {record.rating}", xbmc.LOGDEBUG)
+    
+    if record.votes is not None:
+        # Note: Kodi's InfoTagVideo doesn't have a dedicated votes field for user ratings
+        # The rating is stored above with setRating() which is the primary metadata
+        log(f"Votes: {record.votes}", xbmc.LOGDEBUG)
+    
+    if record.tagline is not None:
+        infotag.setTagLine(record.tagline)
+        log(f"Tagline: {record.tagline}", xbmc.LOGDEBUG)
+    
+    if record.thumb is not None:
+        listitem.setArt({'thumb': record.thumb, 'poster': record.thumb})
+        log(f"Thumbnail: {record.thumb}", xbmc.LOGDEBUG)
+    
+    return listitem
+
+
+def load_stored(url):
+    """
+    Look up a listing in the record store exported with the local catalogue
+    
+    Args:
+        url: URL of the fanedit.org page
+    
+    Returns:
+        FaneditRecord, or None if there is no store or the listing is not in it
+    """
+    from resources.lib.record_store import RecordStore, store_path
+    
+    store = RecordStore(store_path(get_catalogue_path()))
+    try:
+        if not store.exists():
+            return None
+        return store.get(url)
+    except Exception as e:
+        log(f"Record store lookup failed: {str(e)}", xbmc.LOGWARNING)
+        return None
+    finally:
+        store.close()
+
+
+def load_details(url, cache, serve_stale=False):
+    """
+    Return the parsed record of a listing, using and revalidating the details cache
+    
+    Listings missing from the details cache are taken from the local
+    catalogue's record store when local search is enabled, before the page is
+    fetched.
+    
+    Args:
+        url: URL of the fanedit.org page
+        cache: DetailsCache instance, or None if caching is disabled
+        serve_stale: Return a stale cached record right away and revalidate
+            it in the background (see start_refresh())
+    
+    Returns:
+        FaneditRecord
+    """
+    entry = None
+    if cache is not None:
+        try:
+            entry = cache.get(url)
+        except Exception as e:
+            log(f"Details cache lookup failed: {str(e)}", xbmc.LOGWARNING)
+    
+    from resources.lib import metrics
+    
+    if entry is not None and entry['fresh']:
+        log(f"Details cache hit: {url}", xbmc.LOGINFO)
+        metrics.count('details_cache.hit')
+        remember_listing(url, entry['record'], entry['validated'], cache.fresh_ttl)
+        return entry['record']
+    if entry is not None and serve_stale:
+        log(f"Details cache hit (stale): {url}", xbmc.LOGINFO)
+        metrics.count('details_cache.stale')
+        start_refresh(url, cache)
+        return entry['record']
+    metrics.count('details_cache.miss')
+    
+    if entry is None and get_addon().getSettingInt('search_source') in (SEARCH_LOCAL, SEARCH_LOCAL_FIRST):
+        record = load_stored(url)
+        if record is not None:
+            log(f"Record store hit: {url}", xbmc.LOGINFO)
+            metrics.count('record_store.hit')
+            return record
+    
+    record = revalidate_listing(url, cache, entry)
+    if cache is not None:
+        remember_listing(url, record, None, cache.fresh_ttl)
+    return record
+
+
+def recall_listing(url):
+    """Return a listing the scraper service holds in memory, or None"""
+    if _details_memory is None:
+        return None
+    record = _details_memory.get(url)
+    if record is not None:
+        from resources.lib import metrics
+        
+        log(f"Details memory hit: {url}", xbmc.LOGINFO)
+        metrics.count('details_cache.memory_hit')
+    return record
+
+
+def remember_listing(url, record, validated, fresh_ttl):
+    """
+    Keep a fresh listing in the scraper service's memory until it goes stale
+    
+    Args:
+        url: URL of the fanedit.org page
+        record: FaneditRecord
+        validated: Time of the last fetch or revalidation (None: just now)
+        fresh_ttl: Freshness lifetime of the details cache in seconds
+    """
+    if _details_memory is None:
+        return
+    import time
+    
+    ttl = fresh_ttl if validated is None else validated + fresh_ttl - time.time()
+    _details_memory.put(url, record, min(ttl, SERVICE_MEMORY_TTL))
+
+
+def revalidate_listing(url, cache, entry, timeout=None):
+    """
+    Fetch a listing, with a conditional request if there is a cached entry, and update the cache
+    
+    Args:
+        url: URL of the fanedit.org page
+        cache: DetailsCache instance, or None if caching is disabled
+        entry: Cached entry returned by DetailsCache.get(), or None
+        timeout: Socket timeout in seconds (optional)
+    
+    Returns:
+        FaneditRecord
+    """
+    from resources.lib import metrics
+    
+    # Fetch page content, revalidating the cached copy if there is one
+    html, etag, last_modified = fetch_listing(
+        url,
+        etag=entry['etag'] if entry else None,
+        last_modified=entry['last_modified'] if entry else None,
+        timeout=timeout
+    )
+    if html is None:
+        log(f"Details cache revalidated (304 Not Modified): {url}", xbmc.LOGINFO)
+        metrics.count('details_cache.revalidated')
+        cache.mark_validated(url)
+        return entry['record']
+    
+    with metrics.phase('listing.extract'):
+        record = parse_details(html)
+    if cache is not None:
+        try:
+            cache.put(url, record, etag, last_modified)
+        except Exception as e:
+            log(f"Details cache update failed: {str(e)}", xbmc.LOGWARNING)
+    return record
+
+
+def refresh_listing(url):
+    """Revalidate a stale listing in the details cache (runs in a background thread)"""
+    cache = open_details_cache()
+    if cache is None:
+        return
+    try:
+        entry = cache.get(url)
+        # Another process may have refreshed it since
+        if entry is not None and not entry['fresh']:
+            revalidate_listing(url, cache, entry, timeout=REFRESH_TIMEOUT)
+            log(f"Refreshed stale listing {url}", xbmc.LOGDEBUG)
+    except Exception as e:
+        log(f"Background refresh failed for {url}: {str(e)}", xbmc.LOGWARNING)
+    finally:
+        try:
+            cache.finish_refresh(url)
+        finally:
+            cache.close()
+
+
+def start_refresh(url, cache):
+    """
+    Revalidate a stale listing in a background thread
+    
+    The thread runs while Kodi already has the stale details, and
+    finish_prefetch() waits for it before the script exits. At most
+    REFRESH_LIMIT refreshes run at once across all scraper processes; a
+    listing that could not be claimed stays stale and is tried again by the
+    next getdetails call for it.
+    """
+    global _prefetch_executor
+    
+    try:
+        claimed = cache.claim_refresh(url, REFRESH_LIMIT, REFRESH_LEASE)
+    except Exception as e:
+        log(f"Details cache refresh claim failed: {str(e)}", xbmc.LOGWARNING)
+        claimed = False
+    if not claimed:
+        log(f"Not refreshing {url} now (already running or at the limit)", xbmc.LOGDEBUG)
+        return
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+    _prefetch_executor.submit(refresh_listing, url)
+
+
+def open_artwork_store():
+    """
+    Open the local poster cache if it is enabled in the addon settings
+
+    Returns:
+        ArtworkStore instance, or None if the cache is disabled or unavailable
+    """
+    from resources.lib.artwork import POSTER_SIZE, ArtworkStore
+    
+    if not get_addon().getSettingBool('artwork_cache_enabled'):
+        return None
+    try:
+        return ArtworkStore(
+            os.path.join(get_profile_path(), 'artwork'),
+            max_bytes=get_addon().getSettingInt('artwork_cache_max_size') * 1024 * 1024,
+            poster_size=POSTER_SIZE if get_addon().getSettingBool('artwork_downscale') else None
+        )
+    except Exception as e:
+        log(f"Artwork cache unavailable: {str(e)}", xbmc.LOGWARNING)
+        return None
+
+
+def cache_artwork(url):
+    """Download an image into the artwork cache unless it is there already (runs in a background thread)"""
+    from resources.lib import metrics, scraper
+    
+    store = open_artwork_store()
+    if store is None:
+        return
+    try:
+        if store.get(url) is not None:
+            return
+        with metrics.phase('artwork.download'):
+            data = get_fetcher().fetch_bytes(
+                url,
+                scraper.user_agent(get_addon().getAddonInfo('version')),
+                max_bytes=ARTWORK_MAX_BYTES,
+                timeout=ARTWORK_TIMEOUT
+            )
+        metrics.count('artwork.bytes', len(data))
+        with metrics.phase('artwork.store'):
+            path = store.put(url, data)
+        log(f"Cached artwork {url} as {path}", xbmc.LOGDEBUG)
+    except Exception as e:
+        log(f"Artwork download failed for {url}: {str(e)}", xbmc.LOGWARNING)
+    finally:
+        store.close()
+
+
+def localize_artwork(record):
+    """
+    Point the poster at its local copy in the artwork cache
+    
+    If the poster is not cached yet, the fanedit.org URL is kept for this call
+    and the image is downloaded in the background for the next one.
+    
+    Args:
+        record: FaneditRecord returned by parse_details()
+    
+    Returns:
+        record, or a copy with thumb replaced by a local path
+    """
+    global _artwork_executor
+    
+    thumb = record.thumb
+    if not thumb:
+        return record
+    store = open_artwork_store()
+    if store is None:
+        return record
+    try:
+        path = store.get(thumb)
+    except Exception as e:
+        log(f"Artwork cache lookup failed: {str(e)}", xbmc.LOGWARNING)
+        path = None
+    finally:
+        store.close()
+    
+    from resources.lib import metrics
+    
+    if path is not None:
+        log(f"Artwork cache hit: {thumb}", xbmc.LOGDEBUG)
+        metrics.count('artwork_cache.hit')
+        return record.replace(thumb=path)
+    metrics.count('artwork_cache.miss')
+    
+    if _artwork_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _artwork_executor = ThreadPoolExecutor(max_workers=ARTWORK_WORKERS)
+    _artwork_executor.submit(cache_artwork, thumb)
+    return record
+
+
+def prefetch_listing(url):
+    """Fetch and parse a listing into the details cache, with its poster (runs in a prefetch thread)"""
+    cache = open_details_cache()
+    if cache is None:
+        return
+    try:
+        record = load_details(url, cache)
+    except Exception as e:
+        log(f"Prefetch failed for {url}: {str(e)}", xbmc.LOGWARNING)
+        return
+    finally:
+        cache.close()
+    if record.thumb:
+        cache_artwork(record.thumb)
+
+
+def start_prefetch(results):
+    """
+    Speculatively fetch the top search results into the details cache
+    
+    Kodi usually calls getdetails on the first result straight after a search,
+    which then becomes a local cache lookup. The pages are fetched in
+    background threads while Kodi already shows the search results;
+    finish_prefetch() waits for them before the script exits.
+    
+    Args:
+        results: List of (title, url) tuples, best match first
+    """
+    global _prefetch_executor
+    
+    addon = get_addon()
+    count = addon.getSettingInt('prefetch_count')
+    if not addon.getSettingBool('prefetch_enabled') or count <= 0:
+        return
+    if not addon.getSettingBool('details_cache_enabled'):
+        return
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    urls = [url for _, url in results[:count]]
+    if not urls:
+        return
+    log(f"Prefetching {len(urls)} listing(s)", xbmc.LOGDEBUG)
+    if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+    for url in urls:
+        _prefetch_executor.submit(prefetch_listing, url)
+
+
+def finish_prefetch():
+    """Wait for running prefetch threads and artwork downloads to finish"""
+    global _prefetch_executor, _artwork_executor
+    if _prefetch_executor is not None:
+        _prefetch_executor.shutdown(wait=True)
+        _prefetch_executor = None
+    if _artwork_executor is not None:
+        _artwork_executor.shutdown(wait=True)
+        _artwork_executor = None
+
+
+def start_metrics(action):
+    """Start recording per-phase timings and counters if enabled in the addon settings"""
+    if not get_addon().getSettingBool('metrics_enabled'):
+        return
+    from resources.lib import metrics
+    
+    metrics.start(action)
+
+
+def finish_metrics():
+    """Append the recorded timings and counters to the metrics file in the addon profile"""
+    from resources.lib import metrics
+    
+    if not metrics.enabled():
+        return
+    try:
+        metrics.finish(os.path.join(get_profile_path(), METRICS_FILE))
+    except Exception as e:
+        log(f"Writing metrics failed: {str(e)}", xbmc.LOGWARNING)
 
 
 def get_details(url, handle):
     """
     Get movie details from fanedit.org page
     
+    A listing ID (or a JSON object of unique IDs) is accepted in place of the
+    URL, so a movie refreshed by its unique ID costs no search: at most one
+    conditional request when its details cache entry is stale.
+    
     Args:
-        url: URL of the fanedit.org page
+        url: URL of the fanedit.org page, or a listing ID
         handle: Kodi plugin handle
     """
+    details = lookup_details(url)
+    if details is not None:
+        add_details(*details, handle)
+
+
+def lookup_details(url):
+    """
+    Load a listing's details without listing them (see get_details())
+    
+    The scraper service runs this for getdetails calls forwarded to it.
+    Errors are logged and notified here, and give None.
+    
+    Args:
+        url: URL of the fanedit.org page, or a listing ID
+    
+    Returns:
+        Tuple of (url, record): the listing URL and its FaneditRecord, with the
+        poster from the local artwork cache when available; or None
+    """
+    import xbmcgui
+    
+    from resources.lib.records import resolve_listing
+    
+    resolved = resolve_listing(url)
+    if resolved is not None and resolved != url:
+        log(f"Listing ID {url} resolved to {resolved}", xbmc.LOGDEBUG)
+        url = resolved
     log(f"Getting details from: {url}", xbmc.LOGINFO)
     
     try:
-        # Fetch page content
-        req = urllib.request.Request(url)
-        # Include addon version in User-Agent for website admins and debugging
-        addon_version = ADDON.getAddonInfo('version')
-        req.add_header('User-Agent', f'Kodi-IFDB/{addon_version} (https://kodi.tv)')
-        
-        with urllib.request.urlopen(req, timeout=30) as response:
-            html = response.read().decode('utf-8')
+        record = recall_listing(url)
+        if record is None:
+            cache = open_details_cache()
+            try:
+                record = load_details(url, cache, serve_stale=get_addon().getSettingBool('details_cache_stale'))
+            finally:
+                if cache is not None:
+                    cache.close()
         
-        # Create list item
-        listitem = xbmcgui.ListItem(offscreen=True)
-        infotag = listitem.getVideoInfoTag()
-        infotag.setMediaType('movie')
-        
-        # Extract title
-        title_match = re.search(r'<h1[^>]*>([^<]+)</h1>', html)
-        if title_match:
-            title = title_match.group(1).strip()
-            infotag.setTitle(title)
-            log(f"Title: {title}", xbmc.LOGDEBUG)
-        
-        # Extract plot/synopsis
-        plot_match = re.search(
-            r'<div class="jrBriefsynopsis jrFieldRow">[\s\S]*?<div class="jrFieldValue">(.*?)</div>',
-            html,
-            re.DOTALL
-        )
-        if plot_match:
-            plot = re.sub(r'<[^>]+>', '', plot_match.group(1))  # Strip HTML tags
-            plot = plot.strip()
-            infotag.setPlot(plot)
-            log(f"Plot: {plot[:50]}...", xbmc.LOGDEBUG)
-        
-        # Extract year
-        year_match = re.search(
-            r'<div class="jrFaneditreleasedate jrFieldRow">[\s\S]*?<div class="jrFieldValue">[\s\S]*?([0-9]{4})',
-            html
-        )
-        if year_match:
-            year = int(year_match.group(1))
-            infotag.setYear(year)
-            log(f"Year: {year}", xbmc.LOGDEBUG)
-        
-        # Extract genres
-        genre_section_match = re.search(
-            r'<div class="jrGenre jrFieldRow">[\s\S]*?<ul class="jrFieldValueList">(.*?)</ul>',
-            html,
-            re.DOTALL
-        )
-        if genre_section_match:
-            genre_html = genre_section_match.group(1)
-            genres = re.findall(r'<li><a[^>]*>([^<]+)</a></li>', genre_html)
-            if genres:
-                infotag.setGenres(genres)
-                log(f"Genres: {', '.join(genres)}", xbmc.LOGDEBUG)
-        
-        # Extract directors (faneditors)
-        director_section_match = re.search(
-            r'<div class="jrFaneditorname jrFieldRow">[\s\S]*?<ul class="jrFieldValueList">(.*?)</ul>',
-            html,
-            re.DOTALL
-        )
-        if director_section_match:
-            director_html = director_section_match.group(1)
-            directors = re.findall(r'<li><a[^>]*>([^<]+)</a></li>', director_html)
-            if directors:
-                infotag.setDirectors(directors)
-                log(f"Directors: {', '.join(directors)}", xbmc.LOGDEBUG)
-        
-        # Extract rating
-        rating_match = re.search(
-            r'<span[^>]*>Rating:[\s]*([\d.]+)[\s]*/[\s]*10',
-            html
-        )
-        if rating_match:
-            rating = float(rating_match.group(1))
-            infotag.setRating(rating)
-            log(f"Rating: {rating}", xbmc.LOGDEBUG)
-        
-        # Extract votes
-        votes_match = re.search(
-            r'<span[^>]*>\(([0-9]+)[\s]*votes?\)</span>',
-            html
-        )
-        if votes_match:
-            votes = int(votes_match.group(1))
-            # Note: Kodi's InfoTagVideo doesn't have a dedicated votes field for user ratings
-            # The rating is stored above with setRating() which is the primary metadata
-            log(f"Votes: {votes}", xbmc.LOGDEBUG)
-        
-        # Extract tagline
-        tagline_match = re.search(
-            r'<li><strong>Tagline:</strong>[\s]*([^<]+)</li>',
-            html
-        )
-        if tagline_match:
-            tagline = tagline_match.group(1).strip()
-            infotag.setTagLine(tagline)
-            log(f"Tagline: {tagline}", xbmc.LOGDEBUG)
-        
-        # Extract thumbnail/poster
-        thumb_match = re.search(
-            r'<div class="jrListingMainImage">[\s\S]*?<a href="([^"]+)"[^>]*class="fancybox"',
-            html
-        )
-        if thumb_match:
-            thumb_url = thumb_match.group(1)
-            listitem.setArt({'thumb': thumb_url, 'poster': thumb_url})
-            log(f"Thumbnail: {thumb_url}", xbmc.LOGDEBUG)
-        
-        # Add the item
-        xbmcplugin.addDirectoryItem(
-            handle=handle,
-            url=url,
-            listitem=listitem,
-            isFolder=False
-        )
+        # Poster from the local artwork cache when available
+        return url, localize_artwork(record)
     
     except Exception as e:
         log(f"Error getting details: {str(e)}", xbmc.LOGERROR)
@@ -258,10 +997,163 @@ def get_details(url, handle):
             f"Failed to get details: {str(e)}",
             xbmcgui.NOTIFICATION_ERROR
         )
+        return None
+
+
+def add_details(url, record, handle):
+    """
+    Add a listing's details to the Kodi directory listing
+    
+    Args:
+        url: URL of the fanedit.org page
+        record: FaneditRecord returned by lookup_details()
+        handle: Kodi plugin handle
+    """
+    import xbmcplugin
+    
+    from resources.lib import metrics
+    from resources.lib.records import listing_id
+    
+    with metrics.phase('listitem'):
+        listitem = create_details_listitem(record, listing_id(url))
+    
+    # Add the item
+    xbmcplugin.addDirectoryItem(
+        handle=handle,
+        url=url,
+        listitem=listitem,
+        isFolder=False
+    )
+
+
+def find_nfo_url(nfo, handle):
+    """
+    Return the fanedit.org listing an .nfo file points at, without a search
+    
+    Kodi calls getdetails on the returned URL directly, so a library whose
+    .nfo files name their listing costs no API queries.
+    
+    Args:
+        nfo: Contents of the .nfo file
+        handle: Kodi plugin handle
+    """
+    from resources.lib.records import find_listing_url
+    
+    url = find_listing_url(nfo)
+    if url is None:
+        log("No fanedit.org listing in the .nfo", xbmc.LOGDEBUG)
+        return
+    
+    import xbmcgui
+    import xbmcplugin
+    
+    log(f"NFO points at {url}", xbmc.LOGINFO)
+    xbmcplugin.addDirectoryItem(
+        handle=handle,
+        url=url,
+        listitem=xbmcgui.ListItem(url, offscreen=True),
+        isFolder=True
+    )
+
+
+def start_service():
+    """
+    Prepare this process to answer calls as the scraper service (see service.py)
+    
+    Requests go through one EngineThread with keep-alive connections, fresh
+    listings are kept in memory, and the prefetch and artwork threads stay up
+    between calls instead of being waited for.
+    """
+    global _fetcher, _details_memory, _prefetch_executor, _artwork_executor
+    from concurrent.futures import ThreadPoolExecutor
+    
+    from resources.lib import scraper
+    from resources.lib.cache import MemoryCache
+    from resources.lib.fetch_engine import EngineThread
+    
+    _fetcher = EngineThread(
+        scraper.user_agent(get_addon().getAddonInfo('version')), concurrency=SERVICE_CONNECTIONS
+    )
+    _details_memory = MemoryCache(SERVICE_MEMORY_ENTRIES)
+    _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+    _artwork_executor = ThreadPoolExecutor(max_workers=ARTWORK_WORKERS)
+
+
+def stop_service():
+    """Wait for background work and close the connections opened by start_service()"""
+    global _fetcher, _details_memory
+    finish_prefetch()
+    if _fetcher is not None:
+        _fetcher.close()
+    _fetcher = _details_memory = None
+
+
+def reload_settings():
+    """Pick up changed addon settings in the scraper service"""
+    global _addon
+    _addon = None
+    # Listings were kept under the old cache settings
+    if _details_memory is not None:
+        _details_memory.clear()
+
+
+def serve_call(action, params):
+    """
+    Answer a call forwarded to the scraper service by forward_call()
+    
+    Returns:
+        JSON-serialisable reply: the results of find_movie(), or the details
+        of lookup_details()
+    """
+    if action == 'find':
+        results, scores = find_movie(params.get('title', ''), params.get('year', ''))
+        return {'results': results, 'scores': scores}
+    if action == 'getdetails':
+        details = lookup_details(params['url'])
+        if details is None:
+            return {'details': None}
+        url, record = details
+        return {'details': {'url': url, 'record': record.to_dict()}}
+    raise ValueError(f"Unsupported action: {action}")
+
+
+def forward_call(action, params):
+    """
+    Hand a find or getdetails call to the scraper service, if it is running
+    
+    A call the service took but could not answer is not run again here (it
+    would repeat its API queries): the failure is reported and the reply is empty.
+    
+    Returns:
+        The reply of serve_call(), or None if the call has to run in this process
+    """
+    from resources.lib import metrics, service
+    
+    try:
+        with metrics.phase('service'):
+            reply = service.call(get_profile_path(), action, params)
+    except service.ServiceUnavailable as e:
+        log(f"Scraper service unavailable ({str(e)}), running {action} here", xbmc.LOGDEBUG)
+        return None
+    except service.ServiceCallFailed as e:
+        import xbmcgui
+        
+        log(f"Scraper service {action} failed: {str(e)}", xbmc.LOGERROR)
+        metrics.count('service.failed')
+        xbmcgui.Dialog().notification(
+            "IFDB Scraper Error",
+            "The scraper service failed, see the log",
+            xbmcgui.NOTIFICATION_ERROR
+        )
+        return {'results': [], 'scores': []} if action == 'find' else {'details': None}
+    metrics.count('service.calls')
+    return reply
 
 
 def main():
     """Main entry point for the scraper"""
+    import xbmcplugin
+    
     log(f"IFDB Scraper called with args: {sys.argv}", xbmc.LOGDEBUG)
     
     params = get_params()
@@ -273,19 +1165,38 @@ def main():
         # Search for movies
         title = params.get('title', '')
         year = params.get('year', '')
-        search_movie(title, year, handle)
+        start_metrics(action)
+        reply = forward_call(action, {'title': title, 'year': year})
+        if reply is not None:
+            add_search_results(reply['results'], handle, reply['scores'])
+        else:
+            search_movie(title, year, handle)
         xbmcplugin.endOfDirectory(handle)
+        # Results are already with Kodi; let prefetched listings land in the cache
+        finish_prefetch()
+        finish_metrics()
     
     elif action == 'getdetails':
         # Get movie details
         url = params.get('url', '')
+        start_metrics(action)
         if url:
-            get_details(url, handle)
+            reply = forward_call(action, {'url': url})
+            if reply is None:
+                get_details(url, handle)
+            elif reply['details'] is not None:
+                from resources.lib.records import FaneditRecord
+                
+                details = reply['details']
+                add_details(details['url'], FaneditRecord.from_dict(details['record']), handle)
         xbmcplugin.endOfDirectory(handle)
+        # Details are already with Kodi; let a missing poster land in the artwork cache
+        finish_prefetch()
+        finish_metrics()
     
     elif action == 'NfoUrl':
-        # Handle NFO URL (not implemented for this scraper)
-        log("NfoUrl action called (not implemented)", xbmc.LOGINFO)
+        # Listing named in the .nfo: no search needed
+        find_nfo_url(params.get('nfo', ''), handle)
         xbmcplugin.endOfDirectory(handle)
     
     else:
@@ -0,0 +1,4 @@
+"""
+Helper modules for the IFDB scraper.
+These modules do not import any xbmc* module so they can be tested outside Kodi.
+"""
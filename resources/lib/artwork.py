@@ -0,0 +1,188 @@
+"""
+Local poster cache for the IFDB scraper
+
+Posters are downloaded in the background and stored under the addon profile,
+named by the SHA-256 of their content (so two URLs serving the same image
+share a file). The ListItem is pointed at the local file instead of the
+full-size original on fanedit.org. The store is kept under a byte budget by
+evicting the least recently used images.
+
+If Pillow is available (e.g. Kodi's script.module.pil), posters larger than
+Kodi's poster views are downscaled before they are stored.
+"""
+
+import hashlib
+import io
+import os
+import time
+
+from resources.lib.cache import open_database
+
+# Downscaled posters fit in this box (Kodi's poster views show at most ~1000x1500)
+POSTER_SIZE = (1000, 1500)
+JPEG_QUALITY = 85
+
+# Recognised image formats by their leading bytes
+_SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+
+
+def image_extension(data):
+    """Return the file extension for image data, or None if it is not a known image format"""
+    for signature, extension in _SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def downscale(data, size=POSTER_SIZE):
+    """
+    Shrink an image to fit in `size`, if Pillow is available
+
+    Returns:
+        JPEG data of the downscaled image, or the original data if Pillow is
+        missing, the image already fits or re-encoding would not make it smaller
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width <= size[0] and image.height <= size[1]:
+                return data
+            image.thumbnail(size)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    except Exception:
+        return data
+    return output.getvalue() if output.tell() < len(data) else data
+
+
+class ArtworkStore:
+    """
+    Content-addressed image files with an SQLite index of source URLs
+
+    When the files take more than `max_bytes`, the least recently used
+    images are deleted.
+    """
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, poster_size=POSTER_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.poster_size = poster_size
+        self._conn = open_database(os.path.join(directory, 'artwork.db'))
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS artwork ('
+            ' url TEXT PRIMARY KEY,'
+            ' filename TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' created REAL NOT NULL,'
+            ' accessed REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS artwork_accessed ON artwork (accessed)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS artwork_filename ON artwork (filename)'
+        )
+        self._conn.commit()
+
+    def get(self, url):
+        """
+        Look up the local copy of an image
+
+        Returns:
+            Absolute path of the stored file, or None if the image is not stored
+        """
+        row = self._conn.execute('SELECT filename FROM artwork WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        path = os.path.join(self.directory, row[0])
+        if not os.path.exists(path):
+            # Deleted behind our back; download it again
+            self._conn.execute('DELETE FROM artwork WHERE url = ?', (url,))
+            self._conn.commit()
+            return None
+        self._conn.execute('UPDATE artwork SET accessed = ? WHERE url = ?', (time.time(), url))
+        self._conn.commit()
+        return path
+
+    def put(self, url, data):
+        """
+        Store a downloaded image (downscaled first if enabled)
+
+        Returns:
+            Absolute path of the stored file
+
+        Raises:
+            ValueError: data is not a JPEG, PNG, GIF or WebP image
+        """
+        if image_extension(data) is None:
+            raise ValueError(f"Not an image: {url}")
+        if self.poster_size:
+            data = downscale(data, self.poster_size)
+        digest = hashlib.sha256(data).hexdigest()
+        filename = f"{digest[:2]}/{digest}{image_extension(data)}"
+        path = os.path.join(self.directory, filename)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write under a temporary name so readers never see a partial file
+            partial = f"{path}.{os.getpid()}.{id(data)}.part"
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, path)
+
+        now = time.time()
+        self._conn.execute(
+            'INSERT OR REPLACE INTO artwork (url, filename, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+            (url, filename, len(data), now, now)
+        )
+        self._conn.commit()
+        self._evict()
+        return path
+
+    def total_bytes(self):
+        """Return the size of the stored files (shared files counted once)"""
+        row = self._conn.execute(
+            'SELECT SUM(size) FROM (SELECT MAX(size) AS size FROM artwork GROUP BY filename)'
+        ).fetchone()
+        return row[0] or 0
+
+    def _evict(self):
+        """Delete least recently used images until the files fit in max_bytes"""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        for url, filename, size in self._conn.execute(
+            'SELECT url, filename, size FROM artwork ORDER BY accessed'
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute('DELETE FROM artwork WHERE url = ?', (url,))
+            shared = self._conn.execute(
+                'SELECT 1 FROM artwork WHERE filename = ? LIMIT 1', (filename,)
+            ).fetchone()
+            if shared is None:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+                total -= size
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM artwork').fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection"""
+        self._conn.close()
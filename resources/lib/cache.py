@@ -0,0 +1,428 @@
+"""
+Persistent caches for the IFDB scraper
+Stored as SQLite databases (WAL mode) in the addon profile directory; the
+scraper service keeps a MemoryCache in front of the details cache
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from resources.lib.records import FaneditRecord, SearchHit
+
+
+def normalize_query(query):
+    """Normalize a search query so trivially different queries share a cache entry"""
+    return ' '.join(query.casefold().split())
+
+
+def open_database(path):
+    """Open (and create if needed) an SQLite database in WAL mode"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def _load_record(stored):
+    # Entries written before records were introduced hold a dict of fields
+    values = json.loads(stored)
+    if isinstance(values, dict):
+        return FaneditRecord.from_dict(values)
+    return FaneditRecord.from_list(values)
+
+
+class SearchCache:
+    """
+    Cache of Google Custom Search results keyed by normalized query and search engine ID
+
+    Entries expire after `ttl` seconds. When more than `max_entries` entries are
+    stored, the least recently used entries are evicted.
+
+    Queries without fanedit.org listings are cached separately as misses. A
+    miss expires after `negative_ttl` seconds; each repeated miss of the same
+    query doubles that, up to `negative_max_ttl`. A miss count is forgotten
+    when its entry has been expired for `negative_max_ttl` seconds.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=5000,
+                 negative_ttl=24 * 3600, negative_max_ttl=30 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.negative_max_ttl = negative_max_ttl
+        self._conn = open_database(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS search_cache ('
+            ' engine_id TEXT NOT NULL,'
+            ' query TEXT NOT NULL,'
+            ' results TEXT NOT NULL,'
+            ' created REAL NOT NULL,'
+            ' accessed REAL NOT NULL,'
+            ' PRIMARY KEY (engine_id, query))'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS search_misses ('
+            ' engine_id TEXT NOT NULL,'
+            ' query TEXT NOT NULL,'
+            ' misses INTEGER NOT NULL,'
+            ' created REAL NOT NULL,'
+            ' expires REAL NOT NULL,'
+            ' PRIMARY KEY (engine_id, query))'
+        )
+        self._conn.commit()
+
+    def get(self, query, engine_id):
+        """
+        Look up cached results
+
+        Returns:
+            List of SearchHit (title, url) tuples, or None on a miss or an expired entry
+        """
+        key = normalize_query(query)
+        now = time.time()
+        row = self._conn.execute(
+            'SELECT results, created FROM search_cache WHERE engine_id = ? AND query = ?',
+            (engine_id, key)
+        ).fetchone()
+        if row is None:
+            return None
+        results, created = row
+        if now - created > self.ttl:
+            with self._conn:
+                self._conn.execute(
+                    'DELETE FROM search_cache WHERE engine_id = ? AND query = ?',
+                    (engine_id, key)
+                )
+            return None
+        with self._conn:
+            self._conn.execute(
+                'UPDATE search_cache SET accessed = ? WHERE engine_id = ? AND query = ?',
+                (now, engine_id, key)
+            )
+        return [SearchHit(*result) for result in json.loads(results)]
+
+    def put(self, query, engine_id, results):
+        """
+        Store results for a query
+
+        Args:
+            query: Search query as sent to the API
+            engine_id: Custom Search Engine ID the query was run against
+            results: List of (title, url) tuples
+        """
+        key = normalize_query(query)
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO search_cache (engine_id, query, results, created, accessed) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (engine_id, key, json.dumps([list(result) for result in results]), now, now)
+            )
+            # The query has listings now
+            self._conn.execute('DELETE FROM search_misses WHERE engine_id = ? AND query = ?', (engine_id, key))
+            self._evict()
+
+    def is_miss(self, query, engine_id):
+        """Return True if the query is cached as having no fanedit.org listings"""
+        row = self._conn.execute(
+            'SELECT expires FROM search_misses WHERE engine_id = ? AND query = ?',
+            (engine_id, normalize_query(query))
+        ).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def put_miss(self, query, engine_id):
+        """
+        Record that a query found no fanedit.org listings
+
+        Returns:
+            Seconds until the miss expires
+        """
+        key = normalize_query(query)
+        now = time.time()
+        with self._conn:
+            row = self._conn.execute(
+                'SELECT misses, expires FROM search_misses WHERE engine_id = ? AND query = ?',
+                (engine_id, key)
+            ).fetchone()
+            misses = row[0] + 1 if row is not None and now - row[1] < self.negative_max_ttl else 1
+            ttl = min(self.negative_max_ttl, self.negative_ttl * 2 ** (misses - 1))
+            self._conn.execute(
+                'INSERT OR REPLACE INTO search_misses (engine_id, query, misses, created, expires) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (engine_id, key, misses, now, now + ttl)
+            )
+            self._evict_misses()
+        return ttl
+
+    def misses(self, engine_id=None):
+        """
+        List the cached misses, latest first
+
+        Returns:
+            List of dicts with engine_id, query, misses (count), created and
+            expires (timestamps); entries past `expires` are kept for their count
+        """
+        sql = 'SELECT engine_id, query, misses, created, expires FROM search_misses'
+        params = ()
+        if engine_id is not None:
+            sql += ' WHERE engine_id = ?'
+            params = (engine_id,)
+        rows = self._conn.execute(sql + ' ORDER BY created DESC', params).fetchall()
+        return [dict(zip(('engine_id', 'query', 'misses', 'created', 'expires'), row)) for row in rows]
+
+    def purge_misses(self, query=None, engine_id=None):
+        """
+        Delete cached misses, so the queries are searched again
+
+        Args:
+            query: Only this query (optional)
+            engine_id: Only misses of this search engine ID (optional)
+
+        Returns:
+            Number of entries deleted
+        """
+        conditions = []
+        params = []
+        if query is not None:
+            conditions.append('query = ?')
+            params.append(normalize_query(query))
+        if engine_id is not None:
+            conditions.append('engine_id = ?')
+            params.append(engine_id)
+        sql = 'DELETE FROM search_misses'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        with self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    def _evict_misses(self):
+        """Forget long-expired misses and trim the misses down to max_entries (oldest first)"""
+        self._conn.execute(
+            'DELETE FROM search_misses WHERE expires < ?', (time.time() - self.negative_max_ttl,)
+        )
+        self._conn.execute(
+            'DELETE FROM search_misses WHERE rowid IN ('
+            ' SELECT rowid FROM search_misses ORDER BY created DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def _evict(self):
+        """Drop expired entries and trim the cache down to max_entries (LRU)"""
+        self._conn.execute(
+            'DELETE FROM search_cache WHERE created < ?', (time.time() - self.ttl,)
+        )
+        self._conn.execute(
+            'DELETE FROM search_cache WHERE rowid IN ('
+            ' SELECT rowid FROM search_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM search_cache').fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection"""
+        self._conn.close()
+
+
+class DetailsCache:
+    """
+    Cache of parsed fanedit.org listing pages keyed by listing URL
+
+    Each entry stores the parsed FaneditRecord together with the ETag and Last-Modified
+    validators of the response. Entries younger than `fresh_ttl` seconds are used
+    without contacting fanedit.org; older entries are revalidated with a
+    conditional GET. Entries older than `max_age` seconds are discarded. When more
+    than `max_entries` entries are stored, the least recently used are evicted.
+
+    Background revalidations of stale entries are coordinated across processes
+    with claim_refresh() and finish_refresh().
+    """
+
+    def __init__(self, path, fresh_ttl=24 * 3600, max_age=30 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.fresh_ttl = fresh_ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._conn = open_database(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS details_cache ('
+            ' url TEXT PRIMARY KEY,'
+            ' fields TEXT NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' validated REAL NOT NULL,'
+            ' accessed REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS details_cache_accessed ON details_cache (accessed)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS details_refresh ('
+            ' url TEXT PRIMARY KEY,'
+            ' claimed REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, url):
+        """
+        Look up a cached listing
+
+        Returns:
+            Dict with 'record' (a FaneditRecord), 'etag', 'last_modified',
+            'validated' (timestamp of the last fetch or revalidation) and
+            'fresh' keys, or None
+        """
+        now = time.time()
+        row = self._conn.execute(
+            'SELECT fields, etag, last_modified, validated FROM details_cache WHERE url = ?',
+            (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        fields, etag, last_modified, validated = row
+        with self._conn:
+            if now - validated > self.max_age:
+                self._conn.execute('DELETE FROM details_cache WHERE url = ?', (url,))
+                return None
+            self._conn.execute(
+                'UPDATE details_cache SET accessed = ? WHERE url = ?', (now, url)
+            )
+        return {
+            'record': _load_record(fields),
+            'etag': etag,
+            'last_modified': last_modified,
+            'validated': validated,
+            'fresh': now - validated <= self.fresh_ttl,
+        }
+
+    def put(self, url, record, etag=None, last_modified=None):
+        """
+        Store the parsed record and response validators for a listing
+
+        Args:
+            url: Listing URL
+            record: FaneditRecord
+            etag: ETag response header, if any
+            last_modified: Last-Modified response header, if any
+        """
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO details_cache '
+                '(url, fields, etag, last_modified, validated, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (url, json.dumps(record.to_list(), separators=(',', ':')), etag, last_modified, now, now)
+            )
+            self._evict()
+
+    def mark_validated(self, url):
+        """Record that fanedit.org confirmed the cached listing is unchanged (HTTP 304)"""
+        with self._conn:
+            self._conn.execute(
+                'UPDATE details_cache SET validated = ? WHERE url = ?', (time.time(), url)
+            )
+
+    def claim_refresh(self, url, limit, lease):
+        """
+        Claim the background revalidation of a stale listing
+
+        Fails if another process is already refreshing the listing, or if
+        `limit` refreshes are running. A claim not finished within `lease`
+        seconds (e.g. its process was killed) lapses.
+
+        Returns:
+            True if the caller should refresh the listing and then call
+            finish_refresh()
+        """
+        now = time.time()
+        with self._conn:
+            self._conn.execute('DELETE FROM details_refresh WHERE claimed < ?', (now - lease,))
+            running = self._conn.execute('SELECT COUNT(*) FROM details_refresh').fetchone()[0]
+            if running >= limit:
+                return False
+            return self._conn.execute(
+                'INSERT OR IGNORE INTO details_refresh (url, claimed) VALUES (?, ?)', (url, now)
+            ).rowcount == 1
+
+    def finish_refresh(self, url):
+        """Release a claim taken with claim_refresh()"""
+        with self._conn:
+            self._conn.execute('DELETE FROM details_refresh WHERE url = ?', (url,))
+
+    def _evict(self):
+        """Drop entries past max_age and trim the cache down to max_entries (LRU)"""
+        self._conn.execute(
+            'DELETE FROM details_cache WHERE validated < ?', (time.time() - self.max_age,)
+        )
+        self._conn.execute(
+            'DELETE FROM details_cache WHERE rowid IN ('
+            ' SELECT rowid FROM details_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM details_cache').fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection"""
+        self._conn.close()
+
+
+class MemoryCache:
+    """
+    In-memory LRU cache with per-entry expiry, safe to use from several threads
+
+    The long-lived scraper service keeps one in front of the details cache
+    only, so a listing prefetched after a search is handed to the following
+    getdetails call without opening a database. Searches go to the search
+    cache and the title index as in a plugin process. Entries expire after the ttl
+    given to put(); when more than `max_entries` are stored, the least recently
+    used are evicted.
+    """
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value stored under key, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl):
+        """Store value under key for ttl seconds"""
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,148 @@
+"""
+Canonical search titles
+
+Kodi passes search_movie() whatever it derived from the file or folder name,
+so one fanedit can arrive as "Star.Wars.Despecialized.1080p.x264",
+"star wars despecialized" or "Star Wars - Despecialized Edition". Each of those
+would be a separate API query and a separate search cache entry. canonicalize()
+maps them to one query: release tags are cut off, and punctuation, case, accents
+and a few noise words are normalized away.
+
+The rules are tables so they can be extended without touching the code;
+benchmarks/benchmark_canonical.py measures their effect on a filename corpus.
+"""
+
+import re
+import unicodedata
+
+VIDEO_EXTENSIONS = (
+    'avi', 'iso', 'm2ts', 'm4v', 'mkv', 'mov', 'mp4', 'mpeg', 'mpg', 'ts', 'webm', 'wmv'
+)
+
+# Release tags. The title ends at the first of these in a filename-style tail
+# (see _tail_start()); everything after it (more tags, the release group) is
+# dropped. Elsewhere they are title words: "Dune 4K Redux" keeps its "4K".
+RELEASE_TAGS = (
+    ('resolution', r'(?:4320|2160|1440|1080|720|576|480)[pip]|[48]k|uhd'),
+    ('source', r'blu-?ray|bd(?:rip|remux|25|50)?|br-?rip|web-?(?:dl|rip)|webdl|hdtv|hdrip|'
+               r'dvd(?:rip|scr|[59])?|remux|vhs-?rip|laserdisc|ld-?rip'),
+    ('video', r'[xh]\.?26[45]|hevc|avc|xvid|divx|av1|vp9|10-?bit|8-?bit|hdr(?:10(?:\+|plus)?)?|'
+              r'dovi|sdr'),
+    ('audio', r'aac(?:[257]\.[01])?|e?-?ac-?3|ddp?(?:[257]\.?[01])?|dts(?:-?(?:hd|ma|x))*|'
+              r'truehd|atmos|flac|lpcm'),
+    ('release', r'proper|repack|rerip|multisubs?|dubbed|subbed'),
+)
+
+# Applied in order to the title once tags and bracketed parts are gone
+SUBSTITUTIONS = (
+    ('apostrophes', r"['’`]", ''),
+    ('ampersand', r'&', ' and '),
+    ('punctuation', r'[\W_]+', ' '),
+)
+
+# Words that do not tell fanedits apart; removed wherever they appear
+NOISE_WORDS = (
+    ('edition', r'edition'),
+    ('fanedit', r'fan ?edit'),
+    ('version', r'v\d+(?: \d+)*'),
+)
+
+_BRACKETS = re.compile(r'\[([^\]]*)\]|\{([^}]*)\}')
+# Tags and extensions are ASCII; ASCII-only case folding also compiles several
+# times faster, which matters because every find call compiles these afresh
+_EXTENSION = re.compile(r'\.(?:%s)$' % '|'.join(VIDEO_EXTENSIONS), re.IGNORECASE | re.ASCII)
+_TAGS = re.compile(
+    r'(?<![0-9a-z])(?:%s)(?![0-9a-z])' % '|'.join(pattern for _, pattern in RELEASE_TAGS),
+    re.IGNORECASE | re.ASCII
+)
+_YEAR = re.compile(r'(?<![0-9])(19[0-9]{2}|20[0-9]{2})(?![0-9])')
+_SPACE = re.compile(r'\s')
+_FILENAME_SEPARATOR = re.compile(r'[^\W\d_][._]|[._][^\W\d_]')
+_WORD = re.compile(r'[^\W_]')
+_SUBSTITUTIONS = tuple((re.compile(pattern), replacement) for _, pattern, replacement in SUBSTITUTIONS)
+_NOISE = re.compile(r'\b(?:%s)\b' % '|'.join(pattern for _, pattern in NOISE_WORDS))
+
+
+def _drop_brackets(match):
+    # "[Fanedit]" and "{tt0076759}" go, but a bare year such as "{1992}" stays
+    content = (match.group(1) or match.group(2) or '').strip()
+    return f" {content} " if _YEAR.fullmatch(content) else ' '
+
+
+def _tail_start(text):
+    """
+    Return where release tags may start in a name
+
+    Dotted or underscored names ("Dune.4K.Redux") are filenames throughout;
+    otherwise the tail starts at the first bracketed part or at the first year
+    after the start of the title.
+    """
+    if not _SPACE.search(text) and _FILENAME_SEPARATOR.search(text):
+        return 1
+    starts = [m.start() for m in (_BRACKETS.search(text), _YEAR.search(text, 1)) if m is not None]
+    return min(starts) if starts else len(text)
+
+
+def _cut_release(title, year):
+    """Cut the extension, bracketed parts, release tags and a trailing year; return (text, year)"""
+    text = unicodedata.normalize('NFKC', title)
+    text = _EXTENSION.sub('', text.strip())
+
+    tag = _TAGS.search(text, max(_tail_start(text), 1))
+    if tag is not None:
+        text = text[:tag.start()]
+    text = _BRACKETS.sub(_drop_brackets, text)
+
+    # A year after the start of the title ends it ("2001 A Space Odyssey 1968").
+    # If Kodi passed a year, only that year at the very end is cut:
+    # "Blade Runner 2049" (2017) keeps its number
+    years = [m for m in _YEAR.finditer(text) if m.start() > 0]
+    if years:
+        found = years[-1]
+        if not year or (found.group(1) == str(year) and not _WORD.search(text, found.end())):
+            text = text[:found.start()]
+            year = year or found.group(1)
+    return text, year
+
+
+def canonicalize(title, year=''):
+    """
+    Reduce a title (or filename) to its canonical search form
+
+    Args:
+        title: Title as passed by Kodi, or a video filename
+        year: Release year, if known; otherwise a year found in the title is used
+
+    Returns:
+        Tuple of (canonical title, year); year is '' if unknown
+    """
+    text, year = _cut_release(title, year)
+    text = ''.join(
+        c for c in unicodedata.normalize('NFKD', text.casefold()) if not unicodedata.combining(c)
+    )
+    for pattern, replacement in _SUBSTITUTIONS:
+        text = pattern.sub(replacement, text)
+    canonical = ' '.join(_NOISE.sub(' ', text).split())
+    # Never reduce a title to nothing
+    if not canonical:
+        canonical = ' '.join(text.split())
+    return canonical, str(year or '')
+
+
+def plain_title(title, year=''):
+    """
+    Return a title without release tags, brackets, punctuation and year, but
+    with its case, accents and noise words ("Edition", ...) kept
+
+    "Star.Wars.Despecialized.Edition.1080p" becomes "Star Wars Despecialized Edition".
+    """
+    text, _ = _cut_release(title, year)
+    for pattern, replacement in _SUBSTITUTIONS:
+        text = pattern.sub(replacement, text)
+    return ' '.join(text.split())
+
+
+def canonical_query(title, year=''):
+    """Return the search query (and cache key) for a title and optional year"""
+    canonical, year = canonicalize(title, year)
+    return f"{canonical} {year}" if year else canonical
@@ -0,0 +1,569 @@
+"""
+Local fanedit.org catalogue: a persistent metadata store and a polite, resumable crawler
+
+The crawler enumerates listings from the site's sitemaps (found through
+robots.txt) or from category pages, fetches them with a per-host rate limit
+and concurrency cap (on a thread pool, or on the asyncio FetchEngine with
+run_async()), parses them with the same extractor as get_details() and
+writes the fields into a CatalogueStore. The crawl frontier is persisted in the
+same SQLite database, so an interrupted crawl resumes where it stopped.
+"""
+
+import gzip
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.robotparser
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from resources.lib import scraper
+from resources.lib.cache import open_database
+from resources.lib.extract import extract_fields
+
+DEFAULT_SITE = 'https://fanedit.org/'
+
+# Frontier entry kinds
+SITEMAP = 'sitemap'
+CATEGORY = 'category'
+LISTING = 'listing'
+
+# Frontier entry states
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+# A listing page carries at least one of the JReviews detail fields
+_LISTING_FIELDS = ('plot', 'year', 'genres', 'directors')
+
+_LINK = re.compile(r'<a\s[^>]*?href="([^"#]+)"', re.IGNORECASE)
+_NEXT_LINK = re.compile(
+    r'<a\s[^>]*?(?:rel="next"[^>]*?href="([^"]+)"|href="([^"]+)"[^>]*?rel="next")', re.IGNORECASE
+)
+
+
+class CatalogueStore:
+    """
+    Persistent store of parsed fanedit.org listings and the crawl frontier
+    
+    Unlike the details cache, nothing is ever evicted from the store.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._conn = open_database(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS listings ('
+            ' url TEXT PRIMARY KEY,'
+            ' fields TEXT NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' crawled REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS frontier ('
+            ' url TEXT PRIMARY KEY,'
+            ' kind TEXT NOT NULL,'
+            ' state TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' added REAL NOT NULL,'
+            ' error TEXT)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, added)'
+        )
+        self._conn.commit()
+    
+    # Frontier
+    
+    def add_urls(self, urls, kind):
+        """Queue URLs that are not in the frontier yet; returns the number added"""
+        now = time.time()
+        with self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO frontier (url, kind, state, added) VALUES (?, ?, ?, ?)',
+                [(url, kind, PENDING, now) for url in urls]
+            )
+            return self._conn.total_changes - before
+    
+    def pending(self, limit):
+        """Return up to `limit` pending (url, kind, attempts) entries, sitemaps and categories first"""
+        return self._conn.execute(
+            'SELECT url, kind, attempts FROM frontier WHERE state = ? '
+            'ORDER BY kind = ?, added LIMIT ?',
+            (PENDING, LISTING, limit)
+        ).fetchall()
+    
+    def mark_done(self, url):
+        """Record that a frontier entry was processed"""
+        with self._conn:
+            self._conn.execute(
+                'UPDATE frontier SET state = ?, error = NULL WHERE url = ?', (DONE, url)
+            )
+    
+    def mark_failed(self, url, error, max_attempts):
+        """Record a failed attempt; the entry stays pending until max_attempts is reached"""
+        with self._conn:
+            self._conn.execute(
+                'UPDATE frontier SET attempts = attempts + 1, error = ?, '
+                'state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE url = ?',
+                (error, max_attempts, FAILED, PENDING, url)
+            )
+    
+    def requeue(self, kind=None, older_than=None, failed=False):
+        """
+        Put processed entries back into the frontier
+        
+        Args:
+            kind: Only requeue entries of this kind
+            older_than: Only requeue listings crawled before this timestamp
+            failed: Requeue failed entries instead of done ones
+        
+        Returns:
+            Number of entries requeued
+        """
+        query = 'UPDATE frontier SET state = ?, attempts = 0 WHERE state = ?'
+        params = [PENDING, FAILED if failed else DONE]
+        if kind is not None:
+            query += ' AND kind = ?'
+            params.append(kind)
+        if older_than is not None:
+            query += ' AND url NOT IN (SELECT url FROM listings WHERE crawled >= ?)'
+            params.append(older_than)
+        with self._conn:
+            return self._conn.execute(query, params).rowcount
+    
+    def counts(self):
+        """Return {(kind, state): count} for the frontier"""
+        rows = self._conn.execute(
+            'SELECT kind, state, COUNT(*) FROM frontier GROUP BY kind, state'
+        ).fetchall()
+        return {(kind, state): count for kind, state, count in rows}
+    
+    # Listings
+    
+    def put_listing(self, url, fields, etag=None, last_modified=None):
+        """Store the parsed fields of a listing"""
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO listings (url, fields, etag, last_modified, crawled) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (url, json.dumps(fields), etag, last_modified, time.time())
+            )
+    
+    def touch_listing(self, url):
+        """Record that a stored listing was confirmed unchanged (HTTP 304)"""
+        with self._conn:
+            self._conn.execute(
+                'UPDATE listings SET crawled = ? WHERE url = ?', (time.time(), url)
+            )
+    
+    def get_listing(self, url):
+        """Return the stored fields of a listing, or None"""
+        row = self._conn.execute('SELECT fields FROM listings WHERE url = ?', (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def validators(self, url):
+        """Return the (etag, last_modified) stored for a listing, or (None, None)"""
+        row = self._conn.execute(
+            'SELECT etag, last_modified FROM listings WHERE url = ?', (url,)
+        ).fetchone()
+        return row if row else (None, None)
+    
+    def listings(self):
+        """Iterate over (url, fields) for every stored listing"""
+        for url, fields in self._conn.execute('SELECT url, fields FROM listings ORDER BY url'):
+            yield url, json.loads(fields)
+    
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM listings').fetchone()[0]
+    
+    def close(self):
+        """Close the underlying database connection"""
+        self._conn.close()
+
+
+class HostLimiter:
+    """
+    Per-host politeness: at most `concurrency` requests in flight per host, and
+    request starts spaced at least `interval` seconds apart
+    """
+    
+    def __init__(self, interval=1.0, concurrency=2):
+        self.interval = interval
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._next_start = {}
+        self._semaphores = {}
+    
+    def acquire(self, host):
+        """Block until a request to host may start"""
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.concurrency))
+        semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+    
+    def release(self, host):
+        """Signal that a request to host has finished"""
+        self._semaphores[host].release()
+
+
+def parse_sitemap(body):
+    """
+    Parse a sitemap or sitemap index (optionally gzip-compressed)
+    
+    Returns:
+        Tuple of (child sitemap URLs, page URLs)
+    """
+    if body[:2] == b'\x1f\x8b':
+        body = gzip.decompress(body)
+    root = ET.fromstring(body)
+    sitemaps, pages = [], []
+    for element in root.iter():
+        tag = element.tag.rsplit('}', 1)[-1]
+        if tag not in ('sitemap', 'url'):
+            continue
+        for child in element:
+            if child.tag.rsplit('}', 1)[-1] == 'loc' and child.text:
+                (sitemaps if tag == 'sitemap' else pages).append(child.text.strip())
+    return sitemaps, pages
+
+
+def parse_category(html, base_url):
+    """
+    Extract links from a category page
+    
+    Returns:
+        Tuple of (next page URLs, same-host link URLs)
+    """
+    host = urllib.parse.urlsplit(base_url).netloc
+    next_pages = []
+    for match in _NEXT_LINK.finditer(html):
+        next_pages.append(urllib.parse.urljoin(base_url, match.group(1) or match.group(2)))
+    links = []
+    for href in _LINK.findall(html):
+        url = urllib.parse.urljoin(base_url, href.replace('&amp;', '&'))
+        if urllib.parse.urlsplit(url).netloc == host and url not in next_pages:
+            links.append(url)
+    return next_pages, links
+
+
+def is_listing(fields):
+    """Return True if the parsed fields look like a fanedit listing rather than another page"""
+    return 'title' in fields and any(field in fields for field in _LISTING_FIELDS)
+
+
+class Crawler:
+    """
+    Polite, resumable crawler that fills a CatalogueStore
+    
+    Network requests run on a worker pool (or an event loop, see run_async());
+    all database writes happen on the calling thread, so the store needs no
+    locking. Every processed entry is committed immediately, so stopping the
+    crawl at any point loses nothing.
+    """
+    
+    def __init__(self, store, agent, interval=1.0, concurrency=2, max_attempts=3,
+                 listing_pattern=None, fetch_bytes=None, fetch_listing=None, log=None):
+        """
+        Args:
+            store: CatalogueStore to fill
+            agent: User-Agent header value
+            interval: Minimum seconds between request starts per host
+            concurrency: Maximum requests in flight per host (and worker threads)
+            max_attempts: Attempts before a frontier entry is marked failed
+            listing_pattern: Optional regex; only matching URLs from sitemaps
+                and category pages are queued as listings
+            fetch_bytes: Replacement for scraper.fetch_bytes (testing)
+            fetch_listing: Replacement for scraper.fetch_listing (testing)
+            log: Optional callable for progress messages
+        """
+        self.store = store
+        self.agent = agent
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.listing_pattern = re.compile(listing_pattern) if listing_pattern else None
+        self.limiter = HostLimiter(interval, concurrency)
+        self._fetch_bytes = fetch_bytes or scraper.fetch_bytes
+        self._fetch_listing = fetch_listing or scraper.fetch_listing
+        self._log = log or (lambda msg: None)
+        self._robots = {}
+        self._robots_lock = threading.Lock()
+        self._robots_async_locks = {}
+    
+    def _request(self, url, fetch, *args, **kwargs):
+        """Run a fetch under the per-host limiter"""
+        host = urllib.parse.urlsplit(url).netloc
+        self.limiter.acquire(host)
+        try:
+            return fetch(url, self.agent, *args, **kwargs)
+        finally:
+            self.limiter.release(host)
+    
+    def _robot_rules(self, url):
+        """Return the robots.txt rules for the host of url (fetched once per host)"""
+        origin = _origin(url)
+        with self._robots_lock:
+            if origin in self._robots:
+                return self._robots[origin]
+        try:
+            rules = _parse_robots(origin, self._request(origin + '/robots.txt', self._fetch_bytes))
+        except Exception as e:
+            rules = self._unreadable_robots(origin, e)
+        with self._robots_lock:
+            self._robots[origin] = rules
+        return rules
+    
+    async def _robot_rules_async(self, engine, url):
+        """_robot_rules() on a FetchEngine"""
+        origin = _origin(url)
+        if origin not in self._robots:
+            import asyncio
+            
+            # The first entry of a host fetches robots.txt; the others wait for it
+            lock = self._robots_async_locks.setdefault(origin, asyncio.Lock())
+            async with lock:
+                if origin not in self._robots:
+                    try:
+                        rules = _parse_robots(origin, await engine.fetch_bytes(origin + '/robots.txt'))
+                    except Exception as e:
+                        rules = self._unreadable_robots(origin, e)
+                    self._robots[origin] = rules
+        return self._robots[origin]
+    
+    def _unreadable_robots(self, origin, error):
+        """
+        Return the rules for a host whose robots.txt could not be fetched
+        
+        As in RFC 9309 and urllib.robotparser, a 4xx status means the host has
+        no robots.txt and everything is allowed; after a server or network
+        error nothing on the host is fetched during this crawl.
+        """
+        rules = urllib.robotparser.RobotFileParser(origin + '/robots.txt')
+        if isinstance(error, urllib.error.HTTPError) and 400 <= error.code < 500:
+            rules.allow_all = True
+        else:
+            rules.disallow_all = True
+            self._log(f"{origin}/robots.txt unavailable ({error}); skipping the host for this crawl")
+        return rules
+    
+    def allowed(self, url):
+        """Return True if robots.txt allows fetching url"""
+        return self._robot_rules(url).can_fetch(self.agent, url)
+    
+    def seed(self, urls=None, site=DEFAULT_SITE):
+        """
+        Add starting points to the frontier
+        
+        Args:
+            urls: Sitemap (*.xml, *.xml.gz) or category page URLs. If not given,
+                the sitemaps listed in the site's robots.txt are used, falling
+                back to /sitemap.xml.
+            site: Site to discover sitemaps for when urls is not given
+        
+        Returns:
+            Number of new frontier entries
+        """
+        if not urls:
+            urls = self._robot_rules(site).site_maps() or [urllib.parse.urljoin(site, '/sitemap.xml')]
+        sitemaps = [url for url in urls if re.search(r'\.xml(\.gz)?$', urllib.parse.urlsplit(url).path)]
+        categories = [url for url in urls if url not in sitemaps]
+        return self.store.add_urls(sitemaps, SITEMAP) + self.store.add_urls(categories, CATEGORY)
+    
+    def _wanted(self, url):
+        return self.listing_pattern is None or self.listing_pattern.search(url) is not None
+    
+    def _process(self, url, kind, validators):
+        """
+        Fetch and parse one frontier entry (runs on a worker thread)
+        
+        Returns:
+            Dict describing the outcome, applied to the store by _apply()
+        """
+        if not self.allowed(url):
+            return {'skipped': 'disallowed by robots.txt'}
+        if kind == LISTING:
+            etag, last_modified = validators
+            return self._outcome(url, kind, self._request(
+                url, self._fetch_listing, etag=etag, last_modified=last_modified
+            ))
+        return self._outcome(url, kind, self._request(url, self._fetch_bytes))
+    
+    async def _process_async(self, engine, url, kind, validators):
+        """_process() on a FetchEngine, which applies the per-host limits itself"""
+        if not (await self._robot_rules_async(engine, url)).can_fetch(self.agent, url):
+            return {'skipped': 'disallowed by robots.txt'}
+        if kind == LISTING:
+            etag, last_modified = validators
+            return self._outcome(url, kind, await engine.fetch_listing(url, etag=etag, last_modified=last_modified))
+        return self._outcome(url, kind, await engine.fetch_bytes(url))
+    
+    def _outcome(self, url, kind, response):
+        """
+        Parse a fetched frontier entry
+        
+        Args:
+            response: Body bytes of a sitemap or category page, or the
+                fetch_listing() tuple of a listing
+        """
+        if kind == SITEMAP:
+            sitemaps, pages = parse_sitemap(response)
+            return {'sitemaps': sitemaps, 'listings': [page for page in pages if self._wanted(page)]}
+        
+        if kind == CATEGORY:
+            next_pages, links = parse_category(response.decode('utf-8', 'replace'), url)
+            return {'categories': next_pages, 'listings': [link for link in links if self._wanted(link)]}
+        
+        html, etag, last_modified, _ = response
+        if html is None:
+            return {'unchanged': True}
+        fields = extract_fields(html)
+        if not is_listing(fields):
+            return {'skipped': 'not a listing page'}
+        return {'fields': fields, 'etag': etag, 'last_modified': last_modified}
+    
+    def _apply(self, url, kind, outcome):
+        """Write the outcome of _process() to the store"""
+        if 'sitemaps' in outcome:
+            self.store.add_urls(outcome['sitemaps'], SITEMAP)
+        if 'categories' in outcome:
+            self.store.add_urls(outcome['categories'], CATEGORY)
+        if 'listings' in outcome:
+            added = self.store.add_urls(outcome['listings'], LISTING)
+            self._log(f"{kind} {url}: {added} new listing URL(s)")
+        if 'fields' in outcome:
+            self.store.put_listing(url, outcome['fields'], outcome['etag'], outcome['last_modified'])
+            self._log(f"listing {url}: {outcome['fields'].get('title', '')}")
+        if outcome.get('unchanged'):
+            self.store.touch_listing(url)
+        if 'skipped' in outcome:
+            self._log(f"{kind} {url}: skipped ({outcome['skipped']})")
+        self.store.mark_done(url)
+    
+    def _next_entries(self, in_flight, processed, limit):
+        """Return the pending (url, kind, validators) to start, keeping at most 2 x concurrency in flight"""
+        if limit is not None and processed + len(in_flight) >= limit:
+            return []
+        room = self.concurrency * 2 - len(in_flight)
+        if limit is not None:
+            room = min(room, limit - processed - len(in_flight))
+        queued = {url for url, _ in in_flight.values()}
+        entries = []
+        for url, kind, _ in self.store.pending(room + len(queued)):
+            if url in queued or len(entries) >= room:
+                continue
+            entries.append((url, kind, self.store.validators(url) if kind == LISTING else (None, None)))
+        return entries
+    
+    def _finish(self, url, kind, outcome=None, error=None):
+        """Apply the outcome of a finished entry, or record its failure"""
+        if error is None:
+            try:
+                self._apply(url, kind, outcome)
+                return
+            except Exception as e:
+                error = e
+        self.store.mark_failed(url, f"{type(error).__name__}: {error}", self.max_attempts)
+        self._log(f"{kind} {url}: failed ({type(error).__name__}: {error})")
+    
+    def run(self, limit=None):
+        """
+        Process the frontier until it is empty or `limit` entries were processed
+        
+        Returns:
+            Number of entries processed (including failures)
+        """
+        processed = 0
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                while True:
+                    for url, kind, validators in self._next_entries(in_flight, processed, limit):
+                        in_flight[executor.submit(self._process, url, kind, validators)] = (url, kind)
+                    if not in_flight:
+                        break
+                    
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        url, kind = in_flight.pop(future)
+                        processed += 1
+                        error = future.exception()
+                        self._finish(url, kind, None if error else future.result(), error)
+            except KeyboardInterrupt:
+                # Unfinished entries stay pending and are picked up on the next run
+                for future in in_flight:
+                    future.cancel()
+                raise
+        return processed
+    
+    def run_async(self, limit=None, engine=None):
+        """
+        run() on an asyncio FetchEngine instead of a thread pool
+        
+        One event loop keeps up to 2 x concurrency entries in flight; the
+        engine enforces the per-host interval and concurrency cap and reuses
+        connections. Store writes still happen on the calling thread.
+        
+        Args:
+            limit: Stop after processing this many entries
+            engine: FetchEngine to use (default: one with this crawler's limits)
+        
+        Returns:
+            Number of entries processed (including failures)
+        """
+        import asyncio
+        
+        from resources.lib.fetch_engine import FetchEngine
+        
+        if engine is None:
+            engine = FetchEngine(self.agent, concurrency=self.concurrency, interval=self.limiter.interval)
+        return asyncio.run(self._run_async(engine, limit))
+    
+    async def _run_async(self, engine, limit):
+        import asyncio
+        
+        processed = 0
+        in_flight = {}
+        try:
+            while True:
+                for url, kind, validators in self._next_entries(in_flight, processed, limit):
+                    task = asyncio.ensure_future(self._process_async(engine, url, kind, validators))
+                    in_flight[task] = (url, kind)
+                if not in_flight:
+                    break
+                
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url, kind = in_flight.pop(task)
+                    processed += 1
+                    error = task.exception()
+                    self._finish(url, kind, None if error else task.result(), error)
+        finally:
+            # Unfinished entries stay pending and are picked up on the next run
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.wait(in_flight)
+            await engine.close()
+        return processed
+
+
+def _origin(url):
+    parts = urllib.parse.urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _parse_robots(origin, body):
+    """Return the RobotFileParser of a robots.txt body"""
+    rules = urllib.robotparser.RobotFileParser(origin + '/robots.txt')
+    rules.parse(body.decode('utf-8', 'replace').splitlines())
+    return rules
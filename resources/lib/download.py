@@ -0,0 +1,95 @@
+"""
+Bounded, streaming response reader
+
+Reads an HTTP response in chunks with incremental decoding and stops as soon
+as the caller has everything it needs, or when a hard byte cap is reached.
+read_text() serves blocking urllib responses, read_text_async() the asyncio
+fetch engine.
+"""
+
+import codecs
+
+CHUNK_SIZE = 16 * 1024
+MAX_BYTES = 2 * 1024 * 1024
+
+
+class TextReader:
+    """Incremental decoder shared by read_text() and read_text_async()"""
+    
+    def __init__(self, is_complete=None, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._is_complete = is_complete
+        self._parts = []
+        self._length = 0
+        self._next_check = chunk_size
+    
+    def feed(self, chunk):
+        """Decode a chunk; return True once is_complete() says nothing more is needed"""
+        text = self._decoder.decode(chunk)
+        self._parts.append(text)
+        self._length += len(text)
+        
+        if self._is_complete is not None and self._length >= self._next_check:
+            self._next_check = self._length * 2
+            self._parts = [''.join(self._parts)]
+            return self._is_complete(self._parts[0])
+        return False
+    
+    def text(self, final=False):
+        """Return the text so far; final flushes the decoder at the end of the body"""
+        if final:
+            self._parts.append(self._decoder.decode(b'', final=True))
+        return ''.join(self._parts)
+
+
+def read_text(response, is_complete=None, max_bytes=MAX_BYTES, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """
+    Read and decode a response body incrementally
+    
+    Args:
+        response: File-like object with a read(size) method
+        is_complete: Optional callable taking the text read so far and returning
+            True once nothing more is needed. It is called each time the text
+            has doubled in size, so the total cost of the checks stays linear.
+        max_bytes: Hard cap on the number of bytes read
+        chunk_size: Size of each read
+        encoding: Text encoding of the body
+    
+    Returns:
+        Tuple of (text, truncated). truncated is True if reading stopped before
+        the end of the body, either because is_complete() returned True or
+        because max_bytes was reached.
+    """
+    reader = TextReader(is_complete, chunk_size, encoding)
+    received = 0
+    
+    while received < max_bytes:
+        chunk = response.read(min(chunk_size, max_bytes - received))
+        if not chunk:
+            return reader.text(final=True), False
+        received += len(chunk)
+        if reader.feed(chunk):
+            return reader.text(), True
+    
+    # Byte cap reached; a multi-byte character cut at the cap is dropped
+    if not response.read(1):
+        return reader.text(final=True), False
+    return reader.text(), True
+
+
+async def read_text_async(response, is_complete=None, max_bytes=MAX_BYTES, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """read_text() for a response whose read(size) is a coroutine (see fetch_engine.Response)"""
+    reader = TextReader(is_complete, chunk_size, encoding)
+    received = 0
+    
+    while received < max_bytes:
+        chunk = await response.read(min(chunk_size, max_bytes - received))
+        if not chunk:
+            return reader.text(final=True), False
+        received += len(chunk)
+        if reader.feed(chunk):
+            return reader.text(), True
+    
+    if not await response.read(1):
+        return reader.text(final=True), False
+    return reader.text(), True
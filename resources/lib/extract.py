@@ -0,0 +1,196 @@
+"""
+Single-pass field extractor for fanedit.org listing pages
+
+All field anchors are combined into one compiled pattern that is scanned
+forward through the page once. Each anchor hit is completed with a short
+anchored match, and scanning stops as soon as every field has been resolved,
+so the comment/review sections at the bottom of a listing are never scanned.
+The scan also ends at the user reviews container (END_OF_CONTENT), which
+follows the listing's own fields: a rating or a heading inside a review is
+never taken for a field of the listing.
+
+If the scan runs for SCAN_WINDOW characters without resolving another field
+(a listing without a tagline, for example), the remaining fields are looked
+up with their individual patterns from the current position instead; the
+literal-prefix search of a single pattern is faster than the combined scan
+over long stretches of unrelated markup.
+
+The title is the listing's own heading (h1.contentheading) rather than the
+first <h1> on the page, which is the site title in the page header; only
+pages without such a heading fall back to their first <h1>. Apart from
+that, on well-formed markup the results are identical to running the
+individual field patterns with re.search over the listing's content.
+"""
+
+import re
+
+from resources.lib.records import FIELDS
+
+# Characters scanned without resolving a field before falling back to per-field searches
+SCAN_WINDOW = 16 * 1024
+
+# Start of the user reviews below a listing's fields
+END_OF_CONTENT = '<div class="jrReviewsContainer">'
+
+# Fields every listing has. A download can stop once these are parsed and
+# END_OF_CONTENT has been read, whether or not the optional fields were found
+REQUIRED_FIELDS = ('title', 'plot')
+
+# Anchor of every field. Fields without an unbounded span are matched in full;
+# the others only match their leading literal and are completed by _TAILS.
+_FIELD_ANCHORS = {
+    'title': r'<h1 class="contentheading[^"]*"[^>]*>(?:<span[^>]*>)?(?P<title_value>[^<]+)</',
+    'plot': r'<div class="jrBriefsynopsis jrFieldRow">',
+    'year': r'<div class="jrFaneditreleasedate jrFieldRow">',
+    'genres': r'<div class="jrGenre jrFieldRow">',
+    'directors': r'<div class="jrFaneditorname jrFieldRow">',
+    'rating': r'<span[^>]*>Rating:[\s]*(?P<rating_value>[\d.]+)[\s]*/[\s]*10',
+    'votes': r'<span[^>]*>\((?P<votes_value>[0-9]+)[\s]*votes?\)</span>',
+    'tagline': r'<li><strong>Tagline:</strong>[\s]*(?P<tagline_value>[^<]+)</li>',
+    'thumb': r'<div class="jrListingMainImage">',
+}
+
+# All anchors combined, factored on their common prefixes so the scan only
+# stops at '<' characters
+_ANCHORS = re.compile(
+    r'<(?:'
+    r'(?P<title>h1 class="contentheading[^"]*"[^>]*>(?:<span[^>]*>)?(?P<title_value>[^<]+)</)'
+    r'|div class="jr(?:'
+    r'(?P<plot>Briefsynopsis jrFieldRow">)'
+    r'|(?P<year>Faneditreleasedate jrFieldRow">)'
+    r'|(?P<genres>Genre jrFieldRow">)'
+    r'|(?P<directors>Faneditorname jrFieldRow">)'
+    r'|(?P<thumb>ListingMainImage">)'
+    r')'
+    r'|span[^>]*>(?:'
+    r'(?P<rating>Rating:[\s]*(?P<rating_value>[\d.]+)[\s]*/[\s]*10)'
+    r'|(?P<votes>\((?P<votes_value>[0-9]+)[\s]*votes?\)</span>)'
+    r')'
+    r'|(?P<tagline>li><strong>Tagline:</strong>[\s]*(?P<tagline_value>[^<]+)</li>)'
+    r')'
+)
+_FIELD_PATTERNS = {field: re.compile(pattern) for field, pattern in _FIELD_ANCHORS.items()}
+
+_LIST_TAIL = re.compile(r'<ul class="jrFieldValueList">(.*?)</ul>', re.DOTALL)
+_TAILS = {
+    'plot': re.compile(r'<div class="jrFieldValue">(.*?)</div>', re.DOTALL),
+    'year': re.compile(r'<div class="jrFieldValue">[\s\S]*?([0-9]{4})'),
+    'genres': _LIST_TAIL,
+    'directors': _LIST_TAIL,
+    'thumb': re.compile(r'<a href="([^"]+)"[^>]*class="fancybox"'),
+}
+_PLAIN_TITLE = re.compile(r'<h1[^>]*>([^<]+)</h1>')
+_LIST_ITEM = re.compile(r'<li><a[^>]*>([^<]+)</a></li>')
+_TAG = re.compile(r'<[^>]+>')
+
+
+def _complete(field, match, html):
+    """
+    Turn an anchor match into the field value
+    
+    Returns:
+        The value, or None if the field is not present on the page. A tail
+        that fails after the first anchor also fails after every later one,
+        so None is final.
+    """
+    if field == 'title':
+        return match.group('title_value').strip()
+    if field == 'rating':
+        return float(match.group('rating_value'))
+    if field == 'votes':
+        return int(match.group('votes_value'))
+    if field == 'tagline':
+        return match.group('tagline_value').strip()
+    
+    tail = _TAILS[field].search(html, match.end())
+    if tail is None:
+        return None
+    if field == 'plot':
+        return _TAG.sub('', tail.group(1)).strip()
+    if field == 'year':
+        return int(tail.group(1))
+    if field == 'thumb':
+        return tail.group(1)
+    # genres/directors: an empty list means the field is absent
+    return _LIST_ITEM.findall(tail.group(1)) or None
+
+
+def extract_fields(html):
+    """
+    Extract movie metadata from a fanedit.org listing page in a single pass
+    
+    Args:
+        html: Page content
+    
+    Returns:
+        Dict of the fields found on the page (title, plot, year, genres,
+        directors, rating, votes, tagline, thumb)
+    """
+    fields = _scan_fields(html)
+    if 'title' not in fields:
+        # No listing heading: take the first <h1>, as the original pattern did
+        match = _PLAIN_TITLE.search(html, 0, _content_end(html))
+        if match is not None:
+            fields['title'] = match.group(1).strip()
+    return fields
+
+
+def _scan_fields(html):
+    """The single-pass scan of extract_fields()"""
+    fields = {}
+    pending = set(FIELDS)
+    end = _content_end(html)
+    position = 0
+    limit = min(SCAN_WINDOW, end)
+    
+    while pending:
+        match = _ANCHORS.search(html, position, limit)
+        if match is None:
+            if limit >= end:
+                # Scanned the whole listing: anything still pending is absent
+                return fields
+            break
+        
+        position = match.end()
+        # lastgroup is the outermost group of the alternative, i.e. the field name
+        field = match.lastgroup
+        if field not in pending:
+            continue
+        
+        value = _complete(field, match, html)
+        if value is not None:
+            fields[field] = value
+        pending.discard(field)
+        limit = min(position + SCAN_WINDOW, end)
+    else:
+        return fields
+    
+    # Scan window exhausted: finish the remaining fields individually
+    for field in FIELDS:
+        if field in pending:
+            match = _FIELD_PATTERNS[field].search(html, position, end)
+            if match is not None:
+                value = _complete(field, match, html)
+                if value is not None:
+                    fields[field] = value
+    
+    return fields
+
+
+def _content_end(html):
+    """Return the position of END_OF_CONTENT in html, or its length"""
+    end = html.find(END_OF_CONTENT)
+    return len(html) if end < 0 else end
+
+
+def is_listing_complete(html):
+    """
+    Return True if a partially downloaded page holds everything extract_fields() needs
+    
+    That is every field, or the required fields and the end of the listing's
+    content: a listing without a tagline need not be read to the byte cap.
+    """
+    fields = extract_fields(html)
+    if len(fields) == len(FIELDS):
+        return True
+    return END_OF_CONTENT in html and all(field in fields for field in REQUIRED_FIELDS)
@@ -0,0 +1,508 @@
+"""
+Asyncio fetch engine for bulk network work (catalogue crawls, rescans)
+
+scraper.py makes one blocking urllib request at a time, which is right for a
+single scrape but leaves bulk jobs bound by round trips. FetchEngine runs many
+requests on one event loop, over the standard library's asyncio streams (TLS
+included):
+
+- HTTP/1.1 keep-alive connections are pooled and reused per host
+- at most `concurrency` requests are in flight per host, and request starts
+  to a host are at least `interval` seconds apart
+- every request has a deadline covering connection, headers and body;
+  cancelling a request (or missing its deadline) closes its connection
+- requests go through the proxies urllib would use (the *_proxy environment
+  variables or the system settings, with no_proxy exceptions); HTTPS is
+  tunnelled with CONNECT, which needs Python 3.11 or later
+
+fetch_listing(), fetch_bytes(), fetch_search_page() and search() return the
+same values as their scraper.py counterparts, and error statuses raise
+urllib.error.HTTPError, so callers (and quota.classify_error()) treat both
+alike. IFDB_SITE_URL applies here too. EngineThread offers the same calls to
+blocking code (the scraper service).
+
+    engine = FetchEngine(scraper.user_agent(version), concurrency=4)
+    async def refresh(urls):
+        try:
+            return await asyncio.gather(*(engine.fetch_listing(url) for url in urls),
+                                        return_exceptions=True)
+        finally:
+            await engine.close()
+    results = asyncio.run(refresh(urls))
+"""
+
+import asyncio
+import base64
+import http.client
+import io
+import ssl
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from resources.lib import metrics, scraper
+from resources.lib.download import read_text_async
+from resources.lib.extract import is_listing_complete
+
+MAX_REDIRECTS = 5
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+# Most response headers accepted before the response is rejected
+MAX_HEADERS = 100
+
+# Error bodies are kept for HTTPError.read() up to this size
+MAX_ERROR_BYTES = 64 * 1024
+
+# A listing download stopped early is read to the end, keeping the connection
+# for the next request, if no more than this is left
+DRAIN_BYTES = 64 * 1024
+
+
+class Response:
+    """
+    Response of FetchEngine, once its headers are in
+
+    read() streams the body, undoing chunked transfer encoding.
+    """
+
+    def __init__(self, url, status, reason, headers, connection):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._connection = connection
+        self._chunked = False
+        self._remaining = None
+        self._done = False
+
+        if status in (204, 304) or 100 <= status < 200:
+            self._remaining = 0
+        elif 'chunked' in headers.get('Transfer-Encoding', '').lower():
+            self._chunked = True
+            self._remaining = 0
+        elif headers.get('Content-Length', '').isdigit():
+            self._remaining = int(headers['Content-Length'])
+        else:
+            # Body delimited by the end of the connection
+            connection.reusable = False
+        self._done = self._remaining == 0 and not self._chunked
+
+    async def read(self, size=-1):
+        """Return up to size bytes of the body (all of it for -1); b'' at the end"""
+        if size < 0:
+            parts = []
+            while True:
+                chunk = await self.read(1024 * 1024)
+                if not chunk:
+                    return b''.join(parts)
+                parts.append(chunk)
+        if self._done or size == 0:
+            return b''
+
+        reader = self._connection.reader
+        if self._chunked and self._remaining == 0:
+            line = await reader.readline()
+            length = int(line.split(b';', 1)[0].strip() or b'0', 16)
+            if length == 0:
+                # Trailers end with an empty line
+                while (await reader.readline()).strip():
+                    pass
+                self._done = True
+                return b''
+            self._remaining = length
+
+        if self._remaining is None:
+            data = await reader.read(size)
+            self._done = not data
+            return data
+        data = await reader.read(min(size, self._remaining))
+        if not data:
+            raise ConnectionError(f"Connection closed before the end of {self.url}")
+        self._remaining -= len(data)
+        if self._remaining == 0:
+            if self._chunked:
+                await reader.readline()
+            else:
+                self._done = True
+        return data
+
+    async def drain(self, limit):
+        """Read and drop the rest of the body if it is no longer than limit; return True if done"""
+        if not self._done and self._remaining is not None and not self._chunked and self._remaining <= limit:
+            await self.read()
+        return self._done
+
+
+class _Connection:
+    """One HTTP connection and the stream pair it runs on"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+
+    def close(self):
+        self.writer.close()
+
+
+class _Host:
+    """Connection pool and politeness state of one host"""
+
+    def __init__(self, concurrency):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.idle = []
+        self.next_start = 0.0
+
+
+class FetchEngine:
+    """
+    Concurrent HTTP GETs on the running event loop
+
+    Create the engine inside or outside the loop, use it from a single loop,
+    and await close() when done.
+    """
+
+    def __init__(self, agent, concurrency=4, interval=0.0, timeout=scraper.TIMEOUT, proxies=None):
+        """
+        Args:
+            agent: User-Agent header value
+            concurrency: Maximum requests in flight (and idle connections kept) per host
+            interval: Minimum seconds between request starts per host
+            timeout: Default deadline of a request in seconds
+            proxies: Proxy URL per scheme (default: urllib.request.getproxies())
+        """
+        self.agent = agent
+        self.concurrency = concurrency
+        self.interval = interval
+        self.timeout = timeout
+        self.proxies = urllib.request.getproxies() if proxies is None else proxies
+        self.stats = {'requests': 0, 'connections': 0, 'reused': 0}
+        self._hosts = {}
+        self._ssl = None
+
+    # Requests
+
+    async def get(self, url, headers=None, read_body=None, timeout=None):
+        """
+        GET a URL, following redirects
+
+        Args:
+            url: URL to fetch (fanedit.org URLs go to IFDB_SITE_URL if set)
+            headers: Extra request headers
+            read_body: Coroutine function taking the Response and returning the
+                result; default: the whole body as bytes
+            timeout: Deadline in seconds (default: the engine's)
+
+        Returns:
+            Result of read_body
+
+        Raises:
+            urllib.error.HTTPError: Error status (4xx, 5xx)
+            TimeoutError: The deadline passed
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._get(url, headers or {}, read_body), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{url} timed out after {timeout}s") from None
+
+    async def _get(self, url, headers, read_body):
+        for _ in range(MAX_REDIRECTS + 1):
+            target = scraper.site_url(url)
+            parts = urllib.parse.urlsplit(target)
+            host = self._hosts.get(parts.netloc)
+            if host is None:
+                host = self._hosts[parts.netloc] = _Host(self.concurrency)
+            await self._acquire(host)
+            try:
+                response = await self._send(host, parts, headers)
+                try:
+                    if response.status in _REDIRECTS and response.headers.get('Location'):
+                        url = urllib.parse.urljoin(target, response.headers['Location'])
+                        await response.drain(DRAIN_BYTES)
+                        continue
+                    if response.status >= 400:
+                        body = await _read_all(response, MAX_ERROR_BYTES)
+                        raise urllib.error.HTTPError(
+                            url, response.status, response.reason, response.headers, io.BytesIO(body)
+                        )
+                    return await (read_body or _read_all)(response)
+                finally:
+                    self._release(host, response)
+            finally:
+                host.slots.release()
+        raise urllib.error.HTTPError(url, 310, 'Too many redirects', None, io.BytesIO(b''))
+
+    async def _acquire(self, host):
+        """Wait for a request slot of the host and its next allowed start"""
+        await host.slots.acquire()
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, host.next_start)
+        host.next_start = start + self.interval
+        if start > now:
+            try:
+                await asyncio.sleep(start - now)
+            except BaseException:
+                host.slots.release()
+                raise
+
+    async def _send(self, host, parts, headers):
+        """Send a request on a pooled or new connection and read the response headers"""
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        proxy = self._proxy(parts)
+        if proxy is not None and parts.scheme == 'http':
+            # A plain HTTP proxy takes the absolute URL; HTTPS goes through a tunnel
+            path = urllib.parse.urlunsplit((parts.scheme, parts.netloc, path, '', ''))
+        lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", f"User-Agent: {self.agent}",
+                 "Accept-Encoding: identity", "Connection: keep-alive"]
+        if proxy is not None and parts.scheme == 'http':
+            lines += _proxy_headers(proxy)
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        self.stats['requests'] += 1
+
+        while host.idle:
+            connection = host.idle.pop()
+            response = None
+            try:
+                connection.writer.write(request)
+                await connection.writer.drain()
+                status = await connection.reader.readline()
+                if status:
+                    self.stats['reused'] += 1
+                    response = await self._read_response(parts, connection, status)
+                    return response
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                # The server closed the idle connection (try the next one), or
+                # the request failed, was cancelled or timed out: close it
+                if response is None:
+                    connection.close()
+
+        connection = await self._connect(parts, proxy)
+        try:
+            connection.writer.write(request)
+            await connection.writer.drain()
+            status = await connection.reader.readline()
+            if not status:
+                raise ConnectionError(f"{parts.netloc} closed the connection without a response")
+            return await self._read_response(parts, connection, status)
+        except BaseException:
+            connection.close()
+            raise
+
+    def _proxy(self, parts):
+        """Return the split URL of the proxy for a target, or None to connect directly"""
+        proxy = self.proxies.get(parts.scheme)
+        if not proxy or urllib.request.proxy_bypass(parts.hostname or ''):
+            return None
+        return urllib.parse.urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+
+    async def _connect(self, parts, proxy=None):
+        ssl_context = None
+        if parts.scheme == 'https':
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            ssl_context = self._ssl
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        if proxy is None:
+            reader, writer = await asyncio.open_connection(
+                parts.hostname, port, ssl=ssl_context, server_hostname=parts.hostname if ssl_context else None
+            )
+        else:
+            # urllib also talks plain HTTP to the proxy, whatever the scheme of its URL
+            reader, writer = await asyncio.open_connection(proxy.hostname, proxy.port or 80)
+            if ssl_context:
+                try:
+                    await self._tunnel(reader, writer, parts, port, proxy)
+                    if not hasattr(writer, 'start_tls'):
+                        raise ConnectionError("HTTPS through a proxy needs Python 3.11 or later")
+                    await writer.start_tls(ssl_context, server_hostname=parts.hostname)
+                except BaseException:
+                    writer.close()
+                    raise
+        self.stats['connections'] += 1
+        return _Connection(reader, writer)
+
+    async def _tunnel(self, reader, writer, parts, port, proxy):
+        """Ask the proxy for a tunnel to the target host"""
+        address = f"[{parts.hostname}]:{port}" if ':' in parts.hostname else f"{parts.hostname}:{port}"
+        lines = [f"CONNECT {address} HTTP/1.1", f"Host: {address}", f"User-Agent: {self.agent}"]
+        lines += _proxy_headers(proxy)
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        status = await reader.readline()
+        while (await reader.readline()).strip():
+            pass
+        if status.split(b' ', 2)[1:2] != [b'200']:
+            raise ConnectionError(
+                f"Proxy {proxy.hostname} refused the tunnel to {address}: {status.decode('latin-1').strip()[:100]}"
+            )
+
+    async def _read_response(self, parts, connection, status_line):
+        version, _, rest = status_line.decode('latin-1').strip().partition(' ')
+        code, _, reason = rest.partition(' ')
+        if not version.startswith('HTTP/') or not code.isdigit():
+            raise ConnectionError(f"Malformed status line from {parts.netloc}: {status_line[:100]!r}")
+        lines = []
+        while True:
+            line = await connection.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            lines.append(line)
+            if len(lines) > MAX_HEADERS:
+                raise ConnectionError(f"Too many response headers from {parts.netloc}")
+        headers = http.client.parse_headers(io.BytesIO(b''.join(lines) + b'\r\n'))
+        keep_alive = version != 'HTTP/1.0' or 'keep-alive' in headers.get('Connection', '').lower()
+        if not keep_alive or 'close' in headers.get('Connection', '').lower():
+            connection.reusable = False
+        return Response(urllib.parse.urlunsplit(parts), int(code), reason, headers, connection)
+
+    def _release(self, host, response):
+        """Return the connection to the pool if its response was read to the end"""
+        connection = response._connection
+        if response._done and connection.reusable and len(host.idle) < self.concurrency:
+            host.idle.append(connection)
+        else:
+            connection.close()
+
+    async def close(self):
+        """Close the idle connections"""
+        for host in self._hosts.values():
+            for connection in host.idle:
+                connection.close()
+                try:
+                    await connection.writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+            host.idle = []
+
+    # fanedit.org and Custom Search
+
+    async def fetch_listing(self, url, etag=None, last_modified=None, timeout=None):
+        """Fetch a listing page like scraper.fetch_listing(): (html, etag, last_modified, truncated)"""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        async def read_listing(response):
+            if response.status == 304:
+                metrics.count('listing.not_modified')
+                return None, etag, last_modified, False
+            html, truncated = await read_text_async(
+                metrics.counting(response, 'listing.bytes'), is_complete=is_listing_complete
+            )
+            if truncated:
+                await response.drain(DRAIN_BYTES)
+            return html, response.headers.get('ETag'), response.headers.get('Last-Modified'), truncated
+
+        return await self.get(url, headers, read_listing, timeout)
+
+    async def fetch_bytes(self, url, max_bytes=50 * 1024 * 1024, timeout=None):
+        """Fetch a resource in full like scraper.fetch_bytes()"""
+        async def read_capped(response):
+            body = await _read_all(response, max_bytes + 1)
+            if len(body) > max_bytes:
+                raise ValueError(f"Response from {url} exceeds {max_bytes} bytes")
+            return body
+
+        return await self.get(url, read_body=read_capped, timeout=timeout)
+
+    async def fetch_search_page(self, api_url, timeout=None):
+        """Run a Custom Search API query like scraper.fetch_search_page(): (results, total)"""
+        metrics.count('quota.queries')
+        body = await self.get(api_url, timeout=timeout)
+        metrics.count('search.bytes', len(body))
+        return scraper.parse_search_response(body)
+
+    async def search(self, api_key, search_engine_id, query, fetch_page=None,
+                     min_results=scraper.MIN_RESULTS, max_pages=scraper.MAX_PAGES):
+        """
+        scraper.search() on the engine: further pages of a thin first page are requested concurrently
+
+        fetch_page, if given, is a coroutine function replacing fetch_search_page().
+        """
+        fetch_page = fetch_page or self.fetch_search_page
+        results, total = await fetch_page(scraper.build_search_url(api_key, search_engine_id, query))
+        starts = scraper.more_page_starts(results, total, min_results, max_pages)
+        pages = await asyncio.gather(*(
+            fetch_page(scraper.build_search_url(api_key, search_engine_id, query, start)) for start in starts
+        ), return_exceptions=True)
+        for page in pages:
+            # Errors from further pages only drop that page
+            if not isinstance(page, BaseException):
+                results.extend(page[0])
+        return scraper.unique_hits(results)
+
+
+class EngineThread:
+    """
+    A FetchEngine on its own event loop thread, for blocking callers
+
+    The scraper service (see service.py) answers calls on several threads and
+    runs them through one EngineThread, so consecutive calls reuse pooled
+    keep-alive connections instead of paying a TLS handshake each. The methods
+    take the arguments of their scraper.py counterparts, block until the
+    response is in and raise the same errors.
+    """
+
+    def __init__(self, agent, concurrency=4, timeout=scraper.TIMEOUT):
+        self.engine = FetchEngine(agent, concurrency=concurrency, timeout=timeout)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fetch-engine', daemon=True)
+        self._thread.start()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def fetch_listing(self, url, agent=None, etag=None, last_modified=None, timeout=None):
+        """scraper.fetch_listing() on the engine (agent is ignored: the engine sends its own)"""
+        return self._run(self.engine.fetch_listing(url, etag=etag, last_modified=last_modified, timeout=timeout))
+
+    def fetch_bytes(self, url, agent=None, max_bytes=50 * 1024 * 1024, timeout=None):
+        """scraper.fetch_bytes() on the engine (agent is ignored: the engine sends its own)"""
+        return self._run(self.engine.fetch_bytes(url, max_bytes=max_bytes, timeout=timeout))
+
+    def fetch_search_page(self, api_url, timeout=None):
+        """scraper.fetch_search_page() on the engine"""
+        return self._run(self.engine.fetch_search_page(api_url, timeout=timeout))
+
+    def close(self):
+        """Close the pooled connections and stop the event loop thread"""
+        if self._loop.is_closed():
+            return
+        self._run(self.engine.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def _proxy_headers(proxy):
+    """Proxy-Authorization header lines for credentials in the proxy URL"""
+    if not proxy.username:
+        return []
+    credentials = f"{urllib.parse.unquote(proxy.username)}:{urllib.parse.unquote(proxy.password or '')}"
+    return [f"Proxy-Authorization: Basic {base64.b64encode(credentials.encode('utf-8')).decode('ascii')}"]
+
+
+async def _read_all(response, limit=None):
+    if limit is None:
+        return await response.read()
+    parts = []
+    received = 0
+    while received < limit:
+        chunk = await response.read(min(64 * 1024, limit - received))
+        if not chunk:
+            break
+        parts.append(chunk)
+        received += len(chunk)
+    return b''.join(parts)
@@ -0,0 +1,241 @@
+"""
+Per-invocation instrumentation for the IFDB scraper
+
+When enabled, every scraper invocation collects the time spent in each phase
+(network time to first byte, download, decode, field extraction, ListItem
+construction, ...), bytes transferred and counters such as cache hits and API
+queries. At the end the record is appended as one JSON line to a size-rotated
+file in the addon profile; summarize_metrics.py reports percentiles over it.
+
+When disabled, phase() and count() do nothing and cost next to nothing, so the
+calls can stay in the code paths permanently.
+"""
+
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Rotate the metrics file at this size, keeping this many old files
+MAX_FILE_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+_NULL = nullcontext()
+_recorder = None
+
+
+class Recorder:
+    """Phase durations and counters of one invocation; safe to use from several threads"""
+
+    def __init__(self, action):
+        self.action = action
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.counters = {}
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self):
+        """Return the invocation as a JSON-serialisable dict"""
+        with self._lock:
+            return {
+                'time': self.started,
+                'action': self.action,
+                'pid': os.getpid(),
+                'total': time.perf_counter() - self._start,
+                'phases': dict(self.phases),
+                'counters': dict(self.counters),
+            }
+
+
+class CountingReader:
+    """
+    Wraps a response and counts the bytes read from it under a counter name
+
+    Responses whose read() is a coroutine (fetch_engine.Response) are wrapped
+    alike; read() then returns a coroutine too.
+    """
+
+    def __init__(self, response, counter):
+        self._response = response
+        self._counter = counter
+
+    def read(self, size=-1):
+        data = self._response.read(size)
+        if inspect.isawaitable(data):
+            return self._counted(data)
+        count(self._counter, len(data))
+        return data
+
+    async def _counted(self, pending):
+        data = await pending
+        count(self._counter, len(data))
+        return data
+
+
+def start(action):
+    """Start recording an invocation"""
+    global _recorder
+    _recorder = Recorder(action)
+    return _recorder
+
+
+def enabled():
+    return _recorder is not None
+
+
+@contextmanager
+def _timed(recorder, name):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_time(name, time.perf_counter() - start_time)
+
+
+def phase(name):
+    """Context manager adding the time spent in its block to a phase"""
+    recorder = _recorder
+    if recorder is None:
+        return _NULL
+    return _timed(recorder, name)
+
+
+def count(name, amount=1):
+    """Add to a counter (cache hits, bytes, API queries, ...)"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.count(name, amount)
+
+
+def counting(response, counter):
+    """Return response wrapped so the bytes read from it are counted, if recording"""
+    if _recorder is None:
+        return response
+    return CountingReader(response, counter)
+
+
+def finish(path, max_bytes=MAX_FILE_BYTES, backups=BACKUP_COUNT):
+    """
+    Stop recording and append the record to a JSON lines file
+
+    Returns:
+        The record, or None if nothing was being recorded
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is None:
+        return None
+    record = recorder.record()
+    append_record(path, record, max_bytes, backups)
+    return record
+
+
+def append_record(path, record, max_bytes=MAX_FILE_BYTES, backups=BACKUP_COUNT):
+    """Append a record as one JSON line, rotating path to path.1 ... path.N when it is full"""
+    import json
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        full = os.path.getsize(path) >= max_bytes
+    except OSError:
+        full = False
+    if full:
+        for index in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        if backups > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    # One write() of a short line in append mode does not interleave with other processes
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+def read_records(path):
+    """Yield the records of a metrics file and its rotated predecessors, oldest first"""
+    import glob
+    import json
+
+    rotated = sorted(glob.glob(f"{glob.escape(path)}.[0-9]*"), key=lambda p: int(p.rsplit('.', 1)[1]), reverse=True)
+    for filename in rotated + [path]:
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+        except OSError:
+            continue
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of a list of numbers (fraction between 0 and 1)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+
+def summarize(records, action=None):
+    """
+    Aggregate metrics records per action
+
+    Args:
+        records: Iterable of records as written by finish()
+        action: Only include records of this action (optional)
+
+    Returns:
+        Dict mapping action to {'calls', 'phases', 'counters'}: phases maps each
+        phase (and 'total') to p50/p95/p99/max seconds over the calls that had
+        it, counters maps each counter to its sum over all calls
+    """
+    durations = {}
+    counters = {}
+    calls = {}
+    for record in records:
+        name = record.get('action', '')
+        if action is not None and name != action:
+            continue
+        calls[name] = calls.get(name, 0) + 1
+        phases = durations.setdefault(name, {})
+        phases.setdefault('total', []).append(record.get('total', 0.0))
+        for phase_name, seconds in record.get('phases', {}).items():
+            phases.setdefault(phase_name, []).append(seconds)
+        totals = counters.setdefault(name, {})
+        for counter, amount in record.get('counters', {}).items():
+            totals[counter] = totals.get(counter, 0) + amount
+
+    summary = {}
+    for name in calls:
+        summary[name] = {
+            'calls': calls[name],
+            'phases': {
+                phase_name: {
+                    'count': len(values),
+                    'p50': percentile(values, 0.50),
+                    'p95': percentile(values, 0.95),
+                    'p99': percentile(values, 0.99),
+                    'max': max(values),
+                }
+                for phase_name, values in durations[name].items()
+            },
+            'counters': counters[name],
+        }
+    return summary
@@ -0,0 +1,53 @@
+"""
+Kodi movie .nfo writer for parsed fanedit.org listings
+"""
+
+import xml.etree.ElementTree as ET
+
+from resources.lib.records import UNIQUE_ID_TYPE
+
+
+def build_movie_nfo(record, listing_id=None):
+    """
+    Build a Kodi movie .nfo document
+    
+    Args:
+        record: FaneditRecord of the listing (see resources.lib.records)
+        listing_id: fanedit.org listing ID, written as the default unique ID
+            so Kodi and the NfoUrl action can skip the search (optional)
+    
+    Returns:
+        The .nfo document as a string
+    """
+    movie = ET.Element('movie')
+    
+    def add(tag, text, **attrib):
+        element = ET.SubElement(movie, tag, attrib)
+        element.text = str(text)
+        return element
+    
+    if record.title is not None:
+        add('title', record.title)
+    if listing_id is not None:
+        add('uniqueid', listing_id, type=UNIQUE_ID_TYPE, default='true')
+    if record.rating is not None:
+        ratings = ET.SubElement(movie, 'ratings')
+        rating = ET.SubElement(ratings, 'rating', name='ifdb', max='10', default='true')
+        ET.SubElement(rating, 'value').text = str(record.rating)
+        if record.votes is not None:
+            ET.SubElement(rating, 'votes').text = str(record.votes)
+    if record.plot is not None:
+        add('plot', record.plot)
+    if record.tagline is not None:
+        add('tagline', record.tagline)
+    if record.thumb is not None:
+        add('thumb', record.thumb, aspect='poster')
+    for genre in record.genres:
+        add('genre', genre)
+    for director in record.directors:
+        add('director', director)
+    if record.year is not None:
+        add('year', record.year)
+    
+    ET.indent(movie, space='    ')
+    return '<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>\n' + ET.tostring(movie, encoding='unicode') + '\n'
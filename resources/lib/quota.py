@@ -0,0 +1,327 @@
+"""
+Google Custom Search quota governor shared by all scraper processes
+
+Kodi runs several scraper processes in parallel during a library scan, and the
+batch tools run several threads. They all draw API queries from one token
+bucket stored in an SQLite database: each query takes a token, tokens refill
+at `rate` per second up to `burst`, and at most `daily_budget` queries are
+made per quota day (Google resets quotas at midnight Pacific time). Every
+update runs in a `BEGIN IMMEDIATE` transaction, so the database file lock
+serializes the processes.
+
+When Google reports a rate limit, every process backs off (exponential, with
+jitter). When it reports the daily quota as exhausted, no process queries
+again until the quota resets.
+"""
+
+import datetime
+import json
+import random
+import time
+from contextlib import closing
+
+from resources.lib.cache import open_database
+
+# Error reasons in Google API error responses
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+DAILY_LIMIT_REASONS = ('dailyLimitExceeded', 'quotaExceeded')
+
+# Backoff after a rate-limit error: BACKOFF_BASE * 2**n seconds (capped), times a jitter factor
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+BACKOFF_JITTER = (0.5, 1.5)
+
+# Per-day counters kept in quota_days
+COUNTERS = ('used', 'throttled', 'denied', 'rate_limited', 'exhausted')
+
+try:
+    from zoneinfo import ZoneInfo
+    _PACIFIC = ZoneInfo('America/Los_Angeles')
+except Exception:
+    # No time zone database: Pacific standard time is close enough
+    _PACIFIC = datetime.timezone(datetime.timedelta(hours=-8))
+
+
+class QuotaExceeded(Exception):
+    """No API query may be made now; `retry_after` is the wait in seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"{reason} (retry in {retry_after:.0f}s)")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def quota_day(now=None):
+    """Return the quota day (a date string in Pacific time) for a timestamp"""
+    return datetime.datetime.fromtimestamp(time.time() if now is None else now, _PACIFIC).date().isoformat()
+
+
+def next_reset(now=None):
+    """Return the timestamp at which the current quota day ends"""
+    now = time.time() if now is None else now
+    day = datetime.datetime.fromtimestamp(now, _PACIFIC).date()
+    midnight = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time(), _PACIFIC)
+    return midnight.timestamp()
+
+
+def classify_error(error):
+    """
+    Recognise Google quota and rate-limit errors
+
+    Args:
+        error: urllib.error.HTTPError from the Custom Search API (its body is read)
+
+    Returns:
+        'daily' if the daily quota is exhausted, 'rate' for a rate limit, or None
+    """
+    if error.code not in (403, 429):
+        return None
+    try:
+        body = json.loads(error.read().decode('utf-8'))['error']
+    except Exception:
+        body = {}
+    reasons = {entry.get('reason') for entry in body.get('errors', [])}
+    message = str(body.get('message', '')).lower()
+    if reasons & set(DAILY_LIMIT_REASONS) or 'per day' in message:
+        return 'daily'
+    if reasons & set(RATE_LIMIT_REASONS) or error.code == 429:
+        return 'rate'
+    return None
+
+
+class QuotaGovernor:
+    """
+    Cross-process token bucket with a daily budget and shared backoff
+    """
+
+    def __init__(self, path, daily_budget=100, rate=1.0, burst=None):
+        self.path = path
+        self.daily_budget = daily_budget
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        with closing(open_database(path)) as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS quota_state ('
+                ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+                ' tokens REAL NOT NULL,'
+                ' updated REAL NOT NULL,'
+                ' blocked_until REAL NOT NULL DEFAULT 0,'
+                ' block_reason TEXT,'
+                ' backoff INTEGER NOT NULL DEFAULT 0,'
+                ' notified INTEGER NOT NULL DEFAULT 0)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS quota_days ('
+                ' day TEXT PRIMARY KEY,'
+                + ','.join(f' {name} INTEGER NOT NULL DEFAULT 0' for name in COUNTERS)
+                + ')'
+            )
+            conn.execute(
+                'INSERT OR IGNORE INTO quota_state (id, tokens, updated) VALUES (1, ?, ?)',
+                (self.burst, time.time())
+            )
+            conn.commit()
+
+    def _transaction(self):
+        """Open a connection holding the write lock until it is committed and closed"""
+        conn = open_database(self.path)
+        conn.isolation_level = None
+        conn.execute('BEGIN IMMEDIATE')
+        return conn
+
+    @staticmethod
+    def _count(conn, name, day):
+        conn.execute('INSERT OR IGNORE INTO quota_days (day) VALUES (?)', (day,))
+        conn.execute(f'UPDATE quota_days SET {name} = {name} + 1 WHERE day = ?', (day,))
+
+    def acquire(self, max_wait=10.0):
+        """
+        Take one query from the bucket, waiting for a token if needed
+
+        Args:
+            max_wait: Longest time to wait (seconds) for the rate limit or a backoff
+
+        Raises:
+            QuotaExceeded: The daily budget is spent, or the wait would exceed max_wait
+        """
+        self._acquire(max_wait, count_denied=True)
+
+    def try_acquire(self):
+        """
+        Take one query from the bucket only if one is free right now
+
+        For optional queries (search variants): a query that is not made is not
+        counted as denied.
+
+        Returns:
+            True if a query was taken
+        """
+        try:
+            self._acquire(0, count_denied=False)
+        except QuotaExceeded:
+            return False
+        return True
+
+    def _acquire(self, max_wait, count_denied):
+        deadline = time.monotonic() + max_wait
+        throttled = False
+        while True:
+            conn = self._transaction()
+            try:
+                now = time.time()
+                day = quota_day(now)
+                tokens, updated, blocked_until, block_reason = conn.execute(
+                    'SELECT tokens, updated, blocked_until, block_reason FROM quota_state WHERE id = 1'
+                ).fetchone()
+                used = (conn.execute('SELECT used FROM quota_days WHERE day = ?', (day,)).fetchone() or (0,))[0]
+
+                if blocked_until > now:
+                    wait, reason = blocked_until - now, block_reason or 'backing off'
+                elif used >= self.daily_budget:
+                    wait, reason = next_reset(now) - now, 'daily budget spent'
+                else:
+                    tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+                    if tokens >= 1:
+                        conn.execute(
+                            'UPDATE quota_state SET tokens = ?, updated = ?, notified = 0 WHERE id = 1',
+                            (tokens - 1, now)
+                        )
+                        self._count(conn, 'used', day)
+                        if throttled:
+                            self._count(conn, 'throttled', day)
+                        conn.execute('COMMIT')
+                        return
+                    conn.execute('UPDATE quota_state SET tokens = ?, updated = ? WHERE id = 1', (tokens, now))
+                    wait, reason = (1 - tokens) / self.rate, 'rate limit'
+
+                if time.monotonic() + wait > deadline:
+                    if count_denied:
+                        self._count(conn, 'denied', day)
+                    conn.execute('COMMIT')
+                    raise QuotaExceeded(reason, wait)
+                conn.execute('COMMIT')
+            finally:
+                conn.close()
+            # Wait outside the lock; another process may take the token first
+            throttled = True
+            time.sleep(wait)
+
+    def call(self, fetch, *args, max_wait=10.0, **kwargs):
+        """
+        Make one API query through the governor
+
+        Waits for a token, runs fetch(*args, **kwargs) and reports the outcome.
+        A quota or rate-limit error from Google is recorded and raised as
+        QuotaExceeded; other errors are raised unchanged.
+
+        Raises:
+            QuotaExceeded: No query may be made now, or Google reported a quota error
+        """
+        self.acquire(max_wait=max_wait)
+        return self.run(fetch, *args, **kwargs)
+
+    def run(self, fetch, *args, **kwargs):
+        """
+        Make one API query taken with acquire() or try_acquire() and report its
+        outcome, as call() does
+
+        Raises:
+            QuotaExceeded: Google reported a quota error
+        """
+        import urllib.error
+
+        try:
+            result = fetch(*args, **kwargs)
+        except urllib.error.HTTPError as e:
+            kind = classify_error(e)
+            if kind is None:
+                raise
+            retry_after = self.report_limited(kind)
+            raise QuotaExceeded(
+                'daily quota exhausted' if kind == 'daily' else 'rate limited by Google', retry_after
+            ) from e
+        self.report_success()
+        return result
+
+    def report_success(self):
+        """Record that a query succeeded; ends any rate-limit backoff"""
+        conn = self._transaction()
+        try:
+            conn.execute('UPDATE quota_state SET backoff = 0 WHERE id = 1 AND backoff > 0')
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def report_limited(self, kind):
+        """
+        Record a quota error classified by classify_error()
+
+        A rate limit blocks all processes for a jittered, exponentially growing
+        interval; an exhausted daily quota blocks them until the quota resets.
+
+        Returns:
+            Seconds until queries are allowed again
+        """
+        conn = self._transaction()
+        try:
+            now = time.time()
+            day = quota_day(now)
+            if kind == 'daily':
+                until, reason = next_reset(now), 'daily quota exhausted'
+                self._count(conn, 'exhausted', day)
+                conn.execute(
+                    'UPDATE quota_state SET blocked_until = ?, block_reason = ? WHERE id = 1', (until, reason)
+                )
+            else:
+                backoff = conn.execute('SELECT backoff FROM quota_state WHERE id = 1').fetchone()[0]
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** backoff) * random.uniform(*BACKOFF_JITTER)
+                until = now + delay
+                self._count(conn, 'rate_limited', day)
+                conn.execute(
+                    'UPDATE quota_state SET blocked_until = MAX(blocked_until, ?), block_reason = ?,'
+                    ' backoff = backoff + 1 WHERE id = 1',
+                    (until, 'rate limited by Google')
+                )
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        return until - now
+
+    def claim_notification(self):
+        """
+        Return True for the first caller after queries were blocked, so a scan
+        shows one notification instead of one per item
+        """
+        conn = self._transaction()
+        try:
+            claimed = conn.execute('UPDATE quota_state SET notified = 1 WHERE id = 1 AND notified = 0').rowcount
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        return claimed == 1
+
+    def counters(self, day=None):
+        """
+        Return the quota counters for a quota day (default: today)
+
+        Returns:
+            Dict with the day, budget, remaining queries, current block and the
+            per-day counters (used, throttled, denied, rate_limited, exhausted)
+        """
+        day = day or quota_day()
+        with closing(open_database(self.path)) as conn:
+            row = conn.execute(
+                f'SELECT {", ".join(COUNTERS)} FROM quota_days WHERE day = ?', (day,)
+            ).fetchone() or (0,) * len(COUNTERS)
+            blocked_until, block_reason = conn.execute(
+                'SELECT blocked_until, block_reason FROM quota_state WHERE id = 1'
+            ).fetchone()
+        counters = dict(zip(COUNTERS, row))
+        counters.update(
+            day=day,
+            budget=self.daily_budget,
+            remaining=max(0, self.daily_budget - counters['used']),
+            blocked_for=max(0.0, blocked_until - time.time()),
+            block_reason=block_reason if blocked_until > time.time() else None,
+        )
+        return counters
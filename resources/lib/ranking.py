@@ -0,0 +1,102 @@
+"""
+Search query variants and relevance ranking of search results
+
+A single "{title} {year}" query misses the right fanedit when Kodi's year is
+wrong or missing, or when canonicalization dropped a word the listing title
+needs. search_movie() therefore sends the variants from query_variants()
+concurrently and merges their hits with rank_hits(): duplicates (the same
+listing under different URL spellings) are dropped, and the hits are ordered
+by relevance(), a title similarity with a bonus for a matching year. Kodi
+receives the relevance with each result and auto-selects the best match.
+"""
+
+import re
+
+from resources.lib.canonical import canonicalize, plain_title
+from resources.lib.records import SearchHit, canonical_listing_url
+from resources.lib.title_index import normalize_title, parse_year, score, similarity, trigrams
+
+# "... - Fanedit.org" and similar suffixes of result page titles
+_SITE_SUFFIX = re.compile(r'\s*[-|–—:]\s*(?:www\.)?fanedit(?:\.org)?\s*$', re.IGNORECASE)
+
+
+def query_variants(title, year=''):
+    """
+    Return the distinct search queries for a title as Kodi passes it
+
+    1. The canonical title with the year: the query sent before variants
+       existed, and the search cache key
+    2. The canonical title alone, when a year is known (it may be wrong)
+    3. The plain title, when it has words canonicalization drops ("Edition", ...)
+
+    Args:
+        title: Title or filename
+        year: Release year (optional)
+
+    Returns:
+        List of queries, primary query first
+    """
+    canonical, year = canonicalize(title, year)
+    queries = [f"{canonical} {year}" if year else canonical]
+    if year:
+        queries.append(canonical)
+    plain = plain_title(title, year)
+    if plain and normalize_title(plain) != canonical:
+        queries.append(plain)
+    return queries
+
+
+def relevance(hit_title, title, year=''):
+    """
+    Return how well a result matches the searched title, from 0.0 to 1.0
+
+    Args:
+        hit_title: Title of the result (page title or "Title (year)" label)
+        title: Searched title (canonical or as Kodi passed it)
+        year: Searched year (optional)
+    """
+    return relevances([hit_title], title, year)[0]
+
+
+def relevances(hit_titles, title, year=''):
+    """Return relevance() of each result title, canonicalizing the searched title once"""
+    query, year = canonicalize(title, year)
+    query_grams = trigrams(query)
+    year = parse_year(year)
+    scores = []
+    for hit_title in hit_titles:
+        hit_canonical, hit_year = canonicalize(_SITE_SUFFIX.sub('', hit_title))
+        hit_grams = trigrams(hit_canonical)
+        if not hit_grams or not query_grams:
+            scores.append(0.0)
+            continue
+        # Scored like a match of the local title index
+        title_similarity = similarity(len(hit_grams & query_grams), len(hit_grams), len(query_grams))
+        scores.append(score(title_similarity, year, parse_year(hit_year)))
+    return scores
+
+
+def rank_hits(result_lists, title, year=''):
+    """
+    Merge the results of several queries into one ranked list
+
+    Args:
+        result_lists: One list of SearchHit per query, primary query first
+        title: Searched title
+        year: Searched year (optional)
+
+    Returns:
+        (hits, scores): SearchHit list with canonical listing URLs and no
+        duplicates, by relevance (ties keep the order of the queries and of
+        their results), and the relevance of each hit
+    """
+    merged = {}
+    for hits in result_lists:
+        for hit_title, hit_url in hits:
+            url = canonical_listing_url(hit_url) or hit_url
+            if url not in merged:
+                merged[url] = SearchHit(hit_title, url)
+    hits = list(merged.values())
+    scores = relevances([hit.title for hit in hits], title, year)
+    order = sorted(range(len(hits)), key=lambda index: (-scores[index], index))
+    return [hits[index] for index in order], [scores[index] for index in order]
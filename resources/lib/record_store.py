@@ -0,0 +1,284 @@
+"""
+Compact read-only store of parsed fanedit.org listings
+
+The whole catalogue is written once into a single file (see write_store()):
+every FaneditRecord is packed into a short binary form (varints, no field
+names) and compressed on its own with zlib against a preset dictionary of
+sample records stored in the file, so the repeated parts (poster URL prefix,
+genre and faneditor names, common words) cost next to nothing. An index of
+(key hash, offset, length) entries sorted by hash ends the file.
+
+RecordStore memory-maps the file: opening it reads a 32-byte header, and a
+lookup is a binary search over the mapped index plus one decompression, so a
+freshly started scraper process pays for neither a database connection nor
+loading the catalogue. Records are keyed by listing ID; lookups accept the
+listing URL too.
+
+File layout (little-endian):
+    header   magic, record count, dictionary offset/length, index offset
+    zdict    preset compression dictionary
+    records  zlib streams of packed records
+    index    count x (64-bit key hash, 32-bit offset, 32-bit length)
+"""
+
+import mmap
+import os
+import struct
+import zlib
+
+from resources.lib.records import FIELDS, FaneditRecord, listing_id
+
+MAGIC = b'IFDBREC1'
+_HEADER = struct.Struct('<8sIIII8x')
+_ENTRY = struct.Struct('<QII')
+
+# Size of the preset dictionary built from sample records (zlib's maximum window)
+ZDICT_SIZE = 32 * 1024
+
+_STRING_FIELDS = ('title', 'plot', 'tagline', 'thumb')
+_LIST_FIELDS = ('genres', 'directors')
+
+
+def store_path(catalogue_path):
+    """Return the path of the record store written next to a catalogue database"""
+    return os.path.splitext(catalogue_path)[0] + '.rec'
+
+
+def record_key(url):
+    """Return the store key of a listing URL or ID: the listing ID, or the URL itself for other URLs"""
+    if '://' not in url:
+        return url
+    return listing_id(url) or url
+
+
+def _hash(key):
+    # Two zlib checksums make a 64-bit hash without importing hashlib (slow to load);
+    # collisions only cost an extra decompression, as stored keys are compared
+    data = key.encode('utf-8')
+    return zlib.crc32(data) << 32 | zlib.adler32(data)
+
+
+def _put_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _put_string(out, value):
+    # 0 stands for None, so lengths are stored plus one
+    if value is None:
+        out.append(0)
+        return
+    encoded = value.encode('utf-8')
+    _put_varint(out, len(encoded) + 1)
+    out += encoded
+
+
+def _get_string(data, pos):
+    length, pos = _get_varint(data, pos)
+    if length == 0:
+        return None, pos
+    end = pos + length - 1
+    return data[pos:end].decode('utf-8'), end
+
+
+def _put_number(out, value):
+    _put_varint(out, 0 if value is None else value + 1)
+
+
+def _get_number(data, pos):
+    value, pos = _get_varint(data, pos)
+    return (value - 1 if value else None), pos
+
+
+def pack_record(key, record):
+    """Pack a key and a FaneditRecord into bytes (uncompressed)"""
+    out = bytearray()
+    _put_string(out, key)
+    for field in FIELDS:
+        value = getattr(record, field)
+        if field in _STRING_FIELDS:
+            _put_string(out, value)
+        elif field in _LIST_FIELDS:
+            _put_varint(out, len(value))
+            for name in value:
+                _put_string(out, name)
+        elif field == 'rating':
+            # Ratings have at most two decimals
+            _put_number(out, None if value is None else round(value * 100))
+        else:
+            _put_number(out, value)
+    return bytes(out)
+
+
+def unpack_record(data):
+    """Return the (key, FaneditRecord) packed by pack_record()"""
+    key, pos = _get_string(data, 0)
+    values = {}
+    for field in FIELDS:
+        if field in _STRING_FIELDS:
+            values[field], pos = _get_string(data, pos)
+        elif field in _LIST_FIELDS:
+            count, pos = _get_varint(data, pos)
+            names = []
+            for _ in range(count):
+                name, pos = _get_string(data, pos)
+                names.append(name)
+            values[field] = tuple(names)
+        elif field == 'rating':
+            rating, pos = _get_number(data, pos)
+            values[field] = None if rating is None else rating / 100
+        else:
+            values[field], pos = _get_number(data, pos)
+    return key, FaneditRecord(**values)
+
+
+def _build_zdict(packed):
+    """Return a preset dictionary: evenly spaced sample records, up to ZDICT_SIZE bytes"""
+    if not packed:
+        return b''
+    average = sum(len(data) for data in packed) / len(packed)
+    samples = max(1, int(ZDICT_SIZE / max(average, 1)))
+    step = max(1, len(packed) // samples)
+    # zlib favours the end of the dictionary, so nothing is gained by exceeding its window
+    return b''.join(packed[::step])[-ZDICT_SIZE:]
+
+
+def write_store(path, items):
+    """
+    Write a record store, replacing any existing file atomically
+
+    Args:
+        path: Store file
+        items: Iterable of (listing URL or ID, FaneditRecord); later duplicates win
+
+    Returns:
+        Number of records written
+    """
+    records = {}
+    for url, record in items:
+        records[record_key(url)] = record
+    packed = [pack_record(key, records[key]) for key in sorted(records)]
+    zdict = _build_zdict(packed)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    partial = f"{path}.{os.getpid()}.part"
+    entries = []
+    with open(partial, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        f.write(zdict)
+        offset = _HEADER.size + len(zdict)
+        for key, data in zip(sorted(records), packed):
+            compressor = zlib.compressobj(9, zdict=zdict) if zdict else zlib.compressobj(9)
+            compressed = compressor.compress(data) + compressor.flush()
+            f.write(compressed)
+            entries.append((_hash(key), offset, len(compressed)))
+            offset += len(compressed)
+        entries.sort()
+        for entry in entries:
+            f.write(_ENTRY.pack(*entry))
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, len(entries), _HEADER.size, len(zdict), offset))
+    os.replace(partial, path)
+    return len(entries)
+
+
+class RecordStore:
+    """
+    Memory-mapped reader of a store written by write_store()
+
+    The file is mapped on first use, so creating a RecordStore costs nothing
+    when no lookup is made.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._zdict = None
+        self._count = 0
+        self._index = 0
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _open(self):
+        if self._map is not None:
+            return
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self._count, dict_offset, dict_length, self._index = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a record store")
+            self._zdict = self._map[dict_offset:dict_offset + dict_length]
+        except Exception:
+            self.close()
+            raise
+
+    def get(self, url):
+        """
+        Look up a listing
+
+        Args:
+            url: Listing URL or listing ID
+
+        Returns:
+            FaneditRecord, or None if the listing is not in the store
+        """
+        self._open()
+        key = record_key(url)
+        wanted = _hash(key)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if _ENTRY.unpack_from(self._map, self._index + middle * _ENTRY.size)[0] < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        # Keys whose hashes collide are adjacent
+        for position in range(low, self._count):
+            entry_hash, offset, length = _ENTRY.unpack_from(self._map, self._index + position * _ENTRY.size)
+            if entry_hash != wanted:
+                break
+            decompressor = zlib.decompressobj(zdict=self._zdict) if self._zdict else zlib.decompressobj()
+            stored_key, record = unpack_record(decompressor.decompress(self._map[offset:offset + length]))
+            if stored_key == key:
+                return record
+        return None
+
+    def __contains__(self, url):
+        return self.get(url) is not None
+
+    def __len__(self):
+        self._open()
+        return self._count
+
+    def close(self):
+        """Unmap and close the file"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,241 @@
+"""
+Kodi-independent records for fanedit.org listings and search results
+
+parse_listing() turns a listing page into a FaneditRecord, parse_search()
+turns a Custom Search API response into SearchHit tuples and find_listing_url()
+finds the listing an .nfo file points at. None of them depends on
+any xbmc* module or on the network, so the same code serves the addon, the
+batch tools, the caches and the benchmarks.
+
+Records are compact: FaneditRecord uses __slots__ (no per-instance dict) and
+SearchHit is a named tuple. Both serialize to short JSON arrays without field
+names for the caches.
+"""
+
+import json
+import re
+import urllib.parse
+from collections import namedtuple
+
+# Listing fields, in the order of FaneditRecord.to_list()
+FIELDS = ('title', 'plot', 'year', 'genres', 'directors', 'rating', 'votes', 'tagline', 'thumb')
+
+SITE = 'fanedit.org'
+
+# fanedit.org paths that never hold a listing
+NON_LISTING_PATHS = ('/forum', '/category', '/categories', '/tag', '/search', '/author', '/page/', '/component/')
+
+# A listing ID is the slug of its URL: https://fanedit.org/<listing ID>/. It is
+# the default unique ID of a movie in Kodi and in .nfo files, of this type:
+UNIQUE_ID_TYPE = 'fanedit'
+_LISTING_ID = re.compile(r'[A-Za-z0-9][\w-]*\Z')
+
+# Listing URLs, and listing IDs in <uniqueid type="fanedit">, inside .nfo contents
+_NFO_URL = re.compile(r'(?<![\w.-])(?:https?://)?(?:www\.)?fanedit\.org/[^\s<>"\'\[\]]+', re.IGNORECASE)
+_NFO_UNIQUE_ID = re.compile(
+    r'<uniqueid\b[^>]*\btype\s*=\s*["\'](?:fanedit|ifdb)["\'][^>]*>\s*([^<\s]+)\s*</uniqueid>', re.IGNORECASE
+)
+
+# Fields holding a list of names; stored as tuples on records
+_LIST_FIELDS = ('genres', 'directors')
+
+# A search result: the page title and URL of a fanedit.org listing
+SearchHit = namedtuple('SearchHit', ('title', 'url'))
+
+
+class FaneditRecord:
+    """
+    Metadata of one fanedit.org listing
+
+    Absent fields are None (genres and directors: an empty tuple).
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, title=None, plot=None, year=None, genres=(), directors=(),
+                 rating=None, votes=None, tagline=None, thumb=None):
+        self.title = title
+        self.plot = plot
+        self.year = year
+        self.genres = tuple(genres)
+        self.directors = tuple(directors)
+        self.rating = rating
+        self.votes = votes
+        self.tagline = tagline
+        self.thumb = thumb
+
+    @classmethod
+    def from_dict(cls, fields):
+        """Build a record from a dict of fields as returned by extract_fields()"""
+        return cls(**{field: fields[field] for field in FIELDS if fields.get(field) is not None})
+
+    def to_dict(self):
+        """Return the present fields as a dict (lists for genres and directors)"""
+        fields = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if field in _LIST_FIELDS:
+                if value:
+                    fields[field] = list(value)
+            elif value is not None:
+                fields[field] = value
+        return fields
+
+    @classmethod
+    def from_list(cls, values):
+        """Build a record from the list returned by to_list()"""
+        return cls(*[
+            () if value is None and field in _LIST_FIELDS else value
+            for field, value in zip(FIELDS, values)
+        ])
+
+    def to_list(self):
+        """Return the fields in FIELDS order, for compact JSON serialization"""
+        return [list(value) if field in _LIST_FIELDS else value for field, value in self._items()]
+
+    def replace(self, **changes):
+        """Return a copy of the record with some fields changed"""
+        values = dict(self._items())
+        values.update(changes)
+        return FaneditRecord(**values)
+
+    def _items(self):
+        return ((field, getattr(self, field)) for field in FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, FaneditRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    def __repr__(self):
+        present = ', '.join(f"{field}={value!r}" for field, value in self._items() if value not in (None, ()))
+        return f"FaneditRecord({present})"
+
+
+def parse_listing(html):
+    """
+    Extract the metadata of a fanedit.org listing page
+
+    Args:
+        html: Page content
+
+    Returns:
+        FaneditRecord
+    """
+    # Imported here: compiling the field patterns is not needed to read cached records
+    from resources.lib.extract import extract_fields
+
+    return FaneditRecord.from_dict(extract_fields(html))
+
+
+def is_listing_url(url):
+    """Return True if url can be a fanedit.org listing (not the forum, a category, ...)"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.netloc.lower() not in (SITE, 'www.' + SITE):
+        return False
+    path = parts.path.lower()
+    return path.strip('/') != '' and not path.startswith(NON_LISTING_PATHS)
+
+
+def listing_url(listing_id):
+    """Return the canonical URL of a listing ID, or None if it is not one"""
+    if not _LISTING_ID.match(listing_id):
+        return None
+    url = f"https://{SITE}/{listing_id}/"
+    return url if is_listing_url(url) else None
+
+
+def listing_id(url):
+    """Return the listing ID (slug) of a fanedit.org listing URL, or None"""
+    if not is_listing_url(url):
+        return None
+    slug = urllib.parse.urlsplit(url).path.strip('/')
+    return slug if _LISTING_ID.match(slug) else None
+
+
+def resolve_listing(reference):
+    """
+    Return the listing URL a getdetails reference stands for
+
+    Args:
+        reference: A URL (returned unchanged), a listing ID, or a JSON object
+            of unique IDs such as {"fanedit": "<listing ID>"}
+
+    Returns:
+        URL, or None if reference is neither
+    """
+    reference = reference.strip()
+    if '://' in reference:
+        return reference
+    if reference.startswith('{'):
+        try:
+            reference = str(json.loads(reference).get(UNIQUE_ID_TYPE, ''))
+        except (ValueError, AttributeError):
+            return None
+    return listing_url(reference)
+
+
+def canonical_listing_url(url):
+    """
+    Return the canonical form of a fanedit.org listing URL
+
+    The scheme is added if missing and made https, www. is dropped, and the
+    query and fragment are removed, so the result matches the URLs the search
+    returns (and the cache keys made from them).
+
+    Returns:
+        The URL as https://fanedit.org/<listing ID>/, or None if url is not
+        a listing URL
+    """
+    if '://' not in url:
+        url = 'https://' + url
+    slug = listing_id(url)
+    return listing_url(slug) if slug is not None else None
+
+
+def find_listing_url(nfo):
+    """
+    Find the fanedit.org listing an .nfo file points at
+
+    Recognises listing URLs anywhere in the contents (a URL-only .nfo, or one
+    inside a full .nfo) and listing IDs in <uniqueid type="fanedit">. Forum,
+    category and other non-listing pages are skipped.
+
+    Args:
+        nfo: Contents of the .nfo file
+
+    Returns:
+        Canonical listing URL, or None if the .nfo points at no listing
+    """
+    for match in _NFO_UNIQUE_ID.finditer(nfo):
+        url = listing_url(match.group(1))
+        if url is not None:
+            return url
+    for match in _NFO_URL.finditer(nfo):
+        url = canonical_listing_url(match.group(0).rstrip('.,;)'))
+        if url is not None:
+            return url
+    return None
+
+
+def parse_search(data):
+    """
+    Extract the fanedit.org listings from a Custom Search API response
+
+    Args:
+        data: Response body (bytes or str) or the decoded JSON object
+
+    Returns:
+        List of SearchHit in API order; forum, category and other non-listing
+        pages are dropped
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    if isinstance(data, str):
+        data = json.loads(data)
+    hits = []
+    for item in data.get('items', []):
+        item_url = item.get('link', '')
+        if is_listing_url(item_url):
+            hits.append(SearchHit(item.get('title', ''), item_url))
+    return hits
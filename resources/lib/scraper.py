@@ -0,0 +1,279 @@
+"""
+Network layer of the IFDB scraper: Google Custom Search and fanedit.org listing pages
+Shared by ifdb.py and the headless tools; does not depend on any xbmc* module.
+"""
+
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from resources.lib import metrics
+from resources.lib.download import read_text
+from resources.lib.extract import is_listing_complete
+from resources.lib.records import SITE, parse_search
+
+# Endpoints. IFDB_CSE_URL and IFDB_SITE_URL point them at a stand-in server
+# such as benchmarks/replay_server.py; listing URLs keep their fanedit.org form
+# everywhere else (caches, results returned to Kodi).
+CSE_URL = os.environ.get('IFDB_CSE_URL') or 'https://www.googleapis.com/customsearch/v1'
+SITE_URL = os.environ.get('IFDB_SITE_URL') or None
+TIMEOUT = 30
+
+# Results per Custom Search page (the API maximum)
+PAGE_SIZE = 10
+
+# Partial response: only the fields fetch_search_page() reads
+RESPONSE_FIELDS = 'items(title,link),searchInformation/totalResults'
+
+# Further pages are requested when the first has fewer listings than MIN_RESULTS
+MIN_RESULTS = 3
+MAX_PAGES = 3
+
+
+def user_agent(version):
+    """User-Agent sent to fanedit.org; includes the addon version for website admins and debugging"""
+    return f'Kodi-IFDB/{version} (https://kodi.tv)'
+
+
+def site_url(url):
+    """Return the URL to request for a fanedit.org URL: unchanged unless SITE_URL is set"""
+    if not SITE_URL:
+        return url
+    parts = urllib.parse.urlsplit(url)
+    if parts.netloc.lower() not in (SITE, 'www.' + SITE):
+        return url
+    base = urllib.parse.urlsplit(SITE_URL)
+    return urllib.parse.urlunsplit(
+        (base.scheme, base.netloc, base.path.rstrip('/') + parts.path, parts.query, parts.fragment)
+    )
+
+
+def build_search_url(api_key, search_engine_id, query, start=1):
+    """
+    Build a Custom Search API URL with proper parameter encoding
+    
+    The query is restricted to fanedit.org on the server side, and the response
+    is trimmed to the fields fetch_search_page() reads.
+    """
+    params = {
+        'key': api_key,
+        'cx': search_engine_id,
+        'q': query,
+        'siteSearch': SITE,
+        'siteSearchFilter': 'i',
+        'num': PAGE_SIZE,
+        'fields': RESPONSE_FIELDS,
+    }
+    if start > 1:
+        params['start'] = start
+    return f"{CSE_URL}?{urllib.parse.urlencode(params)}"
+
+
+def fetch_search_page(api_url, timeout=TIMEOUT):
+    """
+    Run a Custom Search API query for one page of results
+    
+    Args:
+        api_url: URL built by build_search_url()
+        timeout: Socket timeout in seconds
+    
+    Returns:
+        Tuple of (results, total): SearchHit (title, url) tuples for fanedit.org
+        listings in API order, and the total number of matches reported by the API
+    
+    Raises:
+        urllib.error.HTTPError: The API rejected the request
+    """
+    metrics.count('quota.queries')
+    # urlopen() returns once the response headers are in: DNS, connect, TLS and
+    # server time are all in the ttfb phase
+    with metrics.phase('search.ttfb'):
+        response = urllib.request.urlopen(api_url, timeout=timeout)
+    with response:
+        with metrics.phase('search.download'):
+            body = response.read()
+    metrics.count('search.bytes', len(body))
+    with metrics.phase('search.decode'):
+        return parse_search_response(body)
+
+
+def parse_search_response(body):
+    """Return the (results, total) of a Custom Search API response body, as fetch_search_page() does"""
+    data = json.loads(body.decode('utf-8'))
+    # The query is already restricted to fanedit.org; this drops forum,
+    # category and other non-listing pages
+    results = parse_search(data)
+    
+    try:
+        total = int(data.get('searchInformation', {}).get('totalResults', 0))
+    except (TypeError, ValueError):
+        total = 0
+    return results, total
+
+
+def fetch_search_results(api_url, timeout=TIMEOUT):
+    """Run a Custom Search API query and return the (title, url) tuples of one page"""
+    return fetch_search_page(api_url, timeout)[0]
+
+
+def search(api_key, search_engine_id, query, fetch_page=None, min_results=MIN_RESULTS, max_pages=MAX_PAGES):
+    """
+    Search fanedit.org listings, fetching further result pages if the first one is thin
+    
+    When the first page has fewer than `min_results` listings and the API
+    reports more matches, the next pages (up to `max_pages` in total) are
+    requested concurrently. Each page is one API query.
+    
+    Args:
+        api_key: Google API key
+        search_engine_id: Custom Search Engine ID
+        query: Search query
+        fetch_page: Replacement for fetch_search_page(), e.g. one that goes
+            through a quota governor. Errors from the first page are raised;
+            errors from further pages only drop that page.
+        min_results: Fetch further pages when the first has fewer listings than this
+        max_pages: Maximum number of pages to request
+    
+    Returns:
+        List of SearchHit (title, url) tuples without duplicate URLs, in API order
+    """
+    fetch_page = fetch_page or fetch_search_page
+    results, total = fetch_page(build_search_url(api_key, search_engine_id, query))
+    
+    starts = more_page_starts(results, total, min_results, max_pages)
+    if starts:
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def fetch_more(start):
+            try:
+                return fetch_page(build_search_url(api_key, search_engine_id, query, start))[0]
+            except Exception:
+                return []
+        
+        with ThreadPoolExecutor(max_workers=len(starts)) as executor:
+            for page in executor.map(fetch_more, starts):
+                results.extend(page)
+    return unique_hits(results)
+
+
+def search_variants(api_key, search_engine_id, queries, fetch_page=None, fetch_variant=None):
+    """
+    Run several queries for one title concurrently (see ranking.query_variants())
+    
+    The first query is the primary one: it may fetch further pages like
+    search() and its errors are raised. The other queries get one page each,
+    and an error only drops that query's results.
+    
+    Args:
+        api_key: Google API key
+        search_engine_id: Custom Search Engine ID
+        queries: Search queries, primary query first
+        fetch_page: Replacement for fetch_search_page() (see search())
+        fetch_variant: Replacement for fetch_search_page() for the other
+            queries (default: fetch_page)
+    
+    Returns:
+        One list of SearchHit (title, url) tuples per query
+    """
+    if len(queries) == 1:
+        return [search(api_key, search_engine_id, queries[0], fetch_page=fetch_page)]
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    def search_variant(query):
+        try:
+            return search(api_key, search_engine_id, query, fetch_page=fetch_variant or fetch_page, max_pages=1)
+        except Exception:
+            return []
+    
+    with ThreadPoolExecutor(max_workers=len(queries) - 1) as executor:
+        variants = [executor.submit(search_variant, query) for query in queries[1:]]
+        # The primary query runs on this thread, alongside the variants
+        primary = search(api_key, search_engine_id, queries[0], fetch_page=fetch_page)
+        return [primary] + [variant.result() for variant in variants]
+
+
+def more_page_starts(results, total, min_results=MIN_RESULTS, max_pages=MAX_PAGES):
+    """Return the start indexes of the further result pages to request after a thin first page"""
+    if len(results) >= min_results:
+        return []
+    # The API serves at most 100 results
+    starts = [1 + page * PAGE_SIZE for page in range(1, max_pages)]
+    return [start for start in starts if start <= min(total, 100 - PAGE_SIZE + 1)]
+
+
+def unique_hits(results):
+    """Return the hits without duplicate URLs, first occurrence first"""
+    seen = set()
+    unique = []
+    for hit in results:
+        _, item_url = hit
+        if item_url not in seen:
+            seen.add(item_url)
+            unique.append(hit)
+    return unique
+
+
+def fetch_listing(url, agent, etag=None, last_modified=None, timeout=TIMEOUT):
+    """
+    Fetch a fanedit.org listing page, revalidating a cached copy if validators are given
+    
+    The page is streamed and the download stops once every field has been
+    seen: the comment and review sections further down are never needed.
+    
+    Args:
+        url: URL of the fanedit.org page
+        agent: User-Agent header value
+        etag: ETag of the cached copy (optional)
+        last_modified: Last-Modified date of the cached copy (optional)
+        timeout: Socket timeout in seconds
+    
+    Returns:
+        Tuple of (html, etag, last_modified, truncated). html is None if the
+        server answered 304 Not Modified; truncated is True if the download
+        was stopped before the end of the page.
+    """
+    req = urllib.request.Request(site_url(url))
+    req.add_header('User-Agent', agent)
+    if etag:
+        req.add_header('If-None-Match', etag)
+    if last_modified:
+        req.add_header('If-Modified-Since', last_modified)
+    
+    try:
+        with metrics.phase('listing.ttfb'):
+            response = urllib.request.urlopen(req, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            metrics.count('listing.not_modified')
+            return None, etag, last_modified, False
+        raise
+    with response:
+        # Streaming download and decoding are interleaved, so they are one phase
+        with metrics.phase('listing.download'):
+            html, truncated = read_text(metrics.counting(response, 'listing.bytes'), is_complete=is_listing_complete)
+        return html, response.headers.get('ETag'), response.headers.get('Last-Modified'), truncated
+
+
+def fetch_bytes(url, agent, max_bytes=50 * 1024 * 1024, timeout=TIMEOUT):
+    """
+    Fetch a resource (robots.txt, sitemaps, category pages) in full
+    
+    Args:
+        url: URL to fetch
+        agent: User-Agent header value
+        max_bytes: Responses larger than this raise ValueError
+        timeout: Socket timeout in seconds
+    
+    Returns:
+        Response body as bytes
+    """
+    req = urllib.request.Request(site_url(url))
+    req.add_header('User-Agent', agent)
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        body = response.read(max_bytes + 1)
+    if len(body) > max_bytes:
+        raise ValueError(f"Response from {url} exceeds {max_bytes} bytes")
+    return body
@@ -0,0 +1,220 @@
+"""
+Local socket service answering scraper calls from a long-lived process
+
+Kodi starts a fresh interpreter for every scraper call. The addon's
+xbmc.service (service.py) instead keeps one process running while Kodi is up,
+and ifdb.py forwards find and getdetails calls to it over a TCP socket on
+127.0.0.1. Imports, compiled patterns, the Addon object, in-memory caches and
+keep-alive connections then carry over from one call to the next.
+
+The service writes its port and a random token to SERVICE_FILE in the addon
+profile. Each call is one connection: the service greets with its protocol
+version, the client sends one JSON line with the token, the action and its
+parameters, and the service answers with one JSON line. A client that finds no
+service file, cannot connect or gets no greeting within CONNECT_TIMEOUT (a
+stale file whose port another program now uses), or whose token is refused,
+raises ServiceUnavailable, and the caller runs the call itself. Once the
+service has taken the request, a failure (an error in the call, no reply
+within the timeout) raises ServiceCallFailed instead: running the call again
+in-process would repeat its API queries.
+"""
+
+import os
+
+# Bumped when requests or replies change; a client never talks to another version
+PROTOCOL = 2
+
+# Port and token of the running service, in the addon profile
+SERVICE_FILE = 'service.json'
+
+# Longest wait for the connection and greeting, and for the reply (a search
+# may wait for the API rate limit)
+CONNECT_TIMEOUT = 1.0
+REPLY_TIMEOUT = 120.0
+
+# Largest request or reply line accepted
+MAX_LINE = 4 * 1024 * 1024
+
+
+class ServiceUnavailable(Exception):
+    """The service is not running or did not take the call; run the call in-process"""
+
+
+class ServiceCallFailed(Exception):
+    """The service took the call but it failed or was not answered; do not run it again"""
+
+
+def _greeting():
+    return f"IFDB {PROTOCOL}\n".encode('ascii')
+
+
+class ScraperService:
+    """
+    Serves calls on 127.0.0.1 on a thread per connection
+
+    Create it with the profile directory and a handler, start() it, and
+    close() it when Kodi exits or the service is disabled.
+    """
+
+    def __init__(self, profile, handler):
+        """
+        Args:
+            profile: Addon profile directory; SERVICE_FILE is written there
+            handler: Function (action, params) returning a JSON-serialisable
+                reply; an exception is reported to the client as an error
+        """
+        self.profile = profile
+        self.handler = handler
+        self.path = os.path.join(profile, SERVICE_FILE)
+        self.token = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1] if self._server else None
+
+    def start(self):
+        """Listen on a free port and publish it in SERVICE_FILE"""
+        import json
+        import secrets
+        import socketserver
+        import threading
+
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                service._answer(self.rfile, self.wfile)
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.token = secrets.token_hex(16)
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='ifdb-service', daemon=True)
+        self._thread.start()
+
+        # Written atomically and readable by this user only: the token keeps
+        # other local users from making calls with this user's API key
+        os.makedirs(self.profile, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'port': self.port, 'token': self.token, 'pid': os.getpid(), 'protocol': PROTOCOL}, f)
+        os.replace(temp_path, self.path)
+
+    def _answer(self, rfile, wfile):
+        import hmac
+        import json
+
+        wfile.write(_greeting())
+        wfile.flush()
+        line = rfile.readline(MAX_LINE)
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(request, dict):
+            return
+        # Compared in constant time, so the token cannot be guessed byte by byte
+        token = request.get('token')
+        if not isinstance(token, str) or not hmac.compare_digest(token.encode('utf-8'), self.token.encode('ascii')):
+            # The call did not run, so the client may run it itself
+            wfile.write(json.dumps({'refused': 'wrong token'}).encode('utf-8') + b'\n')
+            return
+        try:
+            reply = {'result': self.handler(request.get('action', ''), request.get('params') or {})}
+        except Exception as e:
+            reply = {'error': str(e)}
+        wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+    def close(self):
+        """Stop listening and remove SERVICE_FILE unless a newer service replaced it"""
+        if self._server is None:
+            return
+        try:
+            if read_service_file(self.profile).get('token') == self.token:
+                os.remove(self.path)
+        except (OSError, ValueError):
+            pass
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_service_file(profile):
+    """Return the contents of SERVICE_FILE; raises OSError or ValueError"""
+    import json
+
+    with open(os.path.join(profile, SERVICE_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def call(profile, action, params, timeout=REPLY_TIMEOUT):
+    """
+    Make a call to the running service
+
+    Args:
+        profile: Addon profile directory
+        action: Scraper action (find, getdetails)
+        params: Parameters of the action
+        timeout: Longest wait for the reply in seconds
+
+    Returns:
+        The handler's reply
+
+    Raises:
+        ServiceUnavailable: No service is running, or it did not take the call
+        ServiceCallFailed: The call failed in the service or was not answered
+            in time
+    """
+    try:
+        info = read_service_file(profile)
+    except (OSError, ValueError):
+        raise ServiceUnavailable('not running') from None
+
+    # Imported only when a service may be running, to keep plain startup cheap
+    import json
+    import socket
+
+    request = json.dumps({'token': info.get('token'), 'action': action, 'params': params}).encode('utf-8')
+
+    # socket.create_connection() would load the idna codec for the address
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(('127.0.0.1', int(info['port'])))
+            stream = sock.makefile('rwb')
+            greeting = stream.readline(64)
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            raise ServiceUnavailable(str(e)) from None
+        if greeting != _greeting():
+            raise ServiceUnavailable(f"no IFDB service (protocol {PROTOCOL}) on port {info['port']}")
+
+        # From here on the service may be running the call
+        try:
+            stream.write(request + b'\n')
+            stream.flush()
+            sock.settimeout(timeout)
+            line = stream.readline(MAX_LINE)
+        except OSError as e:
+            raise ServiceCallFailed(f"no reply: {e}") from None
+    try:
+        reply = json.loads(line)
+    except ValueError:
+        raise ServiceCallFailed('the service closed the connection without a reply') from None
+    if 'refused' in reply:
+        raise ServiceUnavailable(f"call refused: {reply['refused']}")
+    if 'error' in reply:
+        raise ServiceCallFailed(f"call failed in the service: {reply['error']}")
+    return reply['result']
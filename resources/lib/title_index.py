@@ -0,0 +1,246 @@
+"""
+Local fuzzy title search over the fanedit.org catalogue
+
+The index is a trigram table stored next to the crawled listings in the
+catalogue database (see catalogue.py), so search_movie() can answer a find
+request without the Google Custom Search API. Candidates are the titles that
+share the most trigrams with the query; they are ranked by trigram similarity
+(which tolerates typos and word-order changes) with a boost for a matching year.
+ranking.py scores API search results with the same score().
+"""
+
+import os
+import re
+import sqlite3
+import unicodedata
+
+# Candidates re-ranked per query, and the minimum similarity for a result
+CANDIDATES = 50
+MIN_SCORE = 0.3
+
+# Title similarity makes up to 1 - YEAR_BOOST of a score; a matching year adds
+# the rest (a year off by one less), another year takes some off
+YEAR_BOOST = 0.15
+NEAR_YEAR_BOOST = 0.05
+YEAR_PENALTY = 0.15
+
+# Query trigrams found in more than this share of titles (" th", "the", ...)
+# are only used for ranking, not for finding candidates
+COMMON_GRAM_SHARE = 0.05
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+_YEAR = re.compile(r'\d{4}')
+
+
+def normalize_title(title):
+    """Fold case, accents and punctuation so only letters and digits separated by spaces remain"""
+    decomposed = unicodedata.normalize('NFKD', title.casefold())
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(' ', stripped).strip()
+
+
+def trigrams(title):
+    """Return the set of trigrams of a title (each word padded as in pg_trgm)"""
+    grams = set()
+    for word in normalize_title(title).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def parse_year(value):
+    """Return the first four-digit year in value as an int, or None"""
+    match = _YEAR.search(str(value or ''))
+    return int(match.group()) if match else None
+
+
+def similarity(shared, grams, other_grams):
+    """Return the Dice coefficient of two trigram sets from their sizes and the trigrams they share"""
+    return 2.0 * shared / (grams + other_grams)
+
+
+def score(title_similarity, year=None, other_year=None):
+    """
+    Return how well a title matches, from 0.0 to 1.0
+
+    Args:
+        title_similarity: similarity() of the two titles
+        year, other_year: Years of the two titles as ints, if known
+    """
+    result = title_similarity * (1 - YEAR_BOOST)
+    if year and other_year:
+        if other_year == year:
+            result += YEAR_BOOST
+        elif abs(other_year - year) == 1:
+            result += NEAR_YEAR_BOOST
+        else:
+            result -= YEAR_PENALTY
+    return max(0.0, min(1.0, result))
+
+
+class TitleIndex:
+    """
+    Trigram index of listing titles in an SQLite database
+
+    The database is opened on first use, so creating a TitleIndex costs nothing
+    when the search never reaches it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=10)
+        return self._conn
+
+    def exists(self):
+        """Return True if the database holds a built index"""
+        if not os.path.exists(self.path):
+            return False
+        row = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'title_index'"
+        ).fetchone()
+        return row is not None
+
+    def rebuild(self, listings):
+        """
+        Replace the index with the given listings
+
+        Args:
+            listings: Iterable of (url, fields) pairs, e.g. CatalogueStore.listings()
+
+        Returns:
+            Number of indexed titles
+        """
+        conn = self.conn
+        with conn:
+            conn.execute('DROP TABLE IF EXISTS title_gram_counts')
+            conn.execute('DROP TABLE IF EXISTS title_grams')
+            conn.execute('DROP TABLE IF EXISTS title_index')
+            conn.execute(
+                'CREATE TABLE title_index ('
+                ' id INTEGER PRIMARY KEY,'
+                ' url TEXT NOT NULL,'
+                ' title TEXT NOT NULL,'
+                ' year INTEGER,'
+                ' directors TEXT,'
+                ' grams INTEGER NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE title_grams ('
+                ' gram TEXT NOT NULL,'
+                ' id INTEGER NOT NULL,'
+                ' PRIMARY KEY (gram, id)) WITHOUT ROWID'
+            )
+            count = 0
+            for url, fields in listings:
+                title = fields.get('title')
+                directors = fields.get('directors')
+                if isinstance(directors, list):
+                    directors = ', '.join(directors)
+                grams = trigrams(title or '')
+                if not grams:
+                    continue
+                cursor = conn.execute(
+                    'INSERT INTO title_index (url, title, year, directors, grams) VALUES (?, ?, ?, ?, ?)',
+                    (url, title, parse_year(fields.get('year')), directors, len(grams))
+                )
+                conn.executemany(
+                    'INSERT INTO title_grams (gram, id) VALUES (?, ?)',
+                    ((gram, cursor.lastrowid) for gram in grams)
+                )
+                count += 1
+            # Per-trigram title counts, so a search can skip the common trigrams
+            conn.execute(
+                'CREATE TABLE title_gram_counts ('
+                ' gram TEXT PRIMARY KEY,'
+                ' titles INTEGER NOT NULL) WITHOUT ROWID'
+            )
+            conn.execute(
+                'INSERT INTO title_gram_counts (gram, titles)'
+                ' SELECT gram, COUNT(*) FROM title_grams GROUP BY gram'
+            )
+        return count
+
+    def _selective_grams(self, grams):
+        """Return the query trigrams used to find candidates (the indexed, not too common ones)"""
+        gram_list = list(grams)
+        placeholders = ','.join('?' * len(gram_list))
+        counts = dict(self.conn.execute(
+            f'SELECT gram, titles FROM title_gram_counts WHERE gram IN ({placeholders})', gram_list
+        ))
+        # Titles are numbered from 1 by rebuild(), so the largest ID is the title count
+        total = self.conn.execute('SELECT MAX(id) FROM title_index').fetchone()[0] or 0
+        limit = max(total * COMMON_GRAM_SHARE, 100)
+        selective = [gram for gram, titles in counts.items() if titles <= limit]
+        return selective or list(counts)
+
+    def search(self, title, year=None, limit=10):
+        """
+        Find the listings that best match a title
+
+        Args:
+            title: Title to search for (typos and missing words are tolerated)
+            year: Release year (optional); matching listings rank higher
+            limit: Maximum number of results
+
+        Returns:
+            List of dicts with url, title, year, directors and score, best first
+        """
+        grams = trigrams(title)
+        if not grams:
+            return []
+        year = parse_year(year)
+
+        selective = self._selective_grams(grams)
+        if not selective:
+            return []
+        placeholders = ','.join('?' * len(selective))
+        candidates = [
+            row[0] for row in self.conn.execute(
+                f'SELECT id FROM title_grams WHERE gram IN ({placeholders})'
+                f' GROUP BY id ORDER BY COUNT(*) DESC LIMIT {CANDIDATES}',
+                selective
+            )
+        ]
+        if not candidates:
+            return []
+
+        # Exact similarity over all query trigrams, for the candidates only
+        ids = ','.join(str(candidate) for candidate in candidates)
+        gram_list = list(grams)
+        placeholders = ','.join('?' * len(gram_list))
+        shared = dict(self.conn.execute(
+            f'SELECT id, COUNT(*) FROM title_grams WHERE id IN ({ids}) AND gram IN ({placeholders})'
+            ' GROUP BY id',
+            gram_list
+        ))
+
+        results = []
+        for listing_id, url, listing_title, listing_year, directors, count in self.conn.execute(
+            f'SELECT id, url, title, year, directors, grams FROM title_index WHERE id IN ({ids})'
+        ):
+            title_similarity = similarity(shared.get(listing_id, 0), len(grams), count)
+            if title_similarity < MIN_SCORE:
+                continue
+            results.append({
+                'url': url,
+                'title': listing_title,
+                'year': listing_year,
+                'directors': directors,
+                'score': score(title_similarity, year, listing_year),
+            })
+        results.sort(key=lambda result: (-result['score'], result['title']))
+        return results[:limit]
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM title_index').fetchone()[0]
+
+    def close(self):
+        """Close the underlying database connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
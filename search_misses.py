@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+List and purge the searches cached as having no fanedit.org listings
+
+Searches that find no fanedit.org listing (e.g. retail movies in a fanedit
+library) are remembered in the search cache so library scans do not repeat
+them. This script lists those entries or deletes them, so the queries are
+searched again on the next scan (for example after the movie was renamed or
+a matching fanedit was published).
+
+Usage:
+    python search_misses.py [--cache FILE] list [--json]
+    python search_misses.py [--cache FILE] purge [--query QUERY] [--engine-id CX]
+
+The default cache is the addon's; batch_scrape.py keeps its own in
+~/.cache/metadata.fanedit.ifdb/search_cache.db.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from resources.lib.cache import SearchCache
+
+DEFAULT_CACHE = os.path.join(
+    os.path.expanduser('~'), '.kodi', 'userdata', 'addon_data', 'metadata.fanedit.ifdb', 'search_cache.db'
+)
+
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+
+def print_misses(misses):
+    """Print the misses as a table"""
+    now = time.time()
+    print(f"{'Query':<44} {'Misses':>6}  {'Last searched':<16}  {'Searched again'}")
+    for miss in misses:
+        again = format_time(miss['expires']) if miss['expires'] > now else 'next scan'
+        print(f"{miss['query'][:44]:<44} {miss['misses']:>6}  {format_time(miss['created']):<16}  {again}")
+    print(f"{len(misses)} search(es) without fanedit.org listings")
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='List and purge cached searches without fanedit.org listings')
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help=f'search cache database (default: {DEFAULT_CACHE})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    lister = subparsers.add_parser('list', help='list the cached misses, latest first')
+    lister.add_argument('--engine-id', help='only misses of this Custom Search Engine ID')
+    lister.add_argument('--json', action='store_true', help='print the misses as JSON')
+    purger = subparsers.add_parser('purge', help='delete cached misses so they are searched again')
+    purger.add_argument('--query', help='only this query (as listed)')
+    purger.add_argument('--engine-id', help='only misses of this Custom Search Engine ID')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.cache):
+        print(f"No search cache at {args.cache}")
+        return 1
+    cache = SearchCache(args.cache)
+    try:
+        if args.command == 'list':
+            misses = cache.misses(args.engine_id)
+            if args.json:
+                print(json.dumps(misses, indent=2))
+            else:
+                print_misses(misses)
+        else:
+            deleted = cache.purge_misses(args.query, args.engine_id)
+            print(f"Purged {deleted} search(es) without fanedit.org listings")
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
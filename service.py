@@ -0,0 +1,60 @@
+"""
+IFDB scraper service for Kodi
+
+Keeps one warm scraper process running while Kodi is up. ifdb.py forwards
+find and getdetails calls to it over a local socket (see
+resources/lib/service.py), so library scans do not pay interpreter startup,
+imports and a new TLS connection for every movie. With the Scraper service
+setting off, or while this is not running, ifdb.py handles every call itself.
+"""
+
+import xbmc
+
+import ifdb
+from resources.lib.service import ScraperService
+
+# Seconds between checks for a changed setting or Kodi exiting
+POLL_INTERVAL = 1
+
+
+class SettingsMonitor(xbmc.Monitor):
+    """Notes setting changes, which the service loop applies"""
+
+    def __init__(self):
+        super().__init__()
+        self.changed = False
+
+    def onSettingsChanged(self):
+        self.changed = True
+
+
+def main():
+    """Run the service until Kodi exits"""
+    monitor = SettingsMonitor()
+    server = None
+    try:
+        while True:
+            if monitor.changed:
+                monitor.changed = False
+                ifdb.reload_settings()
+            enabled = ifdb.get_addon().getSettingBool('service_enabled')
+            if enabled and server is None:
+                ifdb.start_service()
+                server = ScraperService(ifdb.get_profile_path(), ifdb.serve_call)
+                server.start()
+                ifdb.log(f"Scraper service listening on port {server.port}", xbmc.LOGINFO)
+            elif not enabled and server is not None:
+                server.close()
+                ifdb.stop_service()
+                server = None
+                ifdb.log("Scraper service stopped", xbmc.LOGINFO)
+            if monitor.waitForAbort(POLL_INTERVAL):
+                break
+    finally:
+        if server is not None:
+            server.close()
+            ifdb.stop_service()
+
+
+if __name__ == '__main__':
+    main()
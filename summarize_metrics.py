@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Summarize the scraper's per-phase timings over a library scan
+
+With "Record timings and counters" enabled in the addon settings, every find
+and getdetails call appends its phase durations and counters to metrics.jsonl
+in the addon profile (rotated to metrics.jsonl.1 ... .3). This script reads
+the file and its rotated predecessors and prints p50/p95/p99/max per phase
+and the counter totals, per action.
+
+Usage:
+    python summarize_metrics.py [METRICS_FILE] [--action find|getdetails] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from resources.lib.metrics import read_records, summarize
+
+DEFAULT_FILE = os.path.join(
+    os.path.expanduser('~'), '.kodi', 'userdata', 'addon_data', 'metadata.fanedit.ifdb', 'metrics.jsonl'
+)
+
+
+def print_summary(summary):
+    """Print the summary as one table per action"""
+    for action, data in sorted(summary.items()):
+        print(f"{action}: {data['calls']} call(s)")
+        print(f"  {'phase':<20} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        # Slowest phases first, the total last
+        phases = sorted(
+            (item for item in data['phases'].items() if item[0] != 'total'),
+            key=lambda item: item[1]['p95'],
+            reverse=True
+        )
+        phases.append(('total', data['phases']['total']))
+        for phase, stats in phases:
+            print(f"  {phase:<20} {stats['count']:>6} "
+                  f"{stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} "
+                  f"{stats['p99'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f}")
+        if data['counters']:
+            print("  counters:")
+            for counter, amount in sorted(data['counters'].items()):
+                print(f"    {counter:<28} {amount}")
+        print()
+
+
+def main(argv=None):
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Summarize per-phase scraper timings from metrics.jsonl')
+    parser.add_argument('file', nargs='?', default=DEFAULT_FILE, help=f'metrics file (default: {DEFAULT_FILE})')
+    parser.add_argument('--action', help='only summarize this action (find or getdetails)')
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args(argv)
+    
+    summary = summarize(read_records(args.file), action=args.action)
+    if not summary:
+        print(f"No metrics records found in {args.file}")
+        return 1
+    
+    if args.json:
+        print(json.dumps(summary, indent=2, sort_keys=True))
+    else:
+        print_summary(summary)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the local artwork cache (resources/lib/artwork.py)
+The ifdb.py checks use the stub xbmc modules in benchmarks/stubs; poster
+downloads are replaced by generated images. Pillow is replaced by FakeImage,
+so downscaling is checked whether or not Pillow is installed.
+"""
+
+import json
+import os
+import struct
+import sys
+import tempfile
+import types
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'stubs'))
+
+import xbmcplugin
+
+from resources.lib import scraper
+from resources.lib.artwork import POSTER_SIZE, ArtworkStore, downscale
+
+LISTING = os.path.join('test_data', 'listings', 'star-wars-despecialized.html')
+
+
+def png(seed, padding=0, size=(1, 1), color_type=2):
+    """Build a PNG; seed varies the pixel, padding adds a text chunk, size and color_type only set the header"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', size[0], size[1], 8, color_type, 0, 0, 0)
+    pixels = zlib.compress(bytes([0, seed % 256, 0, 0]))
+    text = chunk(b'tEXt', b'Comment\x00' + b'x' * padding) if padding else b''
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + text + chunk(b'IDAT', pixels) + chunk(b'IEND', b'')
+
+
+def test_store():
+    """Test storage, content addressing and LRU eviction"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ArtworkStore(tmp, max_bytes=3000, poster_size=None)
+        
+        # Check 1: Stored images are returned as local files
+        path = store.put('https://fanedit.org/a.png', png(1))
+        if store.get('https://fanedit.org/a.png') != path or open(path, 'rb').read() != png(1):
+            print("✗ Stored image is not returned as a local file")
+            return False
+        if store.get('https://fanedit.org/missing.png') is not None:
+            print("✗ An unknown URL returned a file")
+            return False
+        print("✓ Stored images are returned as local files")
+        
+        # Check 2: Identical images share one file; non-images are rejected
+        if store.put('https://fanedit.org/a-copy.png', png(1)) != path:
+            print("✗ Identical content was stored twice")
+            return False
+        try:
+            store.put('https://fanedit.org/error.png', b'<html>Not found</html>')
+            print("✗ A non-image was stored")
+            return False
+        except ValueError:
+            pass
+        print("✓ Files are content-addressed and non-images are rejected")
+        
+        # Check 3: Least recently used images are evicted under the byte budget
+        store.put('https://fanedit.org/b.png', png(2, padding=900))
+        store.put('https://fanedit.org/c.png', png(3, padding=900))
+        store.get('https://fanedit.org/a.png')
+        store.put('https://fanedit.org/d.png', png(4, padding=900))
+        if store.get('https://fanedit.org/b.png') is not None or store.get('https://fanedit.org/a.png') is None:
+            print("✗ The least recently used image was not the one evicted")
+            return False
+        if store.total_bytes() > 3000:
+            print(f"✗ Store holds {store.total_bytes()} bytes, over its 3000 byte budget")
+            return False
+        files = sum(1 for _, _, names in os.walk(tmp) for name in names if name.endswith('.png'))
+        if files != 3:
+            print(f"✗ Expected 3 image files after eviction, found {files}")
+            return False
+        print("✓ Least recently used images are evicted under the byte budget")
+        
+        # Check 4: A file deleted behind the store's back is downloaded again
+        os.remove(store.get('https://fanedit.org/d.png'))
+        if store.get('https://fanedit.org/d.png') is not None:
+            print("✗ A deleted file was still returned")
+            return False
+        print("✓ Deleted files are treated as not cached")
+        store.close()
+    return True
+
+
+class FakeImage:
+    """Stand-in for a PIL image: its size comes from the PNG header, JPEG output is 1 byte per 1000 pixels"""
+    
+    saved = []
+    
+    def __init__(self, width, height, mode='RGB'):
+        self.width, self.height, self.mode = width, height, mode
+    
+    @classmethod
+    def open(cls, stream):
+        data = stream.read()
+        if not data.startswith(b'\x89PNG'):
+            raise OSError('cannot identify image file')
+        width, height = struct.unpack('>II', data[16:24])
+        return cls(width, height, 'RGBA' if data[25] == 6 else 'RGB')
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        pass
+    
+    def thumbnail(self, size):
+        scale = min(size[0] / self.width, size[1] / self.height)
+        self.width, self.height = int(self.width * scale), int(self.height * scale)
+    
+    def convert(self, mode):
+        return FakeImage(self.width, self.height, mode)
+    
+    def save(self, output, image_format, **options):
+        FakeImage.saved.append((self.width, self.height, self.mode, image_format, options.get('quality')))
+        output.write(b'\xff\xd8\xff' + bytes(self.width * self.height // 1000))
+
+
+def test_downscale():
+    """Test downscaling with a stubbed PIL.Image, and the fallback without Pillow"""
+    
+    large = png(5, padding=20000, size=(3000, 4500))
+    original = sys.modules.get('PIL'), sys.modules.get('PIL.Image')
+    try:
+        # Check 5: Without Pillow, posters are stored unchanged
+        sys.modules['PIL'] = sys.modules['PIL.Image'] = None
+        if downscale(large) != large:
+            print("✗ A poster was changed without Pillow")
+            return False
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ArtworkStore(tmp)
+            path = store.put('https://fanedit.org/large.png', large)
+            store.close()
+            if not path.endswith('.png') or open(path, 'rb').read() != large:
+                print("✗ The poster stored without Pillow differs from the download")
+                return False
+        print("✓ Without Pillow, posters are stored unchanged")
+        
+        # Check 6: With Pillow, large posters are stored as JPEG at the poster size
+        sys.modules['PIL.Image'] = types.SimpleNamespace(open=FakeImage.open)
+        sys.modules['PIL'] = types.SimpleNamespace(Image=sys.modules['PIL.Image'])
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ArtworkStore(tmp)
+            path = store.put('https://fanedit.org/large.png', large)
+            store.close()
+            if not path.endswith('.jpg') or FakeImage.saved != [(1000, 1500, 'RGB', 'JPEG', 85)]:
+                print(f"✗ Large poster was not downscaled to {POSTER_SIZE}: {FakeImage.saved}")
+                return False
+        rgba = png(6, padding=20000, size=(2000, 3000), color_type=6)
+        FakeImage.saved.clear()
+        if not downscale(rgba).startswith(b'\xff\xd8\xff') or FakeImage.saved[0][2] != 'RGB':
+            print("✗ A poster with transparency was not converted for JPEG")
+            return False
+        print("✓ Large posters are downscaled to the poster size and stored as JPEG")
+        
+        # Check 7: Posters that fit, grow when re-encoded or cannot be read are kept
+        FakeImage.saved.clear()
+        small = png(7, size=(800, 1200))
+        grows = png(8, size=(3000, 4500))
+        broken = b'\xff\xd8\xff' + b'not really a JPEG'
+        if downscale(small) != small or downscale(grows) != grows or downscale(broken) != broken:
+            print("✗ A poster that fits, grows or is unreadable was replaced")
+            return False
+        if [saved[:2] for saved in FakeImage.saved] != [(1000, 1500)]:
+            print(f"✗ Unexpected re-encoding: {FakeImage.saved}")
+            return False
+        print("✓ Posters that fit, would grow or cannot be decoded are kept unchanged")
+    finally:
+        for name, module in zip(('PIL', 'PIL.Image'), original):
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+    return True
+
+
+def test_details_artwork():
+    """Test that getdetails serves posters from the artwork cache"""
+    
+    with open(LISTING, 'r', encoding='utf-8') as f:
+        listing_html = f.read()
+    
+    downloads = []
+    
+    def fake_fetch(url, agent, etag=None, last_modified=None, timeout=scraper.TIMEOUT):
+        return listing_html, None, None, False
+    
+    def fake_fetch_bytes(url, agent, max_bytes=None, timeout=scraper.TIMEOUT):
+        downloads.append(url)
+        return png(7)
+    
+    original = scraper.fetch_listing, scraper.fetch_bytes
+    scraper.fetch_listing, scraper.fetch_bytes = fake_fetch, fake_fetch_bytes
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps({})
+            import ifdb
+            ifdb._addon = None
+            
+            def poster():
+                del xbmcplugin.items[:]
+                sys.argv = ['ifdb.py', '1', '?action=getdetails&url=https://fanedit.org/star-wars-despecialized/']
+                ifdb.main()
+                return xbmcplugin.items[0][1].art.get('poster')
+            
+            # Check 8: The first call uses the remote poster and caches it in the background
+            remote = poster()
+            if not remote.startswith('https://') or downloads != [remote]:
+                print(f"✗ Expected the remote poster and one download, got {remote} / {downloads}")
+                return False
+            
+            # Check 9: The next call points the ListItem at the local file
+            local = poster()
+            if not local.startswith(profile) or not os.path.exists(local) or len(downloads) != 1:
+                print(f"✗ Poster was not served from the artwork cache: {local}")
+                return False
+            print("✓ Posters are cached in the background and then served locally")
+    finally:
+        scraper.fetch_listing, scraper.fetch_bytes = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Artwork Cache Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_store() and test_downscale() and test_details_artwork()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Artwork cache works as expected")
+    else:
+        print("✗ TEST FAILED: Artwork cache needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the headless batch scraper (batch_scrape.py)
+Network access is replaced by saved pages, so no API credentials are needed.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+
+import batch_scrape
+from resources.lib import scraper
+
+LISTING = os.path.join('test_data', 'listings', 'star-wars-despecialized.html')
+
+
+def test_batch_scrape():
+    """Test directory walking, result ranking, .nfo output and the JSON report"""
+    
+    print("=" * 70)
+    print("IFDB Scraper - Batch Scraper Validation")
+    print("=" * 70)
+    print()
+    
+    with open(LISTING, 'r', encoding='utf-8') as f:
+        listing_html = f.read()
+    
+    queries = []
+    
+    def fake_search(api_url, timeout=scraper.TIMEOUT):
+        queries.append(api_url)
+        if 'unknown' in api_url.lower():
+            return [], 0
+        # The best match is not the first result
+        return [
+            ("Star Wars: Episode I - The Phantom Edit", "https://fanedit.org/the-phantom-edit/"),
+            ("Star Wars: Despecialized Edition", "https://fanedit.org/star-wars-despecialized/"),
+        ], 2
+    
+    def fake_fetch(url, agent, etag=None, last_modified=None, timeout=scraper.TIMEOUT):
+        return listing_html, None, None, False
+    
+    original = scraper.fetch_search_page, scraper.fetch_listing
+    scraper.fetch_search_page, scraper.fetch_listing = fake_search, fake_fetch
+    try:
+        with tempfile.TemporaryDirectory() as media_dir, tempfile.TemporaryDirectory() as cache_dir:
+            os.makedirs(os.path.join(media_dir, 'Star Wars (1977)'))
+            open(os.path.join(media_dir, 'Star Wars (1977)', 'Star.Wars.Despecialized.1977.mkv'), 'w').close()
+            os.makedirs(os.path.join(media_dir, 'Collection'))
+            open(os.path.join(media_dir, 'Collection', 'Unknown Movie 2001.mp4'), 'w').close()
+            open(os.path.join(media_dir, 'Collection', 'Star Wars Despecialized 1977.avi'), 'w').close()
+            open(os.path.join(media_dir, 'Collection', 'notes.txt'), 'w').close()
+            
+            # Check 1: movie.nfo for single-video folders, <name>.nfo otherwise
+            videos = batch_scrape.find_videos(media_dir)
+            nfo_names = sorted(os.path.basename(nfo) for _, nfo in videos)
+            if nfo_names != ['Star Wars Despecialized 1977.nfo', 'Unknown Movie 2001.nfo', 'movie.nfo']:
+                print(f"✗ Unexpected .nfo names: {nfo_names}")
+                return False
+            print("✓ Videos are found and .nfo names follow Kodi conventions")
+            
+            # Check 2: End-to-end run writes .nfo files for the best-ranked results and a report
+            report = os.path.join(media_dir, 'report.json')
+            exit_code = batch_scrape.main([media_dir, '--api-key', 'key', '--search-engine-id', 'cx',
+                                           '--workers', '2', '--no-cache', '--cache-dir', cache_dir,
+                                           '--report', report])
+            if exit_code != 0:
+                print("✗ Batch run reported errors")
+                return False
+            
+            nfo = ET.parse(os.path.join(media_dir, 'Star Wars (1977)', 'movie.nfo')).getroot()
+            if nfo.tag != 'movie' or nfo.findtext('title') != "Star Wars: Despecialized Edition":
+                print("✗ .nfo does not contain the scraped title")
+                return False
+            if nfo.findtext('year') != '2011' or nfo.findtext('ratings/rating/value') != '9.4':
+                print("✗ .nfo does not contain the scraped year and rating")
+                return False
+            if [g.text for g in nfo.findall('genre')] != ['Science Fiction', 'Action', 'Adventure']:
+                print("✗ .nfo does not contain the scraped genres")
+                return False
+            if nfo.findtext("uniqueid[@type='fanedit']") != 'star-wars-despecialized':
+                print("✗ .nfo is not for the best-ranked result")
+                return False
+            print("✓ Kodi-compatible .nfo files are written for the best-ranked result")
+            
+            with open(report, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data['summary'] != {'scraped': 2, 'no_match': 1}:
+                print(f"✗ Unexpected report summary: {data['summary']}")
+                return False
+            if any('total' not in item['timings'] for item in data['items']):
+                print("✗ Report is missing per-item timings")
+                return False
+            titles = {(item['title'], item['year']) for item in data['items']}
+            if titles != {("star wars despecialized", "1977"), ("unknown movie", "2001")}:
+                print(f"✗ Titles and years were not derived from the filenames: {titles}")
+                return False
+            print("✓ JSON report has the canonical titles, a summary and per-item timings")
+            
+            # Check 3: Existing .nfo files are skipped unless --overwrite is given
+            queries.clear()
+            batch_scrape.main([media_dir, '--api-key', 'key', '--search-engine-id', 'cx',
+                               '--no-cache', '--cache-dir', cache_dir, '--report', report])
+            with open(report, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data['summary'].get('skipped') != 2 or len(queries) != 1:
+                print(f"✗ Existing .nfo files were not skipped: {data['summary']}")
+                return False
+            print("✓ Existing .nfo files are skipped")
+    finally:
+        scraper.fetch_search_page, scraper.fetch_listing = original
+    
+    print()
+    return True
+
+
+def main():
+    """Main function"""
+    success = test_batch_scrape()
+    
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Batch scraper works as expected")
+    else:
+        print("✗ TEST FAILED: Batch scraper needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
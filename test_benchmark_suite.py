@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the offline benchmark suite (benchmarks/run_benchmarks.py)
+Checks that the fixture corpus serves the scraper's real network code paths
+and that slowdowns against the baselines are reported as regressions.
+"""
+
+import os
+import sys
+import urllib.error
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+import fixtures
+import run_benchmarks
+from resources.lib import scraper
+from resources.lib.extract import FIELDS
+from resources.lib.records import is_listing_url
+
+
+def test_fixtures():
+    """Test that the recorded responses answer every recorded search"""
+    
+    searches = fixtures.load_searches()
+    with fixtures.installed():
+        # Check 1: Every search finds its listing, including one that needs further pages
+        for search in searches:
+            results = scraper.search('key', 'cx', search['query'])
+            urls = [url for _, url in results]
+            if f"https://fanedit.org/{search['listing']}/" not in urls:
+                print(f"✗ {search['query']!r} did not find {search['listing']}: {urls}")
+                return False
+            if any(not is_listing_url(url) for url in urls):
+                print(f"✗ Non-listing URL in the results of {search['query']!r}")
+                return False
+        print(f"✓ All {len(searches)} recorded searches find their listing")
+        
+        # Check 2: Every recorded listing page is complete
+        for path in fixtures.listing_paths():
+            html, _, _, _ = scraper.fetch_listing(fixtures.listing_url(path), 'agent')
+            from resources.lib.extract import extract_fields
+            missing = set(FIELDS) - set(extract_fields(html)) - {'tagline'}
+            if missing:
+                print(f"✗ {os.path.basename(path)} lacks {sorted(missing)}")
+                return False
+        print("✓ Recorded listing pages are served with all their fields")
+        
+        # Check 3: URLs without a fixture fail like a missing page
+        try:
+            scraper.fetch_listing('https://fanedit.org/not-recorded/', 'agent')
+            print("✗ A URL without a fixture was served")
+            return False
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                print(f"✗ Expected 404, got {e.code}")
+                return False
+        print("✓ URLs without a fixture answer 404")
+    return True
+
+
+def test_regressions():
+    """Test the comparison against baselines"""
+    
+    baselines = {'parse.page': 0.05, 'find': 2.0}
+    
+    # Check 4: Slowdowns beyond the tolerance are regressions, new benchmarks are not
+    results = {'parse.page': (0.001, 0.07), 'find': (0.004, 2.2), 'getdetails': (0.001, 0.1)}
+    rows = {name: row for name, *row in run_benchmarks.compare(results, baselines, 0.3)}
+    if not rows['parse.page'][2] or rows['find'][2] or rows['getdetails'][1] is not None:
+        print(f"✗ Unexpected comparison: {rows}")
+        return False
+    print("✓ Slowdowns beyond the tolerance are reported as regressions")
+    
+    # Check 5: A 3x slower machine is not a regression; the expected time is scaled to it
+    results = {'parse.page': (0.003, 0.05)}
+    seconds, expected, regressed = rows = run_benchmarks.compare(results, baselines, 0.3)[0][1:]
+    if regressed or abs(expected - 0.003) > 1e-9:
+        print(f"✗ Baselines were not scaled to the machine: {rows}")
+        return False
+    print("✓ Baselines are scaled to the speed of the machine")
+    
+    # Check 6: Measurements are expressed in reference workload units
+    seconds, units = run_benchmarks.measure(lambda: run_benchmarks.calibrate(1), 3)
+    if not 0.2 < units < 5:
+        print(f"✗ The reference workload measured {units:.2f} units of itself")
+        return False
+    print("✓ Measurements are normalized by the reference workload")
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Benchmark Suite Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_fixtures() and test_regressions()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Benchmark suite works as expected")
+    else:
+        print("✗ TEST FAILED: Benchmark suite needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
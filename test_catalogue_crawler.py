@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the catalogue crawler and store (resources/lib/catalogue.py)
+The site is simulated in memory, so no network access is needed.
+"""
+
+import gzip
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+
+from resources.lib.catalogue import LISTING, CatalogueStore, Crawler
+
+LISTINGS_DIR = os.path.join('test_data', 'listings')
+SITE = 'https://fanedit.org'
+
+
+def build_site():
+    """Return {url: body} for a small simulated fanedit.org"""
+    def page(name):
+        with open(os.path.join(LISTINGS_DIR, name), 'rb') as f:
+            return f.read()
+    
+    sitemap_index = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f'<sitemap><loc>{SITE}/sitemap-1.xml</loc></sitemap>'
+        f'<sitemap><loc>{SITE}/sitemap-2.xml.gz</loc></sitemap>'
+        '</sitemapindex>'
+    ).encode()
+    sitemap_1 = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f'<url><loc>{SITE}/star-wars-despecialized/</loc></url>'
+        f'<url><loc>{SITE}/kill-bill/</loc></url>'
+        f'<url><loc>{SITE}/forum/thread-1/</loc></url>'
+        '</urlset>'
+    ).encode()
+    sitemap_2 = gzip.compress((
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f'<url><loc>{SITE}/minimal/</loc></url>'
+        f'<url><loc>{SITE}/about-us/</loc></url>'
+        f'<url><loc>{SITE}/flaky/</loc></url>'
+        '</urlset>'
+    ).encode())
+    return {
+        f'{SITE}/robots.txt': f'User-agent: *\nDisallow: /forum/\nSitemap: {SITE}/sitemap-index.xml\n'.encode(),
+        f'{SITE}/sitemap-index.xml': sitemap_index,
+        f'{SITE}/sitemap-1.xml': sitemap_1,
+        f'{SITE}/sitemap-2.xml.gz': sitemap_2,
+        f'{SITE}/star-wars-despecialized/': page('star-wars-despecialized.html'),
+        f'{SITE}/kill-bill/': page('kill-bill-whole-bloody-affair.html'),
+        f'{SITE}/minimal/': page('minimal-listing.html'),
+        f'{SITE}/about-us/': b'<html><body><h1>About us</h1></body></html>',
+        f'{SITE}/flaky/': page('star-wars-despecialized.html'),
+        f'{SITE}/forum/thread-1/': b'<html><body><h1>Forum</h1></body></html>',
+    }
+
+
+class SimulatedSite:
+    """Serves the simulated site and records request timing and concurrency"""
+    
+    def __init__(self, delay=0.005):
+        self.pages = build_site()
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failures_left = {f'{SITE}/flaky/': 1}
+        self._lock = threading.Lock()
+    
+    def _get(self, url):
+        with self._lock:
+            self.requests.append((url, time.monotonic()))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            with self._lock:
+                if self.failures_left.get(url):
+                    self.failures_left[url] -= 1
+                    raise OSError("connection reset")
+            if url not in self.pages:
+                raise OSError(f"404 {url}")
+            return self.pages[url]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+    
+    def fetch_bytes(self, url, agent, **kwargs):
+        return self._get(url)
+    
+    def fetch_listing(self, url, agent, etag=None, last_modified=None, **kwargs):
+        return self._get(url).decode('utf-8'), '"v1"', None, False
+
+
+def test_catalogue_crawler():
+    """Test discovery, politeness, resumability, retries and the stored listings"""
+    
+    print("=" * 70)
+    print("IFDB Scraper - Catalogue Crawler Validation")
+    print("=" * 70)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, 'catalogue.db')
+        site = SimulatedSite()
+        
+        def crawler_for(store):
+            return Crawler(store, 'test-agent', interval=0.02, concurrency=2,
+                           fetch_bytes=site.fetch_bytes, fetch_listing=site.fetch_listing)
+        
+        # Check 1: Sitemaps are discovered through robots.txt
+        store = CatalogueStore(db)
+        crawler = crawler_for(store)
+        if crawler.seed(site=SITE + '/') != 1:
+            print("✗ Sitemap index from robots.txt was not seeded")
+            return False
+        print("✓ Sitemaps are discovered through robots.txt")
+        
+        # Check 2: An interrupted crawl resumes where it stopped
+        processed = crawler.run(limit=4)
+        store.close()
+        first_session = len(site.requests)
+        if processed != 4:
+            print(f"✗ Expected 4 entries processed before stopping, got {processed}")
+            return False
+        store = CatalogueStore(db)
+        crawler_for(store).run()
+        fetched = [url for url, _ in site.requests if not url.endswith('robots.txt')]
+        duplicates = {url for url in fetched if fetched.count(url) > 1} - {f'{SITE}/flaky/'}
+        if duplicates:
+            print(f"✗ Entries fetched again after resuming: {sorted(duplicates)}")
+            return False
+        print("✓ Interrupted crawl resumes without refetching finished entries")
+        
+        # Check 3: Only listing pages are stored; robots.txt is respected
+        stored = sorted(url for url, _ in store.listings())
+        expected = sorted(f'{SITE}/{name}/' for name in ('star-wars-despecialized', 'kill-bill', 'flaky'))
+        if stored != expected:
+            print(f"✗ Unexpected stored listings: {stored}")
+            return False
+        if any('/forum/' in url for url in fetched):
+            print("✗ A URL disallowed by robots.txt was fetched")
+            return False
+        if store.get_listing(f'{SITE}/star-wars-despecialized/')['title'] != "Star Wars: Despecialized Edition":
+            print("✗ Stored listing fields are wrong")
+            return False
+        print("✓ Listings are parsed and stored; robots.txt is respected")
+        
+        # Check 4: Failed fetches are retried
+        if store.counts().get((LISTING, 'failed')):
+            print("✗ A transiently failing listing was not retried")
+            return False
+        print("✓ Transient failures are retried")
+        
+        # Check 5: Per-host rate limit and concurrency cap
+        for session in (site.requests[:first_session], site.requests[first_session:]):
+            starts = sorted(started for _, started in session)
+            # Thread wake-up jitter shifts individual starts, so check the overall pace
+            if starts[-1] - starts[0] < 0.02 * (len(starts) - 1) * 0.9:
+                print(f"✗ {len(starts)} requests took {(starts[-1] - starts[0]) * 1000:.1f}ms (limit 20ms apart)")
+                return False
+        if site.max_in_flight > 2:
+            print(f"✗ {site.max_in_flight} requests were in flight at once (cap 2)")
+            return False
+        print("✓ Per-host rate limit and concurrency cap are honoured")
+        
+        # Check 6: A missing robots.txt allows everything; an unavailable one nothing
+        def failing_fetch(error):
+            def fetch_bytes(url, agent, **kwargs):
+                raise error
+            return fetch_bytes
+        
+        robots_cases = [
+            (urllib.error.HTTPError(f'{SITE}/robots.txt', 404, 'Not Found', None, io.BytesIO(b'')), True),
+            (urllib.error.HTTPError(f'{SITE}/robots.txt', 503, 'Unavailable', None, io.BytesIO(b'')), False),
+            (OSError("connection refused"), False),
+        ]
+        for error, expected in robots_cases:
+            crawler = Crawler(store, 'test-agent', fetch_bytes=failing_fetch(error))
+            if crawler.allowed(f'{SITE}/kill-bill/') != expected:
+                print(f"✗ robots.txt failing with {error!r} should {'allow' if expected else 'disallow'} the host")
+                return False
+        print("✓ A missing robots.txt allows the host; server and network errors disallow it")
+        store.close()
+    
+    print()
+    return True
+
+
+def main():
+    """Main function"""
+    success = test_catalogue_crawler()
+    
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Catalogue crawler works as expected")
+    else:
+        print("✗ TEST FAILED: Catalogue crawler needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the listing details cache (resources/lib/cache.py)
+The stale-while-revalidate checks run ifdb.py with the stub xbmc modules in
+benchmarks/stubs; the network is replaced by a slow fake urlopen().
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.stubs.fake_response import FakeResponse
+from resources.lib.cache import DetailsCache
+from resources.lib.records import FaneditRecord
+
+LISTING = os.path.join('test_data', 'listings', 'star-wars-despecialized.html')
+
+# Response time of the fake fanedit.org
+DELAY = 0.3
+
+
+def test_details_cache():
+    """Test freshness, revalidation bookkeeping, max age and LRU eviction"""
+    
+    print("=" * 70)
+    print("IFDB Scraper - Details Cache Validation")
+    print("=" * 70)
+    print()
+    
+    url = "https://fanedit.org/star-wars-despecialized/"
+    record = FaneditRecord(title="Star Wars Despecialized", year=2011, genres=["Sci-Fi"])
+    etag = '"abc123"'
+    last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'details_cache.db')
+        
+        # Check 1: Stored records and validators are returned as fresh
+        cache = DetailsCache(path)
+        if cache.get(url) is not None:
+            print("✗ Empty cache returned an entry")
+            return False
+        cache.put(url, record, etag, last_modified)
+        entry = cache.get(url)
+        if entry is None or entry['record'] != record or not entry['fresh']:
+            print("✗ Stored record was not returned as a fresh entry")
+            return False
+        if entry['etag'] != etag or entry['last_modified'] != last_modified:
+            print("✗ Response validators were not stored")
+            return False
+        print("✓ Parsed records and validators are stored")
+        cache.close()
+        
+        # Check 2: Entries past the freshness window need revalidation
+        cache = DetailsCache(path, fresh_ttl=0)
+        time.sleep(0.01)
+        entry = cache.get(url)
+        if entry is None or entry['fresh']:
+            print("✗ Entry past the freshness window was not marked stale")
+            return False
+        print("✓ Entries past the freshness window are marked for revalidation")
+        cache.close()
+        
+        # Check 3: A 304 revalidation makes the entry fresh again
+        cache = DetailsCache(path, fresh_ttl=3600)
+        cache.mark_validated(url)
+        if not cache.get(url)['fresh']:
+            print("✗ Revalidated entry was not marked fresh")
+            return False
+        print("✓ Revalidated entries become fresh again")
+        cache.close()
+        
+        # Check 4: Entries past max_age are discarded
+        cache = DetailsCache(path, max_age=0)
+        time.sleep(0.01)
+        if cache.get(url) is not None:
+            print("✗ Entry past max_age was returned")
+            return False
+        print("✓ Entries past the maximum age are discarded")
+        cache.close()
+        
+        # Check 5: Least recently used entries are evicted past max_entries
+        cache = DetailsCache(path, max_entries=2)
+        for name in ("first", "second"):
+            cache.put(f"https://fanedit.org/{name}/", record)
+            time.sleep(0.01)
+        cache.get("https://fanedit.org/first/")
+        time.sleep(0.01)
+        cache.put("https://fanedit.org/third/", record)
+        if len(cache) != 2 or cache.get("https://fanedit.org/second/") is not None:
+            print("✗ LRU eviction did not remove the least recently used entry")
+            return False
+        print("✓ Least recently used entries are evicted")
+        
+        # Check 6: Background refreshes are claimed once per listing, up to a limit
+        other = DetailsCache(path)
+        claims = [
+            cache.claim_refresh("https://fanedit.org/first/", 2, 60),
+            other.claim_refresh("https://fanedit.org/first/", 2, 60),
+            other.claim_refresh("https://fanedit.org/third/", 2, 60),
+            cache.claim_refresh("https://fanedit.org/fourth/", 2, 60),
+        ]
+        if claims != [True, False, True, False]:
+            print(f"✗ Unexpected refresh claims: {claims}")
+            return False
+        cache.finish_refresh("https://fanedit.org/first/")
+        if not other.claim_refresh("https://fanedit.org/fourth/", 2, 60):
+            print("✗ A finished refresh still counts against the limit")
+            return False
+        if not cache.claim_refresh("https://fanedit.org/fifth/", 2, 0):
+            print("✗ Lapsed refresh claims were not released")
+            return False
+        print("✓ Background refreshes are claimed across processes, up to a limit")
+        other.close()
+        cache.close()
+    
+    print()
+    return True
+
+
+def test_stale_while_revalidate():
+    """Test that getdetails serves stale listings at once and refreshes them in the background"""
+    
+    import xbmcplugin
+    
+    with open(LISTING, 'rb') as f:
+        listing = f.read()
+    requests = []
+    
+    def fake_urlopen(req, timeout=None):
+        time.sleep(DELAY)
+        requests.append(req.get_header('If-none-match'))
+        if req.get_header('If-none-match') == '"v1"':
+            raise urllib.error.HTTPError(req.full_url, 304, 'Not Modified', {}, io.BytesIO(b''))
+        return FakeResponse(listing, {'ETag': '"v1"'})
+    
+    def settings(**values):
+        os.environ['IFDB_STUB_SETTINGS'] = json.dumps(dict({'artwork_cache_enabled': False}, **values))
+        ifdb._addon = None
+    
+    def timed_details():
+        del xbmcplugin.items[:]
+        start = time.perf_counter()
+        ifdb.get_details(url, 1)
+        return time.perf_counter() - start
+    
+    import ifdb
+    
+    url = "https://fanedit.org/star-wars-despecialized/"
+    original = urllib.request.urlopen
+    urllib.request.urlopen = fake_urlopen
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            settings()
+            timed_details()
+            
+            # Check 7: Without the setting, a stale listing is revalidated before returning
+            settings(details_cache_ttl=0)
+            elapsed = timed_details()
+            if elapsed < DELAY or requests != [None, '"v1"']:
+                print(f"✗ Stale listing was not revalidated in line ({elapsed:.2f}s, {requests})")
+                return False
+            print("✓ Stale listings are revalidated before returning by default")
+            
+            # Check 8: With it, the stale record is returned at once and refreshed in the background
+            settings(details_cache_ttl=0, details_cache_stale=True)
+            elapsed = timed_details()
+            if elapsed >= DELAY or len(xbmcplugin.items) != 1:
+                print(f"✗ Stale listing was not served at once ({elapsed:.2f}s)")
+                return False
+            ifdb.finish_prefetch()
+            if requests != [None, '"v1"', '"v1"']:
+                print(f"✗ Background refresh did not revalidate the listing: {requests}")
+                return False
+            print(f"✓ Stale listings are served in {elapsed * 1000:.0f}ms and refreshed in the background")
+            
+            # Check 9: The refresh claim is released afterwards
+            cache = DetailsCache(os.path.join(profile, 'details_cache.db'))
+            if not cache.claim_refresh(url, 1, 60):
+                print("✗ The background refresh did not release its claim")
+                return False
+            cache.close()
+            print("✓ Finished refreshes release their claim")
+    finally:
+        urllib.request.urlopen = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    
+    print()
+    return True
+
+
+def main():
+    """Main function"""
+    success = test_details_cache() and test_stale_while_revalidate()
+    
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Details cache works as expected")
+    else:
+        print("✗ TEST FAILED: Details cache needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
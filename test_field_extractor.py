@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the single-pass field extractor (resources/lib/extract.py)
+against the original per-field regular expressions on saved listing pages
+
+The original title pattern took the first <h1> on the page, which is the site
+title on pages with a site header; titles are checked against TITLES instead.
+Pages without a listing heading keep the original first-<h1> title.
+"""
+
+import glob
+import os
+import re
+import sys
+import time
+
+from resources.lib.extract import extract_fields
+
+LISTINGS_DIR = os.path.join('test_data', 'listings')
+
+# Title of each saved page: its listing heading (h1.contentheading), else its first <h1>
+TITLES = {
+    'kill-bill-whole-bloody-affair.html': "Kill Bill: The Whole Bloody Affair",
+    'minimal-listing.html': "Minimal Fanedit",
+    'star-wars-despecialized.html': "Star Wars: Despecialized Edition",
+}
+
+
+def expected_fields(page, html):
+    """The legacy fields of a page with the title from TITLES"""
+    fields = legacy_extract_fields(html)
+    fields['title'] = TITLES[os.path.basename(page)]
+    return fields
+
+
+def legacy_extract_fields(html):
+    """The per-field re.search implementation used by get_details() up to version 2.2.0"""
+    fields = {}
+    
+    title_match = re.search(r'<h1[^>]*>([^<]+)</h1>', html)
+    if title_match:
+        fields['title'] = title_match.group(1).strip()
+    
+    plot_match = re.search(
+        r'<div class="jrBriefsynopsis jrFieldRow">[\s\S]*?<div class="jrFieldValue">(.*?)</div>',
+        html,
+        re.DOTALL
+    )
+    if plot_match:
+        fields['plot'] = re.sub(r'<[^>]+>', '', plot_match.group(1)).strip()
+    
+    year_match = re.search(
+        r'<div class="jrFaneditreleasedate jrFieldRow">[\s\S]*?<div class="jrFieldValue">[\s\S]*?([0-9]{4})',
+        html
+    )
+    if year_match:
+        fields['year'] = int(year_match.group(1))
+    
+    for field, css_class in (('genres', 'jrGenre'), ('directors', 'jrFaneditorname')):
+        section_match = re.search(
+            rf'<div class="{css_class} jrFieldRow">[\s\S]*?<ul class="jrFieldValueList">(.*?)</ul>',
+            html,
+            re.DOTALL
+        )
+        if section_match:
+            values = re.findall(r'<li><a[^>]*>([^<]+)</a></li>', section_match.group(1))
+            if values:
+                fields[field] = values
+    
+    rating_match = re.search(r'<span[^>]*>Rating:[\s]*([\d.]+)[\s]*/[\s]*10', html)
+    if rating_match:
+        fields['rating'] = float(rating_match.group(1))
+    
+    votes_match = re.search(r'<span[^>]*>\(([0-9]+)[\s]*votes?\)</span>', html)
+    if votes_match:
+        fields['votes'] = int(votes_match.group(1))
+    
+    tagline_match = re.search(r'<li><strong>Tagline:</strong>[\s]*([^<]+)</li>', html)
+    if tagline_match:
+        fields['tagline'] = tagline_match.group(1).strip()
+    
+    thumb_match = re.search(
+        r'<div class="jrListingMainImage">[\s\S]*?<a href="([^"]+)"[^>]*class="fancybox"',
+        html
+    )
+    if thumb_match:
+        fields['thumb'] = thumb_match.group(1)
+    
+    return fields
+
+
+def test_field_extractor():
+    """Test that extract_fields() matches the legacy implementation on every saved page"""
+    
+    print("=" * 70)
+    print("IFDB Scraper - Single-Pass Field Extractor Validation")
+    print("=" * 70)
+    print()
+    
+    pages = sorted(glob.glob(os.path.join(LISTINGS_DIR, '*.html')))
+    if not pages:
+        print(f"✗ No saved listing pages found in {LISTINGS_DIR}")
+        return False
+    
+    all_passed = True
+    for page in pages:
+        with open(page, 'r', encoding='utf-8') as f:
+            html = f.read()
+        
+        expected = expected_fields(page, html)
+        actual = extract_fields(html)
+        if actual == expected:
+            print(f"✓ {os.path.basename(page)}: {len(actual)} field(s) identical")
+        else:
+            print(f"✗ {os.path.basename(page)}: results differ")
+            print(f"    Expected: {expected}")
+            print(f"    Got:      {actual}")
+            all_passed = False
+    print()
+    
+    # Timing on a large listing (long comment section after the detail area)
+    with open(os.path.join(LISTINGS_DIR, 'star-wars-despecialized.html'), 'r', encoding='utf-8') as f:
+        html = f.read()
+    comment = '<div class="jrComment"><p>Great edit, watched it twice.</p><span class="date">2019</span></div>\n'
+    large_html = html.replace('</body>', comment * 5000 + '</body>')
+    
+    if extract_fields(large_html) != expected_fields('star-wars-despecialized.html', large_html):
+        print("✗ Large listing: results differ")
+        return False
+    
+    runs = 20
+    start = time.perf_counter()
+    for _ in range(runs):
+        legacy_extract_fields(large_html)
+    legacy_time = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        extract_fields(large_html)
+    single_pass_time = (time.perf_counter() - start) / runs
+    
+    print(f"Large listing ({len(large_html) // 1024} KiB):")
+    print(f"  Per-field regexes: {legacy_time * 1000:.2f} ms")
+    print(f"  Single pass:       {single_pass_time * 1000:.2f} ms")
+    print()
+    
+    return all_passed
+
+
+def main():
+    """Main function"""
+    success = test_field_extractor()
+    
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Single-pass extractor matches the original patterns")
+    else:
+        print("✗ TEST FAILED: Single-pass extractor output differs")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
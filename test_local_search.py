@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the local title index (resources/lib/title_index.py)
+and the local search modes of action=find
+Runs ifdb.py with the stub xbmc modules in benchmarks/stubs; no network access.
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'stubs'))
+
+import xbmcplugin
+
+from resources.lib import scraper
+from resources.lib.title_index import TitleIndex
+
+LISTINGS = [
+    ("https://fanedit.org/star-wars-despecialized/",
+     {'title': "Star Wars: Despecialized Edition", 'year': 2011, 'directors': ['Harmy']}),
+    ("https://fanedit.org/star-wars-revisited/",
+     {'title': "Star Wars: Revisited", 'year': 2008, 'directors': ['Adywan']}),
+    ("https://fanedit.org/kill-bill/",
+     {'title': "Kill Bill: The Whole Bloody Affair", 'year': 2009, 'directors': ['The Bride']}),
+    ("https://fanedit.org/amelie-extended/",
+     {'title': "Amélie: Extended", 'year': 2015}),
+    ("https://fanedit.org/the-hobbit-2012/",
+     {'title': "The Hobbit: The Tolkien Edit", 'year': 2012}),
+    ("https://fanedit.org/the-hobbit-2015/",
+     {'title': "The Hobbit: The Tolkien Edit", 'year': 2015}),
+]
+
+
+def synthetic_listings(count):
+    """Generate a large catalogue of random titles"""
+    rng = random.Random(1)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9)))
+             for _ in range(5000)]
+    words += ['the', 'of', 'edition', 'cut', 'extended', 'star', 'wars']
+    for i in range(count):
+        title = ' '.join(rng.choice(words).capitalize() for _ in range(rng.randint(2, 6)))
+        yield f"https://fanedit.org/synthetic-{i}/", {'title': title, 'year': 1970 + i % 50}
+
+
+def run_find(ifdb, title, year=''):
+    """Invoke action=find the way Kodi does and return the listed (label, url) pairs"""
+    del xbmcplugin.items[:]
+    sys.argv = ['ifdb.py', '1', f'?action=find&title={title}&year={year}']
+    ifdb.main()
+    return [(listitem.label, url) for url, listitem, _ in xbmcplugin.items]
+
+
+def test_title_index():
+    """Test matching, ranking and speed of the title index"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index = TitleIndex(os.path.join(tmp, 'catalogue.db'))
+        if index.exists():
+            print("✗ An empty database reports a built index")
+            return False
+        index.rebuild(LISTINGS)
+        
+        # Check 1: Typos, punctuation, case and accents are tolerated
+        for query, expected in (("star wars despecialised", LISTINGS[0][0]),
+                                ("KILL BILL whole bloody affair", LISTINGS[2][0]),
+                                ("Amelie Extended", LISTINGS[3][0])):
+            results = index.search(query)
+            if not results or results[0]['url'] != expected:
+                print(f"✗ '{query}' did not find {expected} first: {results}")
+                return False
+        print("✓ Typos, punctuation, case and accents are tolerated")
+        
+        # Check 2: A matching year ranks an identical title first
+        for year, expected in ((2012, LISTINGS[4][0]), (2015, LISTINGS[5][0])):
+            results = index.search("The Hobbit Tolkien Edit", year)
+            if results[0]['url'] != expected:
+                print(f"✗ Year {year} did not rank {expected} first")
+                return False
+        print("✓ A matching year ranks an identical title first")
+        
+        # Check 3: Unrelated queries return nothing
+        if index.search("Zzyzx Qwerty"):
+            print("✗ An unrelated query returned results")
+            return False
+        print("✓ Unrelated queries return no results")
+        
+        # Check 4: Searches stay fast on a large catalogue
+        index.rebuild(list(LISTINGS) + list(synthetic_listings(30000)))
+        index.close()
+        index = TitleIndex(index.path)
+        queries = ["star wars despecialised", "the hobbit", "kill bil", "extended edition of the"]
+        start = time.perf_counter()
+        for query in queries * 5:
+            results = index.search(query, 2011)
+        elapsed = (time.perf_counter() - start) / (len(queries) * 5) * 1000
+        if index.search("star wars despecialised")[0]['url'] != LISTINGS[0][0]:
+            print("✗ The best match was lost in a large catalogue")
+            return False
+        if elapsed > 25:
+            print(f"✗ Searches over {len(index)} titles took {elapsed:.1f}ms on average")
+            return False
+        print(f"✓ Searches over {len(index)} titles take {elapsed:.1f}ms on average")
+        index.close()
+    return True
+
+
+def test_search_modes():
+    """Test the search_source setting of action=find"""
+    
+    google_queries = []
+    
+    def fake_search(api_url, timeout=scraper.TIMEOUT):
+        google_queries.append(api_url)
+        return [("Google Result", "https://fanedit.org/google-result/")], 1
+    
+    original = scraper.fetch_search_page
+    scraper.fetch_search_page = fake_search
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            index = TitleIndex(os.path.join(profile, 'catalogue.db'))
+            index.rebuild(LISTINGS)
+            index.close()
+            
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            import ifdb
+            
+            def configure(**settings):
+                settings.update(prefetch_enabled='false', search_cache_enabled='false')
+                os.environ['IFDB_STUB_SETTINGS'] = json.dumps(settings)
+                ifdb._addon = None
+            
+            # Check 5: Local-only search needs no API credentials
+            configure(search_source=ifdb.SEARCH_LOCAL)
+            results = run_find(ifdb, 'Star+Wars+Despecialized', '2011')
+            if not results or results[0][0] != "Star Wars: Despecialized Edition (2011)" or google_queries:
+                print(f"✗ Local-only search returned {results}")
+                return False
+            print("✓ Local-only search answers without the API")
+            
+            # Check 6: Local-first falls back to Google when nothing matches
+            configure(search_source=ifdb.SEARCH_LOCAL_FIRST, api_key='key', search_engine_id='cx')
+            run_find(ifdb, 'Star+Wars+Revisited')
+            if google_queries:
+                print("✗ Local-first search queried Google despite a local match")
+                return False
+            results = run_find(ifdb, 'Completely+Different+Film')
+            if [label for label, _ in results] != ["Google Result"]:
+                print(f"✗ Local-first search did not fall back to Google: {results}")
+                return False
+            print("✓ Local-first search falls back to Google when nothing matches")
+            
+            # Check 7: Google-only search ignores the local catalogue
+            google_queries.clear()
+            configure(search_source=ifdb.SEARCH_GOOGLE, api_key='key', search_engine_id='cx')
+            results = run_find(ifdb, 'Star+Wars+Revisited')
+            if len(google_queries) != 1 or results[0][0] != "Google Result":
+                print("✗ Google-only search used the local catalogue")
+                return False
+            print("✓ Google-only search ignores the local catalogue")
+    finally:
+        scraper.fetch_search_page = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Local Title Search Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_title_index() and test_search_modes()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Local title search works as expected")
+    else:
+        print("✗ TEST FAILED: Local title search needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the per-phase instrumentation (resources/lib/metrics.py)
+The ifdb.py checks use the stub xbmc modules in benchmarks/stubs; the network
+is replaced by a fake urlopen() serving a saved listing page.
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import urllib.request
+
+from benchmarks.stubs.fake_response import FakeResponse
+from resources.lib import metrics
+
+LISTING = os.path.join('test_data', 'listings', 'star-wars-despecialized.html')
+
+
+class AsyncResponse:
+    """Response whose read() is a coroutine, like fetch_engine.Response"""
+    
+    async def read(self, size=-1):
+        return b'y' * 500
+
+
+def test_recorder():
+    """Test phases, counters, rotation and the summary"""
+    
+    # Check 1: Nothing is recorded unless a recorder was started
+    with metrics.phase('idle'):
+        metrics.count('idle')
+    if metrics.enabled() or metrics.counting(io.BytesIO(), 'bytes').__class__ is metrics.CountingReader:
+        print("✗ Metrics were recorded without a recorder")
+        return False
+    print("✓ Phases and counters are no-ops when disabled")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'metrics.jsonl')
+        
+        # Check 2: Repeated phases add up and counters include bytes read
+        metrics.start('find')
+        for _ in range(3):
+            with metrics.phase('decode'):
+                pass
+        metrics.count('search_cache.miss')
+        metrics.counting(io.BytesIO(b'x' * 1000), 'search.bytes').read()
+        asyncio.run(metrics.counting(AsyncResponse(), 'listing.bytes').read())
+        record = metrics.finish(path)
+        counters = {'search_cache.miss': 1, 'search.bytes': 1000, 'listing.bytes': 500}
+        if set(record['phases']) != {'decode'} or record['counters'] != counters:
+            print(f"✗ Unexpected record: {record}")
+            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            if json.loads(f.readline()) != record:
+                print("✗ The record was not appended as a JSON line")
+                return False
+        print("✓ Phases, counters and bytes are recorded as a JSON line")
+        
+        # Check 3: Full files are rotated and read back oldest first
+        for index in range(20):
+            metrics.append_record(path, {'action': 'getdetails', 'total': index / 100, 'phases': {}, 'counters': {}},
+                                  max_bytes=200, backups=2)
+        files = sorted(name for name in os.listdir(tmp))
+        records = list(metrics.read_records(path))
+        totals = [record['total'] for record in records]
+        if files != ['metrics.jsonl', 'metrics.jsonl.1', 'metrics.jsonl.2'] or totals != sorted(totals):
+            print(f"✗ Rotation failed: {files} / {totals}")
+            return False
+        print("✓ The metrics file is rotated and read back in order")
+    
+    # Check 4: Nearest-rank percentiles per action and phase
+    records = [{'action': 'find', 'total': n / 100, 'phases': {'search.ttfb': n / 1000}, 'counters': {'quota.queries': 1}}
+               for n in range(1, 101)]
+    summary = metrics.summarize(records)['find']
+    ttfb = summary['phases']['search.ttfb']
+    if (summary['calls'] != 100 or summary['counters'] != {'quota.queries': 100}
+            or (ttfb['p50'], ttfb['p95'], ttfb['p99'], ttfb['max']) != (0.05, 0.095, 0.099, 0.1)):
+        print(f"✗ Unexpected summary: {summary}")
+        return False
+    print("✓ Percentiles and counter totals are computed per action")
+    return True
+
+
+def test_getdetails_metrics():
+    """Test that a getdetails call records its phases and cache counters"""
+    
+    with open(LISTING, 'rb') as f:
+        listing = f.read()
+    
+    def fake_urlopen(req, timeout=None):
+        return FakeResponse(listing)
+    
+    original = urllib.request.urlopen
+    urllib.request.urlopen = fake_urlopen
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps({'metrics_enabled': True, 'artwork_cache_enabled': False})
+            import ifdb
+            ifdb._addon = None
+            
+            for _ in range(2):
+                sys.argv = ['ifdb.py', '1', '?action=getdetails&url=https://fanedit.org/star-wars-despecialized/']
+                ifdb.main()
+            
+            first, second = metrics.read_records(os.path.join(profile, ifdb.METRICS_FILE))
+            
+            # Check 5: A cache miss records the network, extraction and ListItem phases
+            phases = {'listing.ttfb', 'listing.download', 'listing.extract', 'listitem'}
+            if not phases <= set(first['phases']) or first['counters'].get('details_cache.miss') != 1:
+                print(f"✗ Cache miss record is incomplete: {first}")
+                return False
+            if not 0 < first['counters'].get('listing.bytes', 0) <= len(listing):
+                print(f"✗ Bytes transferred not recorded: {first['counters']}")
+                return False
+            print("✓ getdetails records per-phase timings and bytes transferred")
+            
+            # Check 6: A cache hit is counted and makes no network phases
+            if second['counters'] != {'details_cache.hit': 1} or 'listing.ttfb' in second['phases']:
+                print(f"✗ Cache hit record is wrong: {second}")
+                return False
+            print("✓ Details cache hits are counted")
+    finally:
+        urllib.request.urlopen = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Instrumentation Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_recorder() and test_getdetails_metrics()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Instrumentation works as expected")
+    else:
+        print("✗ TEST FAILED: Instrumentation needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
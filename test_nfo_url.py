@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the NfoUrl action (listing named in an .nfo file)
+Runs ifdb.py with the stub xbmc modules in benchmarks/stubs; any network access
+fails the test.
+"""
+
+import os
+import sys
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'stubs'))
+
+from resources.lib.records import find_listing_url
+
+CASES = [
+    # URL-only .nfo files
+    ("https://fanedit.org/star-wars-despecialized/", "https://fanedit.org/star-wars-despecialized/"),
+    ("http://www.fanedit.org/kill-bill-the-whole-bloody-affair\n", "https://fanedit.org/kill-bill-the-whole-bloody-affair/"),
+    ("fanedit.org/the-hobbit-the-tolkien-edit/?utm_source=x#comments", "https://fanedit.org/the-hobbit-the-tolkien-edit/"),
+    # Full .nfo files
+    ('<movie><title>Dune</title><uniqueid type="fanedit" default="true">dune-the-alternative-edition-redux'
+     '</uniqueid></movie>', "https://fanedit.org/dune-the-alternative-edition-redux/"),
+    ("<movie><url>https://fanedit.org/the-matrix-revisited-trilogy-cut/</url></movie>",
+     "https://fanedit.org/the-matrix-revisited-trilogy-cut/"),
+    # The first listing wins over forum and category links
+    ("See https://fanedit.org/forum/thread-1/ and https://fanedit.org/category/star-wars/, "
+     "then https://fanedit.org/star-wars-episode-i-the-phantom-edit/.",
+     "https://fanedit.org/star-wars-episode-i-the-phantom-edit/"),
+    # No listing
+    ("https://www.imdb.com/title/tt0076759/", None),
+    ("https://fanedit.org/", None),
+    ("https://notfanedit.org/star-wars/", None),
+    ('<uniqueid type="imdb">tt0076759</uniqueid>', None),
+    ('<uniqueid type="fanedit">../../etc</uniqueid>', None),
+    ("", None),
+]
+
+
+def test_find_listing_url():
+    """Test that listing URLs and IDs are found and validated"""
+    
+    # Check 1: Listing URLs and IDs are found and canonicalized; others are rejected
+    for nfo, expected in CASES:
+        found = find_listing_url(nfo)
+        if found != expected:
+            print(f"✗ {nfo!r}: expected {expected}, got {found}")
+            return False
+    print(f"✓ {len(CASES)} .nfo contents resolved as expected")
+    return True
+
+
+def test_nfo_url_action():
+    """Test that the NfoUrl action returns the listing without touching the network"""
+    
+    import xbmcplugin
+    import ifdb
+    
+    def no_network(*args, **kwargs):
+        raise AssertionError('network access')
+    
+    original = urllib.request.urlopen
+    urllib.request.urlopen = no_network
+    try:
+        # Check 2: A listing in the .nfo is returned as the only item
+        del xbmcplugin.items[:]
+        nfo = '<movie><url>https://www.fanedit.org/star-wars-despecialized/</url></movie>'
+        sys.argv = ['ifdb.py', '1', '?action=NfoUrl&nfo=' + urllib.parse.quote(nfo)]
+        ifdb.main()
+        urls = [url for url, _, _ in xbmcplugin.items]
+        if urls != ['https://fanedit.org/star-wars-despecialized/']:
+            print(f"✗ Unexpected NfoUrl result: {urls}")
+            return False
+        print("✓ NfoUrl returns the listing URL without a search")
+        
+        # Check 3: Nothing is returned for an .nfo without a listing
+        del xbmcplugin.items[:]
+        sys.argv = ['ifdb.py', '1', '?action=NfoUrl&nfo=' + urllib.parse.quote('https://www.imdb.com/title/tt0076759/')]
+        ifdb.main()
+        if xbmcplugin.items:
+            print(f"✗ NfoUrl returned items for an .nfo without a listing: {xbmcplugin.items}")
+            return False
+        print("✓ NfoUrl returns nothing for other .nfo contents")
+    except AssertionError:
+        print("✗ NfoUrl accessed the network")
+        return False
+    finally:
+        urllib.request.urlopen = original
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - NfoUrl Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_find_listing_url() and test_nfo_url_action()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: NfoUrl works as expected")
+    else:
+        print("✗ TEST FAILED: NfoUrl needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
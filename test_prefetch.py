@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script to validate speculative detail prefetch after a search
+Runs ifdb.py with the stub xbmc modules in benchmarks/stubs; network access is
+replaced by a saved listing page.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'stubs'))
+
+from resources.lib import scraper
+from resources.lib.ranking import rank_hits
+
+LISTING = os.path.join('test_data', 'listings', 'star-wars-despecialized.html')
+RESULTS = [
+    ("Star Wars: Despecialized Edition", "https://fanedit.org/star-wars-despecialized/"),
+    ("Star Wars: Revisited", "https://fanedit.org/star-wars-revisited/"),
+    ("Star Wars: Silent Edition", "https://fanedit.org/star-wars-silent/"),
+]
+# Results as search_movie() lists them for "Star Wars" (1977), best match first
+RANKED, _ = rank_hits([RESULTS], 'Star Wars', '1977')
+
+
+def run_action(ifdb, query):
+    """Invoke the scraper entry point the way Kodi does"""
+    sys.argv = ['ifdb.py', '1', query]
+    ifdb.main()
+
+
+def test_prefetch():
+    """Test that the top search results are prefetched and then served from the cache"""
+    
+    print("=" * 70)
+    print("IFDB Scraper - Detail Prefetch Validation")
+    print("=" * 70)
+    print()
+    
+    with open(LISTING, 'r', encoding='utf-8') as f:
+        listing_html = f.read()
+    
+    fetched = []
+    lock = threading.Lock()
+    
+    def fake_search(api_url, timeout=scraper.TIMEOUT):
+        return list(RESULTS), len(RESULTS)
+    
+    def fake_fetch(url, agent, etag=None, last_modified=None, timeout=scraper.TIMEOUT):
+        with lock:
+            fetched.append((url, threading.current_thread().name))
+        return listing_html, '"v1"', None, False
+    
+    def fake_fetch_bytes(url, agent, max_bytes=None, timeout=scraper.TIMEOUT):
+        # Posters of prefetched listings; an error keeps them out of the artwork cache
+        raise OSError("offline")
+    
+    original = scraper.fetch_search_page, scraper.fetch_listing, scraper.fetch_bytes
+    scraper.fetch_search_page, scraper.fetch_listing, scraper.fetch_bytes = fake_search, fake_fetch, fake_fetch_bytes
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps({
+                'api_key': 'key', 'search_engine_id': 'cx', 'prefetch_count': 2
+            })
+            import ifdb
+            ifdb._addon = None
+            
+            # Check 1: A search prefetches the top results in background threads
+            run_action(ifdb, '?action=find&title=Star+Wars&year=1977')
+            prefetched = sorted(url for url, _ in fetched)
+            if prefetched != sorted(url for _, url in RANKED[:2]):
+                print(f"✗ Expected the top 2 results to be prefetched, got {prefetched}")
+                return False
+            if any(name == threading.main_thread().name for _, name in fetched):
+                print("✗ Prefetch ran on the main thread")
+                return False
+            print("✓ Top search results are prefetched in background threads")
+            
+            # Check 2: getdetails for a prefetched listing does not touch the network
+            fetched.clear()
+            run_action(ifdb, f'?action=getdetails&url={RANKED[0][1]}')
+            if fetched:
+                print(f"✗ getdetails fetched a prefetched listing again: {fetched}")
+                return False
+            print("✓ getdetails for a prefetched listing is a local cache lookup")
+            
+            # Check 3: Results beyond prefetch_count are fetched on demand
+            run_action(ifdb, f'?action=getdetails&url={RANKED[2][1]}')
+            if [url for url, _ in fetched] != [RANKED[2][1]]:
+                print("✗ Listing outside the prefetch window was not fetched on demand")
+                return False
+            print("✓ Listings outside the prefetch window are fetched on demand")
+            
+            # Check 4: Prefetch can be turned off
+            fetched.clear()
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps({
+                'api_key': 'key', 'search_engine_id': 'cx', 'prefetch_enabled': 'false',
+                'search_cache_enabled': 'false', 'details_cache_enabled': 'false'
+            })
+            ifdb._addon = None
+            run_action(ifdb, '?action=find&title=Star+Wars&year=1977')
+            if fetched:
+                print("✗ Listings were prefetched with prefetch disabled")
+                return False
+            print("✓ Prefetch can be disabled in the settings")
+    finally:
+        scraper.fetch_search_page, scraper.fetch_listing, scraper.fetch_bytes = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    
+    print()
+    return True
+
+
+def main():
+    """Main function"""
+    success = test_prefetch()
+    
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Detail prefetch works as expected")
+    else:
+        print("✗ TEST FAILED: Detail prefetch needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
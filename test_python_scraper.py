@@ -51,7 +51,7 @@ def test_python_scraper():
     print()
     
     # Check for required imports (accounting for submodule imports)
-    required_base_imports = ['json', 're', 'sys', 'xbmc', 'xbmcaddon', 'xbmcgui', 'xbmcplugin']
+    required_base_imports = ['sys', 'xbmc', 'xbmcaddon', 'xbmcgui', 'xbmcplugin']
     found_base_imports = []
     has_urllib = False
     
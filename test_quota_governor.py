@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the cross-process API quota governor (resources/lib/quota.py)
+The ifdb.py checks use the stub xbmc modules in benchmarks/stubs; no network access.
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'stubs'))
+
+import xbmcgui
+
+from resources.lib import scraper
+from resources.lib.quota import QuotaExceeded, QuotaGovernor, classify_error
+
+# Acquires tokens in a separate process until the budget is spent
+WORKER = '''
+import sys
+from resources.lib.quota import QuotaExceeded, QuotaGovernor
+governor = QuotaGovernor(sys.argv[1], daily_budget=30, rate=500, burst=5)
+granted = 0
+while True:
+    try:
+        governor.acquire(max_wait=5)
+    except QuotaExceeded:
+        break
+    granted += 1
+print(granted)
+'''
+
+
+def google_error(code, reason, message=''):
+    """Build an HTTPError shaped like a Custom Search API error response"""
+    body = json.dumps({'error': {'code': code, 'message': message, 'errors': [{'reason': reason}]}})
+    return urllib.error.HTTPError(scraper.CSE_URL, code, 'Error', {}, io.BytesIO(body.encode('utf-8')))
+
+
+def test_governor():
+    """Test the token bucket, the daily budget, backoff and error classification"""
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Check 1: Queries are spaced by the rate limit
+        governor = QuotaGovernor(os.path.join(tmp, 'rate.db'), daily_budget=100, rate=20, burst=1)
+        start = time.perf_counter()
+        for _ in range(6):
+            governor.acquire()
+        elapsed = time.perf_counter() - start
+        if elapsed < 0.2:
+            print(f"✗ 6 queries at 20/s took only {elapsed * 1000:.0f}ms")
+            return False
+        if governor.counters()['throttled'] == 0:
+            print("✗ Waiting for a token was not counted")
+            return False
+        print("✓ Queries are spaced by the per-second rate")
+        
+        # Optional queries are taken only if a token is free, and not counted as denied
+        denied = governor.counters()['denied']
+        if governor.try_acquire() or governor.counters()['denied'] != denied:
+            print("✗ An optional query without a free token was granted or counted as denied")
+            return False
+        time.sleep(0.06)
+        if not governor.try_acquire():
+            print("✗ An optional query was refused a free token")
+            return False
+        print("✓ Optional queries only take free tokens and are not counted as denied")
+        
+        # Check 2: The daily budget is shared by concurrent processes
+        path = os.path.join(tmp, 'shared.db')
+        QuotaGovernor(path)
+        workers = [
+            subprocess.Popen([sys.executable, '-c', WORKER, path], stdout=subprocess.PIPE, text=True)
+            for _ in range(3)
+        ]
+        granted = sum(int(worker.communicate()[0]) for worker in workers)
+        counters = QuotaGovernor(path, daily_budget=30).counters()
+        if granted != 30 or counters['used'] != 30 or counters['remaining'] != 0:
+            print(f"✗ 3 processes were granted {granted} queries from a budget of 30 ({counters})")
+            return False
+        try:
+            QuotaGovernor(path, daily_budget=30).acquire(max_wait=0)
+            print("✗ A query was granted after the budget was spent")
+            return False
+        except QuotaExceeded as e:
+            if e.reason != 'daily budget spent':
+                print(f"✗ Unexpected reason: {e.reason}")
+                return False
+        print("✓ The daily budget is shared by concurrent processes")
+        
+        # Check 3: Google quota errors are recognised
+        cases = [
+            (google_error(429, 'rateLimitExceeded'), 'rate'),
+            (google_error(403, 'userRateLimitExceeded'), 'rate'),
+            (google_error(403, 'dailyLimitExceeded'), 'daily'),
+            (google_error(429, '', "Quota exceeded for quota metric 'Queries' and limit 'Queries per day'"), 'daily'),
+            (google_error(400, 'badRequest'), None),
+            (google_error(403, 'accessNotConfigured'), None),
+        ]
+        for error, expected in cases:
+            if classify_error(error) != expected:
+                print(f"✗ HTTP {error.code} was not classified as {expected}")
+                return False
+        print("✓ Google quota and rate-limit errors are recognised")
+        
+        # Check 4: Rate-limit errors back off with growing, jittered delays
+        governor = QuotaGovernor(os.path.join(tmp, 'backoff.db'), rate=100)
+        delays = [governor.report_limited('rate') for _ in range(4)]
+        if not all(0 < delay for delay in delays) or not delays[3] > delays[0]:
+            print(f"✗ Backoff delays do not grow: {delays}")
+            return False
+        try:
+            governor.acquire(max_wait=0)
+            print("✗ A query was granted during backoff")
+            return False
+        except QuotaExceeded:
+            pass
+        if governor.counters()['rate_limited'] != 4:
+            print("✗ Rate-limit errors were not counted")
+            return False
+        print("✓ Rate-limit errors back off exponentially with jitter")
+        
+        # Check 5: One notification per block
+        if [governor.claim_notification() for _ in range(3)] != [True, False, False]:
+            print("✗ More than one caller was told to notify")
+            return False
+        print("✓ Only the first caller after a block shows a notification")
+    return True
+
+
+def test_find_with_quota():
+    """Test that action=find degrades gracefully once Google reports a quota error"""
+    
+    calls = []
+    
+    def fake_search(api_url, timeout=scraper.TIMEOUT):
+        calls.append(api_url)
+        raise google_error(403, 'dailyLimitExceeded')
+    
+    original = scraper.fetch_search_page
+    scraper.fetch_search_page = fake_search
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps({
+                'api_key': 'key', 'search_engine_id': 'cx', 'search_cache_enabled': 'false'
+            })
+            import ifdb
+            ifdb._addon = None
+            del xbmcgui.notifications[:]
+            
+            for title in ('Star+Wars', 'Kill+Bill', 'The+Hobbit'):
+                sys.argv = ['ifdb.py', '1', f'?action=find&title={title}']
+                ifdb.main()
+            
+            # Check 6: After the quota error, searches stop and only one notification is shown
+            if len(calls) != 1:
+                print(f"✗ {len(calls)} API calls were made after the daily quota was exhausted")
+                return False
+            if len(xbmcgui.notifications) != 1:
+                print(f"✗ Expected one notification, got {xbmcgui.notifications}")
+                return False
+            print("✓ A scan stops querying after a quota error and notifies once")
+    finally:
+        scraper.fetch_search_page = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - API Quota Governor Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_governor() and test_find_with_quota()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: API quota governor works as expected")
+    else:
+        print("✗ TEST FAILED: API quota governor needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the compact record store (resources/lib/record_store.py)
+and getdetails served from it
+Runs ifdb.py with the stub xbmc modules in benchmarks/stubs; any network access
+fails the test.
+"""
+
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'stubs'))
+
+from resources.lib.record_store import RecordStore, store_path, write_store
+from resources.lib.records import FaneditRecord, parse_listing
+
+GENRES = ['Action', 'Adventure', 'Comedy', 'Drama', 'Fantasy', 'Horror', 'Science Fiction', 'Thriller']
+
+
+def fixture_listings():
+    """Return (url, record) for the saved listing pages"""
+    listings = []
+    for path in sorted(glob.glob(os.path.join('test_data', 'listings', '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            record = parse_listing(f.read())
+        listings.append((f"https://fanedit.org/{os.path.basename(path)[:-5]}/", record))
+    return listings
+
+
+def synthetic_listings(count):
+    """Generate a catalogue of listings with realistic field sizes"""
+    rng = random.Random(1)
+    words = [''.join(rng.choice('etaoinshrdlucmfwyp') for _ in range(rng.randint(2, 9))) for _ in range(3000)]
+    editors = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(8)).capitalize() for _ in range(800)]
+    for i in range(count):
+        slug = f"synthetic-edit-{i}"
+        yield f"https://fanedit.org/{slug}/", FaneditRecord(
+            title=' '.join(rng.choice(words).capitalize() for _ in range(rng.randint(2, 6))),
+            plot=' '.join(rng.choice(words) for _ in range(rng.randint(40, 120))) + '.',
+            year=1990 + i % 35,
+            genres=rng.sample(GENRES, rng.randint(1, 3)),
+            directors=[rng.choice(editors)],
+            rating=round(rng.uniform(5, 10), 1),
+            votes=rng.randint(1, 500),
+            tagline=' '.join(rng.choice(words) for _ in range(rng.randint(4, 10))) if i % 3 else None,
+            thumb=f"https://fanedit.org/media/reviews/photos/original/{slug}.jpg",
+        )
+
+
+def test_record_store():
+    """Test round trips, size and lookup cost of the record store"""
+    
+    listings = fixture_listings()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalogue.rec')
+        
+        # Check 1: Records come back unchanged, by URL or listing ID
+        write_store(path, listings)
+        with RecordStore(path) as store:
+            if len(store) != len(listings):
+                print(f"✗ Store holds {len(store)} records, expected {len(listings)}")
+                return False
+            for url, record in listings:
+                if store.get(url) != record or store.get(url.split('/')[-2]) != record:
+                    print(f"✗ {url} did not round-trip: {store.get(url)}")
+                    return False
+            if store.get('https://fanedit.org/not-stored/') is not None or 'not-stored' in store:
+                print("✗ A listing that was not stored was found")
+                return False
+        print(f"✓ {len(listings)} records round-trip by URL and listing ID")
+        
+        # Check 2: The catalogue takes a fraction of its JSON size
+        catalogue = list(synthetic_listings(8000))
+        write_store(path, catalogue)
+        size = os.path.getsize(path)
+        json_size = sum(len(json.dumps(record.to_dict())) + len(url) for url, record in catalogue)
+        if size > json_size * 0.6:
+            print(f"✗ Store takes {size / 1024:.0f} KiB for {json_size / 1024:.0f} KiB of JSON")
+            return False
+        with RecordStore(path) as store:
+            url, record = catalogue[4321]
+            if store.get(url) != record:
+                print("✗ Lookup in a large store returned the wrong record")
+                return False
+        print(f"✓ {len(catalogue)} listings take {size / 1024:.0f} KiB "
+              f"({size / len(catalogue):.0f} bytes each, JSON: {json_size / 1024:.0f} KiB)")
+        
+        # Check 3: A fresh process opens the store and looks a record up in milliseconds
+        script = (
+            "import time\n"
+            "from resources.lib.record_store import RecordStore\n"
+            "start = time.perf_counter()\n"
+            f"store = RecordStore({path!r}); record = store.get('synthetic-edit-7777')\n"
+            "print(record.title if record else '', (time.perf_counter() - start) * 1000)\n"
+        )
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.rsplit(' ', 1)
+        if output[0] != catalogue[7777][1].title:
+            print(f"✗ Fresh process lookup failed: {output}")
+            return False
+        elapsed = float(output[1])
+        if elapsed > 10:
+            print(f"✗ Opening the store and a lookup took {elapsed:.1f}ms in a fresh process")
+            return False
+        print(f"✓ Opening the store and a lookup take {elapsed:.2f}ms in a fresh process")
+    return True
+
+
+def test_getdetails_from_store():
+    """Test that getdetails uses the record store with local search and only then"""
+    
+    import xbmcplugin
+    
+    requests = []
+    
+    def no_network(req, timeout=None):
+        requests.append(req)
+        raise OSError('network access')
+    
+    def run(url):
+        del xbmcplugin.items[:]
+        sys.argv = ['ifdb.py', '1', f'?action=getdetails&url={urllib.parse.quote(url)}']
+        ifdb.main()
+        return xbmcplugin.items[0][1] if xbmcplugin.items else None
+    
+    listings = fixture_listings()
+    url, record = listings[-1]
+    original = urllib.request.urlopen
+    urllib.request.urlopen = no_network
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            write_store(store_path(os.path.join(profile, 'catalogue.db')), listings)
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            import ifdb
+            
+            def configure(**settings):
+                settings.update(artwork_cache_enabled=False, prefetch_enabled=False)
+                os.environ['IFDB_STUB_SETTINGS'] = json.dumps(settings)
+                ifdb._addon = None
+            
+            # Check 4: With local search, details come from the store without a request
+            configure(search_source=ifdb.SEARCH_LOCAL)
+            listitem = run(url)
+            if listitem is None or requests:
+                print(f"✗ getdetails made {len(requests)} request(s) despite the record store")
+                return False
+            if listitem.getVideoInfoTag().values.get('Title') != record.title:
+                print("✗ getdetails returned the wrong listing from the record store")
+                return False
+            print("✓ getdetails is served from the record store with local search")
+            
+            # Check 5: Google-only search keeps fetching the listing page
+            configure(search_source=ifdb.SEARCH_GOOGLE, details_cache_enabled=False)
+            run(url)
+            if len(requests) != 1:
+                print("✗ getdetails used the record store with Google-only search")
+                return False
+            print("✓ Google-only search ignores the record store")
+    finally:
+        urllib.request.urlopen = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Record Store Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_record_store() and test_getdetails_from_store()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Record store works as expected")
+    else:
+        print("✗ TEST FAILED: Record store needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
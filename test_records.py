@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the Kodi-independent records (resources/lib/records.py)
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+from resources.lib.cache import DetailsCache
+from resources.lib.extract import extract_fields
+from resources.lib.nfo import build_movie_nfo
+from resources.lib.records import FaneditRecord, SearchHit, parse_listing, parse_search
+
+LISTINGS = sorted(glob.glob(os.path.join('test_data', 'listings', '*.html')))
+
+
+def test_parse_listing():
+    """Test that records carry exactly the extracted fields and serialize compactly"""
+    
+    for path in LISTINGS:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        record = parse_listing(html)
+        
+        # Check 1: A record holds the same fields as the extractor's dict
+        if record.to_dict() != extract_fields(html):
+            print(f"✗ {os.path.basename(path)}: record differs from the extracted fields")
+            return False
+        
+        # Check 2: The compact JSON form round-trips and has no field names
+        stored = json.dumps(record.to_list())
+        if FaneditRecord.from_list(json.loads(stored)) != record or '"title"' in stored:
+            print(f"✗ {os.path.basename(path)}: compact serialization does not round-trip")
+            return False
+    print(f"✓ {len(LISTINGS)} listing pages parse into records that round-trip")
+    
+    # Check 3: Records have no per-instance dict, and replace() leaves the original unchanged
+    record = parse_listing(open(LISTINGS[0], encoding='utf-8').read())
+    if hasattr(record, '__dict__'):
+        print("✗ FaneditRecord instances have a __dict__")
+        return False
+    local = record.replace(thumb='/profile/artwork/poster.jpg')
+    if local.thumb == record.thumb or local.title != record.title:
+        print("✗ replace() did not return a changed copy")
+        return False
+    print("✓ Records are slotted and replace() returns a copy")
+    
+    # Check 4: The .nfo writer works from a record
+    nfo = build_movie_nfo(record)
+    if f"<title>{record.title}</title>" not in nfo or nfo.count('<genre>') != len(record.genres):
+        print("✗ .nfo document does not match the record")
+        return False
+    print("✓ .nfo documents are built from records")
+    return True
+
+
+def test_parse_search():
+    """Test search response parsing"""
+    
+    response = {
+        'searchInformation': {'totalResults': '3'},
+        'items': [
+            {'title': 'Star Wars: Despecialized Edition', 'link': 'https://fanedit.org/star-wars-despecialized/'},
+            {'title': 'Fanedit.org Forum', 'link': 'https://fanedit.org/forum/threads/star-wars.1/'},
+            {'title': 'Kill Bill', 'link': 'https://www.fanedit.org/kill-bill/'},
+        ],
+    }
+    
+    # Check 5: Non-listing pages are dropped; bytes, text and decoded JSON are accepted
+    expected = [
+        SearchHit('Star Wars: Despecialized Edition', 'https://fanedit.org/star-wars-despecialized/'),
+        SearchHit('Kill Bill', 'https://www.fanedit.org/kill-bill/'),
+    ]
+    for data in (response, json.dumps(response), json.dumps(response).encode('utf-8')):
+        if parse_search(data) != expected:
+            print(f"✗ Unexpected hits from {type(data).__name__}: {parse_search(data)}")
+            return False
+    if parse_search({}) != [] or expected[0] != ('Star Wars: Despecialized Edition', expected[0].url):
+        print("✗ Empty responses or tuple compatibility failed")
+        return False
+    print("✓ Search responses parse into SearchHit tuples")
+    return True
+
+
+def test_legacy_cache_rows():
+    """Test that details cache entries written as field dicts are still read"""
+    
+    fields = {'title': 'Minimal Fanedit', 'year': 2020, 'genres': ['Drama']}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'details_cache.db')
+        DetailsCache(path).close()
+        conn = sqlite3.connect(path)
+        conn.execute(
+            'INSERT INTO details_cache (url, fields, validated, accessed) VALUES (?, ?, 1e12, 1e12)',
+            ('https://fanedit.org/minimal/', json.dumps(fields))
+        )
+        conn.commit()
+        conn.close()
+        
+        # Check 6: Older entries become records
+        cache = DetailsCache(path, max_age=1e13)
+        record = cache.get('https://fanedit.org/minimal/')['record']
+        cache.close()
+    if record != FaneditRecord.from_dict(fields) or record.genres != ('Drama',):
+        print(f"✗ Legacy cache entry was not read as a record: {record}")
+        return False
+    print("✓ Cache entries written before records are still read")
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Record Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_parse_listing() and test_parse_search() and test_legacy_cache_rows()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Records work as expected")
+    else:
+        print("✗ TEST FAILED: Records need corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
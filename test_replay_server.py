@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the replay server and load harness
+(benchmarks/replay_server.py, benchmarks/load_test.py)
+The server listens on 127.0.0.1 only; nothing leaves the machine.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.error
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+import fixtures
+import load_test
+from replay_server import FaultConfig, ReplayServer
+from resources.lib import scraper
+from resources.lib.quota import classify_error
+
+LISTING = 'https://fanedit.org/star-wars-despecialized-edition/'
+
+
+def test_site_url():
+    """Test that only fanedit.org URLs are sent to the stand-in server"""
+    
+    original = scraper.SITE_URL
+    try:
+        # Check 1: Without an override, URLs are left alone
+        scraper.SITE_URL = None
+        if scraper.site_url(LISTING) != LISTING:
+            print("✗ URL rewritten without an override")
+            return False
+        
+        # Check 2: fanedit.org URLs move to the override, others stay
+        scraper.SITE_URL = 'http://127.0.0.1:8765/replay/'
+        rewritten = scraper.site_url('https://www.fanedit.org/some-edit/?p=1')
+        if rewritten != 'http://127.0.0.1:8765/replay/some-edit/?p=1':
+            print(f"✗ Unexpected rewrite: {rewritten}")
+            return False
+        if scraper.site_url('https://example.com/poster.jpg') != 'https://example.com/poster.jpg':
+            print("✗ A URL of another site was rewritten")
+            return False
+        print("✓ fanedit.org URLs are rewritten to IFDB_SITE_URL, other URLs are not")
+    finally:
+        scraper.SITE_URL = original
+    return True
+
+
+def test_replay():
+    """Test that the server replays the corpus and injects faults"""
+    
+    original = scraper.CSE_URL, scraper.SITE_URL
+    faults = FaultConfig()
+    try:
+        with ReplayServer(faults) as server:
+            scraper.CSE_URL, scraper.SITE_URL = server.cse_url, server.site_url
+            
+            # Check 3: Searches are answered from the recorded CSE responses
+            for search in fixtures.load_searches():
+                urls = [url for _, url in scraper.search('key', 'cx', search['query'])]
+                if f"https://fanedit.org/{search['listing']}/" not in urls:
+                    print(f"✗ {search['query']!r} did not find {search['listing']}: {urls}")
+                    return False
+            print("✓ Recorded searches are answered like the Custom Search API")
+            
+            # Check 4: Listings carry an ETag and revalidate with 304
+            html, etag, _, _ = scraper.fetch_listing(LISTING, 'agent')
+            if not html or not etag:
+                print("✗ Listing page or ETag missing")
+                return False
+            revalidated = scraper.fetch_listing(LISTING, 'agent', etag=etag)
+            if revalidated[0] is not None or server.stats.get('status.304') != 1:
+                print("✗ Revalidation was not answered 304 Not Modified")
+                return False
+            print("✓ Listing pages are served with an ETag and revalidated")
+            
+            # Check 5: 429 answers look like Google rate limiting
+            faults.error_429 = 1.0
+            try:
+                scraper.fetch_search_page(scraper.build_search_url('key', 'cx', 'star wars'))
+                print("✗ No 429 injected")
+                return False
+            except urllib.error.HTTPError as e:
+                if e.code != 429 or classify_error(e) != 'rate':
+                    print(f"✗ Unexpected error: {e.code}")
+                    return False
+            faults.error_429 = 0.0
+            
+            # Check 6: 5xx errors and stalled requests
+            faults.error_5xx = 1.0
+            try:
+                scraper.fetch_listing(LISTING, 'agent')
+                print("✗ No server error injected")
+                return False
+            except urllib.error.HTTPError as e:
+                if e.code not in (500, 502, 503):
+                    print(f"✗ Unexpected error: {e.code}")
+                    return False
+            faults.error_5xx = 0.0
+            faults.timeouts, faults.stall = 1.0, 2.0
+            start = time.perf_counter()
+            try:
+                scraper.fetch_listing(LISTING, 'agent', timeout=0.3)
+                print("✗ Stalled request was answered")
+                return False
+            except Exception:
+                if time.perf_counter() - start > 1.5:
+                    print("✗ The client timeout did not apply")
+                    return False
+            faults.timeouts = 0.0
+            print("✓ 429, 5xx and stalls are injected")
+            
+            # Check 7: Latency and bandwidth limits slow the answers down
+            faults.latency, faults.bandwidth = 0.2, 200
+            start = time.perf_counter()
+            body = scraper.fetch_bytes(LISTING, 'agent')
+            elapsed = time.perf_counter() - start
+            expected = 0.2 + len(body) / (200 * 1024)
+            if elapsed < expected * 0.8:
+                print(f"✗ {len(body)} bytes took {elapsed:.2f}s, expected at least {expected:.2f}s")
+                return False
+            print(f"✓ Latency and bandwidth limits apply ({len(body)} bytes in {elapsed:.2f}s)")
+    finally:
+        scraper.CSE_URL, scraper.SITE_URL = original
+    return True
+
+
+def test_load_harness():
+    """Test that the harness drives ifdb.py and reports rates and percentiles"""
+    
+    original = scraper.CSE_URL, scraper.SITE_URL
+    try:
+        with ReplayServer() as server, tempfile.TemporaryDirectory() as profile:
+            load_test.point_at(server.cse_url, server.site_url)
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps(load_test.LOAD_SETTINGS)
+            import ifdb
+            ifdb._addon = None
+            
+            calls = load_test.build_calls(ifdb, load_test.ACTIONS)
+            samples, elapsed = load_test.run_load(calls, rate=40, duration=0.5, concurrency=4)
+            summary = load_test.report(samples, elapsed)
+            
+            # Check 8: Every call succeeded against a fault-free server
+            if summary['all']['calls'] != 20 or summary['all']['succeeded'] != 20:
+                print(f"✗ Unexpected results: {summary['all']}")
+                return False
+            if set(summary) != {'find', 'getdetails', 'all'} or not summary['all']['p50'] <= summary['all']['max']:
+                print(f"✗ Unexpected summary: {summary}")
+                return False
+            if server.stats.get('cse', 0) < 10 or server.stats.get('listing', 0) < 10:
+                print(f"✗ Calls did not reach the server: {server.stats}")
+                return False
+            print(f"✓ Load harness ran 20 calls at {summary['all']['rate']:.0f} scrapes/s")
+    finally:
+        scraper.CSE_URL, scraper.SITE_URL = original
+        for name in ('IFDB_STUB_PROFILE', 'IFDB_STUB_SETTINGS', 'IFDB_CSE_URL', 'IFDB_SITE_URL'):
+            os.environ.pop(name, None)
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Replay Server and Load Harness Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_site_url() and test_replay() and test_load_harness()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Replay server and load harness work as expected")
+    else:
+        print("✗ TEST FAILED: Replay server or load harness needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
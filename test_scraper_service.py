@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the scraper service (service.py, resources/lib/service.py)
+Runs service.py and fresh ifdb.py processes, as Kodi does, with the stub xbmc
+modules in benchmarks/stubs, against benchmarks/replay_server.py on 127.0.0.1;
+nothing leaves the machine.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STUBS_DIR = os.path.join(ROOT, 'benchmarks', 'stubs')
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import fixtures
+from replay_server import FaultConfig, ReplayServer
+from resources.lib.service import (SERVICE_FILE, ScraperService, ServiceCallFailed, ServiceUnavailable, call,
+                                  read_service_file)
+
+SETTINGS = {
+    'api_key': 'key',
+    'search_engine_id': 'cx',
+    'search_variants': False,
+    'artwork_cache_enabled': False,
+    'quota_daily_budget': 0,
+    'quota_rate': 1000,
+}
+
+# Executed in the child interpreter: runs ifdb.py like Kodi and prints what it listed
+RUNNER = '''
+import json, runpy, sys, time
+import xbmcplugin
+start = time.perf_counter()
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+elapsed = time.perf_counter() - start
+print(json.dumps({'elapsed': elapsed, 'items': [
+    [url, item.getLabel(), item.properties, item.art, item.getVideoInfoTag().values]
+    for url, item, _ in xbmcplugin.items
+]}))
+'''
+
+
+def environment(server, profile):
+    """Environment of the scraper processes: stubs, replay server and addon profile"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([STUBS_DIR, ROOT])
+    env['IFDB_STUB_SETTINGS'] = json.dumps(SETTINGS)
+    env['IFDB_STUB_PROFILE'] = profile
+    env['IFDB_STUB_LOG_LEVEL'] = '99'
+    env['IFDB_CSE_URL'] = server.cse_url
+    env['IFDB_SITE_URL'] = server.site_url
+    return env
+
+
+def run_ifdb(env, query):
+    """Run one scraper call in a fresh interpreter; returns (seconds, listed items)"""
+    output = subprocess.run(
+        [sys.executable, '-c', RUNNER, os.path.join(ROOT, 'ifdb.py'), '1', query],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    reply = json.loads(output.stdout.strip().splitlines()[-1])
+    return reply['elapsed'], reply['items']
+
+
+def scan(env, searches):
+    """find and getdetails on the first result of each search, as a library scan does"""
+    results = []
+    for search in searches:
+        query = urllib.parse.urlencode({'action': 'find', 'title': search['title'], 'year': search['year']})
+        find_time, items = run_ifdb(env, '?' + query)
+        details_url = urllib.parse.parse_qs(items[0][0][1:])['url'][0]
+        results.append((find_time, items, details_url))
+    return results
+
+
+def details(env, urls):
+    """getdetails on each URL; returns (seconds, items) per URL"""
+    return [run_ifdb(env, '?' + urllib.parse.urlencode({'action': 'getdetails', 'url': url})) for url in urls]
+
+
+def test_protocol():
+    """Test calls, errors and refused clients against an in-process ScraperService"""
+
+    def handler(action, params):
+        if action == 'fail':
+            raise ValueError('broken')
+        if action == 'slow':
+            time.sleep(0.5)
+        return {'action': action, 'params': params}
+
+    with tempfile.TemporaryDirectory() as profile:
+        # Check 1: A call returns the handler's reply; a missing service raises ServiceUnavailable,
+        # a call that fails or times out in the service ServiceCallFailed
+        try:
+            call(profile, 'find', {})
+            print("✗ A call succeeded without a service")
+            return False
+        except ServiceUnavailable:
+            pass
+        with ScraperService(profile, handler) as service:
+            if call(profile, 'find', {'title': 'x'}) != {'action': 'find', 'params': {'title': 'x'}}:
+                print("✗ The service did not return the handler's reply")
+                return False
+            for action, timeout in (('fail', 5.0), ('slow', 0.1)):
+                try:
+                    call(profile, action, {}, timeout=timeout)
+                    print(f"✗ A {action} call was not reported")
+                    return False
+                except ServiceCallFailed:
+                    pass
+                except ServiceUnavailable:
+                    print(f"✗ A {action} call the service took was reported as a missing service")
+                    return False
+
+            # Check 2: The service file is private and a client without the token gets no reply
+            if os.name == 'posix' and os.stat(os.path.join(profile, SERVICE_FILE)).st_mode & 0o077:
+                print("✗ The service file is readable by other users")
+                return False
+            info = read_service_file(profile)
+            with open(os.path.join(profile, SERVICE_FILE), 'w', encoding='utf-8') as f:
+                json.dump(dict(info, token='guess'), f)
+            try:
+                call(profile, 'find', {})
+                print("✗ A call without the token was answered")
+                return False
+            except ServiceUnavailable:
+                pass
+            with open(os.path.join(profile, SERVICE_FILE), 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+            port = service.port
+        if os.path.exists(os.path.join(profile, SERVICE_FILE)):
+            print("✗ The service file was left behind")
+            return False
+
+        # A stale file naming a closed port fails fast
+        with open(os.path.join(profile, SERVICE_FILE), 'w', encoding='utf-8') as f:
+            json.dump(dict(info, port=port), f)
+        start = time.perf_counter()
+        try:
+            call(profile, 'find', {})
+            print("✗ A stale service file was answered")
+            return False
+        except ServiceUnavailable:
+            pass
+        if time.perf_counter() - start > 1.5:
+            print("✗ A stale service file delayed the call")
+            return False
+    print("✓ Calls reach the handler; failed calls raise ServiceCallFailed, "
+          "unknown clients and stale files ServiceUnavailable")
+    return True
+
+
+def test_service():
+    """Test a library scan through service.py against the same scan without it"""
+
+    searches = fixtures.load_searches()
+    faults = FaultConfig(latency=0.05)
+    with ReplayServer(faults) as server, tempfile.TemporaryDirectory() as tmp:
+        # Reference scan: no service running, every call in its own process
+        plain_env = environment(server, os.path.join(tmp, 'plain'))
+        plain = scan(plain_env, searches)
+        plain_details = details(plain_env, [url for _, _, url in plain])
+
+        profile = os.path.join(tmp, 'service')
+        env = environment(server, profile)
+        service = subprocess.Popen([sys.executable, os.path.join(ROOT, 'service.py')], cwd=ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 20
+            while not os.path.exists(os.path.join(profile, SERVICE_FILE)):
+                if time.monotonic() > deadline or service.poll() is not None:
+                    print("✗ service.py did not start")
+                    return False
+                time.sleep(0.05)
+
+            # Check 3: Forwarded calls list exactly what in-process calls list
+            server.stats.clear()
+            served = scan(env, searches)
+            if [items for _, items, _ in served] != [items for _, items, _ in plain]:
+                print("✗ Searches through the service differ from in-process searches")
+                return False
+            # Let the prefetched listings land before Kodi asks for them
+            time.sleep(0.5)
+            listings = server.stats.get('listing', 0)
+            served_details = details(env, [url for _, _, url in served])
+            if [items for _, items in served_details] != [items for _, items in plain_details]:
+                print("✗ Details through the service differ from in-process details")
+                return False
+            print(f"✓ {len(searches)} searches and their details match in-process calls")
+
+            # Check 4: Prefetched listings are answered from memory, over reused connections
+            if server.stats.get('listing', 0) != listings:
+                print(f"✗ getdetails fetched {server.stats.get('listing', 0) - listings} prefetched listing(s)")
+                return False
+            requests = server.stats.get('cse', 0) + listings
+            if server.stats.get('connections', 0) > requests / 2:
+                print(f"✗ {requests} requests used {server.stats.get('connections', 0)} connections")
+                return False
+            plain_time = sorted(seconds for seconds, _ in plain_details)[len(plain_details) // 2]
+            served_time = sorted(seconds for seconds, _ in served_details)[len(served_details) // 2]
+            print(f"✓ getdetails took {served_time * 1000:.1f}ms through the service "
+                  f"({plain_time * 1000:.1f}ms in-process); {requests} requests used "
+                  f"{server.stats.get('connections', 0)} connection(s)")
+        finally:
+            service.kill()
+            service.wait()
+
+        # Check 5: Without the service (its file left behind by a crash), calls run in-process again
+        start = time.perf_counter()
+        _, items = run_ifdb(env, '?' + urllib.parse.urlencode(
+            {'action': 'find', 'title': searches[0]['title'], 'year': searches[0]['year']}
+        ))
+        elapsed = time.perf_counter() - start
+        if items != plain[0][1] or elapsed > 5:
+            print(f"✗ The in-process fallback failed or took {elapsed:.1f}s")
+            return False
+        print("✓ Calls run in-process when the service is gone")
+
+        # Check 6: A call that fails in the service is reported, not run again in-process
+        def failing(action, params):
+            raise RuntimeError('broken')
+
+        failing_env = environment(server, os.path.join(tmp, 'failing'))
+        server.stats.clear()
+        with ScraperService(os.path.join(tmp, 'failing'), failing):
+            _, items = run_ifdb(failing_env, '?' + urllib.parse.urlencode(
+                {'action': 'find', 'title': searches[0]['title'], 'year': searches[0]['year']}
+            ))
+        if items or server.stats.get('cse', 0):
+            print(f"✗ A failed service call was run again in-process: {server.stats}")
+            return False
+        print("✓ A call that failed in the service is not run again in-process")
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Scraper Service Validation")
+    print("=" * 70)
+    print()
+
+    success = test_protocol() and test_service()
+
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Scraper service works as expected")
+    else:
+        print("✗ TEST FAILED: Scraper service needs corrections")
+    print("=" * 70)
+    print()
+
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the persistent search cache (resources/lib/cache.py)
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'stubs'))
+
+from resources.lib.cache import SearchCache
+
+# A Custom Search response without listings: only a forum thread matched
+NO_LISTINGS = json.dumps({
+    'items': [{'title': 'Retail Movie - Forum', 'link': 'https://fanedit.org/forum/thread-1/'}],
+    'searchInformation': {'totalResults': '1'},
+}).encode('utf-8')
+
+
+def test_search_cache():
+    """Test cache hits, query normalization, TTL expiry, LRU eviction and cached misses"""
+    
+    print("=" * 70)
+    print("IFDB Scraper - Search Cache Validation")
+    print("=" * 70)
+    print()
+    
+    results = [("Star Wars Despecialized", "https://fanedit.org/star-wars-despecialized/")]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'search_cache.db')
+        
+        # Check 1: Miss, then hit after storing
+        cache = SearchCache(path)
+        if cache.get("Star Wars 1977", "cx1") is not None:
+            print("✗ Empty cache returned a result")
+            return False
+        cache.put("Star Wars 1977", "cx1", results)
+        if cache.get("Star Wars 1977", "cx1") != results:
+            print("✗ Stored results were not returned")
+            return False
+        print("✓ Stored results are returned on a repeat search")
+        
+        # Check 2: Normalized queries share an entry, engine IDs do not
+        if cache.get("  star   WARS 1977 ", "cx1") != results:
+            print("✗ Query normalization did not match case/whitespace variants")
+            return False
+        if cache.get("Star Wars 1977", "cx2") is not None:
+            print("✗ Entries leaked across search engine IDs")
+            return False
+        print("✓ Cache key uses normalized query and search engine ID")
+        cache.close()
+        
+        # Check 3: Entries persist across processes (reopen the database)
+        cache = SearchCache(path)
+        if cache.get("Star Wars 1977", "cx1") != results:
+            print("✗ Entries did not persist after reopening the cache")
+            return False
+        print("✓ Entries persist on disk")
+        cache.close()
+        
+        # Check 4: Expired entries are treated as misses
+        cache = SearchCache(path, ttl=0)
+        time.sleep(0.01)
+        if cache.get("Star Wars 1977", "cx1") is not None:
+            print("✗ Expired entry was returned")
+            return False
+        print("✓ Expired entries are not returned")
+        cache.close()
+        
+        # Check 5: Least recently used entries are evicted past max_entries
+        cache = SearchCache(path, max_entries=2)
+        cache.put("first", "cx1", results)
+        time.sleep(0.01)
+        cache.put("second", "cx1", results)
+        time.sleep(0.01)
+        cache.get("first", "cx1")
+        time.sleep(0.01)
+        cache.put("third", "cx1", results)
+        if len(cache) != 2 or cache.get("second", "cx1") is not None:
+            print("✗ LRU eviction did not remove the least recently used entry")
+            return False
+        if cache.get("first", "cx1") is None or cache.get("third", "cx1") is None:
+            print("✗ LRU eviction removed a recently used entry")
+            return False
+        print("✓ Least recently used entries are evicted")
+        cache.close()
+        
+        # Check 6: Misses are cached separately, with a TTL doubling up to a limit
+        cache = SearchCache(path, negative_ttl=3600, negative_max_ttl=3 * 3600)
+        if cache.is_miss("Retail Movie 1999", "cx1"):
+            print("✗ Unknown query reported as a miss")
+            return False
+        ttls = [cache.put_miss("Retail Movie 1999", "cx1") for _ in range(4)]
+        if ttls != [3600, 7200, 3 * 3600, 3 * 3600]:
+            print(f"✗ Unexpected miss TTLs: {ttls}")
+            return False
+        if not cache.is_miss(" retail movie 1999", "cx1") or cache.is_miss("Retail Movie 1999", "cx2"):
+            print("✗ Cached miss not found by normalized query and engine ID")
+            return False
+        if cache.get("Retail Movie 1999", "cx1") is not None:
+            print("✗ A miss was returned as results")
+            return False
+        print("✓ Misses are cached with a growing TTL")
+        
+        # Check 7: Expired misses are searched again but keep their count
+        cache.negative_ttl = cache.negative_max_ttl = 0
+        cache.put_miss("Expired Query", "cx1")
+        time.sleep(0.01)
+        if cache.is_miss("Expired Query", "cx1"):
+            print("✗ Expired miss still reported")
+            return False
+        cache.negative_ttl, cache.negative_max_ttl = 3600, 3 * 3600
+        print("✓ Expired misses are searched again")
+        
+        # Check 8: Results replace a miss; misses can be listed and purged
+        cache.put_miss("Later Fanedit", "cx1")
+        cache.put("Later Fanedit", "cx1", results)
+        if cache.is_miss("Later Fanedit", "cx1"):
+            print("✗ Stored results did not clear the miss")
+            return False
+        listed = [(miss['query'], miss['misses']) for miss in cache.misses()]
+        if ('retail movie 1999', 4) not in listed or any(query == 'later fanedit' for query, _ in listed):
+            print(f"✗ Unexpected list of misses: {listed}")
+            return False
+        if cache.purge_misses("Retail Movie 1999") != 1 or cache.is_miss("Retail Movie 1999", "cx1"):
+            print("✗ Purging one miss failed")
+            return False
+        cache.purge_misses()
+        if cache.misses():
+            print("✗ Purging all misses failed")
+            return False
+        print("✓ Misses can be listed and purged")
+        cache.close()
+    
+    print()
+    return True
+
+
+def test_negative_search():
+    """Test that a find without listings is not sent to Google again"""
+    
+    import xbmcplugin
+    
+    requests = []
+    
+    def fake_urlopen(url, timeout=None):
+        requests.append(url)
+        return io.BytesIO(NO_LISTINGS)
+    
+    original = urllib.request.urlopen
+    urllib.request.urlopen = fake_urlopen
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps({
+                'api_key': 'key', 'search_engine_id': 'cx', 'prefetch_enabled': False
+            })
+            import ifdb
+            ifdb._addon = None
+            
+            # Check 9: The second find of a query without listings makes no API query
+            ifdb.search_movie('Retail Movie', '1999', 1)
+            first = len(requests)
+            del xbmcplugin.items[:]
+            ifdb.search_movie('Retail Movie', '1999', 1)
+            if len(requests) != first or xbmcplugin.items:
+                print(f"✗ A known miss was searched again ({len(requests) - first} queries)")
+                return False
+            print("✓ Searches without listings are answered from the cache")
+    finally:
+        urllib.request.urlopen = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    print()
+    return True
+
+
+def main():
+    """Main function"""
+    success = test_search_cache() and test_negative_search()
+    
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Search cache works as expected")
+    else:
+        print("✗ TEST FAILED: Search cache needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script to validate server-side filtered, paginated Custom Search queries
+(resources/lib/scraper.py); no network access.
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from unittest import mock
+
+from resources.lib import scraper
+
+
+def listing(n):
+    return (f"Fanedit {n}", f"https://fanedit.org/fanedit-{n}/")
+
+
+def test_search_pagination():
+    """Test query parameters, response parsing and concurrent pagination"""
+    
+    print("=" * 70)
+    print("IFDB Scraper - Search Pagination Validation")
+    print("=" * 70)
+    print()
+    
+    # Check 1: Queries are restricted to fanedit.org and trimmed to the fields we read
+    params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(
+        scraper.build_search_url('key', 'cx', 'star wars', start=11)).query))
+    expected = {'siteSearch': 'fanedit.org', 'siteSearchFilter': 'i', 'num': '10', 'start': '11',
+                'fields': 'items(title,link),searchInformation/totalResults'}
+    if any(params.get(name) != value for name, value in expected.items()):
+        print(f"✗ Unexpected query parameters: {params}")
+        return False
+    print("✓ Queries are filtered to fanedit.org server-side with a partial response")
+    
+    # Check 2: Non-listing pages are dropped from a response
+    body = json.dumps({
+        'searchInformation': {'totalResults': '4'},
+        'items': [
+            {'title': "Star Wars", 'link': "https://fanedit.org/star-wars-despecialized/"},
+            {'title': "Forum", 'link': "https://fanedit.org/forum/topic-1/"},
+            {'title': "Home", 'link': "https://fanedit.org/"},
+            {'title': "Elsewhere", 'link': "https://forums.fanedit.org/star-wars/"},
+        ],
+    }).encode('utf-8')
+    with mock.patch('urllib.request.urlopen', lambda url, timeout: io.BytesIO(body)):
+        results, total = scraper.fetch_search_page('https://example.invalid/')
+    if results != [("Star Wars", "https://fanedit.org/star-wars-despecialized/")] or total != 4:
+        print(f"✗ Unexpected parsed page: {results}, total {total}")
+        return False
+    print("✓ Only listing URLs are kept from a response")
+    
+    # Check 3: A thin first page triggers concurrent requests for the next pages
+    requested = []
+    active = [0, 0]
+    lock = threading.Lock()
+    
+    def fake_page(pages, total, delay=0.05, fail=()):
+        def fetch_page(api_url):
+            start = int(dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(api_url).query)).get('start', 1))
+            with lock:
+                requested.append(start)
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(delay)
+            with lock:
+                active[0] -= 1
+            if start in fail:
+                raise OSError("connection reset")
+            return list(pages.get(start, [])), total
+        return fetch_page
+    
+    pages = {1: [listing(1)], 11: [listing(2), listing(1)], 21: [listing(3)]}
+    results = scraper.search('key', 'cx', 'query', fetch_page=fake_page(pages, total=25))
+    if results != [listing(1), listing(2), listing(3)] or sorted(requested) != [1, 11, 21]:
+        print(f"✗ Unexpected paginated results {results} (pages {requested})")
+        return False
+    if active[1] < 2:
+        print("✗ Further pages were not requested concurrently")
+        return False
+    print("✓ Thin first pages are followed by concurrent page requests, merged in order")
+    
+    # Check 4: No further pages when the first suffices or there are no more matches
+    for pages, total in (({1: [listing(n) for n in range(5)]}, 100), ({1: [listing(1)]}, 1)):
+        requested.clear()
+        scraper.search('key', 'cx', 'query', fetch_page=fake_page(pages, total, delay=0))
+        if requested != [1]:
+            print(f"✗ Unneeded pages were requested: {requested}")
+            return False
+    print("✓ No further pages are requested when they cannot help")
+    
+    # Check 5: A failing further page only drops that page
+    requested.clear()
+    pages = {1: [listing(1)], 11: [listing(2)], 21: [listing(3)]}
+    results = scraper.search('key', 'cx', 'query', fetch_page=fake_page(pages, 30, delay=0, fail=(11,)))
+    if results != [listing(1), listing(3)]:
+        print(f"✗ Unexpected results with a failing page: {results}")
+        return False
+    print("✓ A failing further page does not fail the search")
+    
+    print()
+    return True
+
+
+def main():
+    """Main function"""
+    success = test_search_pagination()
+    
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Search pagination works as expected")
+    else:
+        print("✗ TEST FAILED: Search pagination needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
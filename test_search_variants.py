@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script to validate multi-variant searches and result ranking
+(resources/lib/ranking.py, scraper.search_variants())
+Runs ifdb.py with the stub xbmc modules in benchmarks/stubs; the Custom Search
+API is replaced by canned answers per query.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'stubs'))
+
+import xbmcplugin
+
+from resources.lib import scraper
+from resources.lib.ranking import query_variants, rank_hits, relevance
+
+HOBBIT = "https://fanedit.org/the-hobbit-the-tolkien-edit/"
+
+# Canned Custom Search answers: the wrong year hides the listing, the title alone finds it
+ANSWERS = {
+    'the hobbit the tolkien 2013': [("The Hobbit Extended Recut - Fanedit.org", "https://fanedit.org/hobbit-recut/")],
+    'the hobbit the tolkien': [
+        ("The Hobbit Extended Recut - Fanedit.org", "https://www.fanedit.org/hobbit-recut"),
+        ("The Hobbit: The Tolkien Edit (2012) - Fanedit.org", HOBBIT),
+    ],
+    'The Hobbit The Tolkien Edition': [("The Hobbit: The Tolkien Edit (2012) - Fanedit.org", HOBBIT + "?ref=cse")],
+}
+
+
+def test_ranking():
+    """Test query variants, relevance and merging"""
+    
+    # Check 1: Variants are the canonical query, without the year and the plain title
+    cases = [
+        (("The Hobbit The Tolkien Edition", "2013"),
+         ['the hobbit the tolkien 2013', 'the hobbit the tolkien', 'The Hobbit The Tolkien Edition']),
+        (("Star.Wars.Despecialized.Edition.1080p.BluRay.x264", ""),
+         ['star wars despecialized', 'Star Wars Despecialized Edition']),
+        (("Kill Bill The Whole Bloody Affair", ""), ['kill bill the whole bloody affair']),
+    ]
+    for (title, year), expected in cases:
+        if query_variants(title, year) != expected:
+            print(f"✗ query_variants({title!r}, {year!r}) = {query_variants(title, year)}")
+            return False
+    print("✓ Query variants drop the year and keep dropped words, without duplicates")
+    
+    # Check 2: Relevance rewards the title and the year, and ignores the site suffix
+    exact = relevance("The Hobbit: The Tolkien Edit (2012) - Fanedit.org", "The Hobbit The Tolkien Edit", "2012")
+    no_year = relevance("The Hobbit: The Tolkien Edit - Fanedit.org", "The Hobbit The Tolkien Edit", "2012")
+    wrong_year = relevance("The Hobbit: The Tolkien Edit (2015)", "The Hobbit The Tolkien Edit", "2012")
+    other = relevance("Star Wars Revisited - Fanedit.org", "The Hobbit The Tolkien Edit", "2012")
+    if not exact == 1.0 > no_year > wrong_year > other >= 0.0:
+        print(f"✗ Unexpected relevance: {exact}, {no_year}, {wrong_year}, {other}")
+        return False
+    print(f"✓ Relevance: {exact:.2f} exact, {no_year:.2f} without year, "
+          f"{wrong_year:.2f} other year, {other:.2f} other title")
+    
+    # Check 3: Hits are merged by listing, best first
+    ranked, _ = rank_hits(list(ANSWERS.values()), "The Hobbit The Tolkien Edition", "2013")
+    urls = [url for _, url in ranked]
+    if urls != [HOBBIT, "https://fanedit.org/hobbit-recut/"]:
+        print(f"✗ Unexpected ranking: {urls}")
+        return False
+    print("✓ Hits are deduplicated by listing and ranked by relevance")
+    return True
+
+
+def test_search_movie():
+    """Test that search_movie() sends the variants concurrently and lists the best match first"""
+    
+    queries = []
+    lock = threading.Lock()
+    
+    def fake_search(api_url, timeout=scraper.TIMEOUT):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(api_url).query)['q'][0]
+        with lock:
+            queries.append(query)
+        time.sleep(0.2)
+        results = ANSWERS.get(query, [])
+        return list(results), len(results)
+    
+    def find():
+        del xbmcplugin.items[:]
+        sys.argv = ['ifdb.py', '1', '?action=find&title=The+Hobbit+The+Tolkien+Edition&year=2013']
+        start = time.perf_counter()
+        ifdb.main()
+        return [(url, listitem) for url, listitem, _ in xbmcplugin.items], time.perf_counter() - start
+    
+    original = scraper.fetch_search_page
+    scraper.fetch_search_page = fake_search
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            import ifdb
+            
+            def configure(**settings):
+                settings.update(api_key='key', search_engine_id='cx', prefetch_enabled=False)
+                os.environ['IFDB_STUB_SETTINGS'] = json.dumps(settings)
+                ifdb._addon = None
+            
+            # Check 4: The variants run concurrently and the best match comes first
+            expected = f"{relevance(ANSWERS['the hobbit the tolkien'][1][0], 'The Hobbit The Tolkien Edition', '2013'):.2f}"
+            configure(search_variants=True)
+            items, elapsed = find()
+            if sorted(queries) != sorted(ANSWERS) or elapsed > 0.35:
+                print(f"✗ Queries {queries} took {elapsed:.2f}s")
+                return False
+            if not items or urllib.parse.unquote(items[0][0]) != f"?action=getdetails&url={HOBBIT}":
+                print(f"✗ The listing found by a variant is not first: {items}")
+                return False
+            if items[0][1].getProperty('relevance') != expected or len(items) != 2:
+                print(f"✗ Unexpected relevance or duplicates: {[item.getProperty('relevance') for _, item in items]}")
+                return False
+            print(f"✓ {len(queries)} variants took {elapsed:.2f}s; the listing they found is first")
+            
+            # Check 5: A repeat search is served from the cache, ranked and with relevance
+            queries.clear()
+            cached, _ = find()
+            if queries or [url for url, _ in cached] != [url for url, _ in items]:
+                print("✗ The merged results were not cached")
+                return False
+            if cached[0][1].getProperty('relevance') != expected:
+                print("✗ Cached results have no relevance")
+                return False
+            print("✓ Merged results are cached under the primary query")
+            
+            # Check 6: Variants are off by default, to spend one query per search
+            configure(search_cache_enabled=False)
+            queries.clear()
+            items, _ = find()
+            if queries != ['the hobbit the tolkien 2013'] or len(items) != 1:
+                print(f"✗ Variants were sent without being enabled: {queries}")
+                return False
+            print("✓ Variants are off by default")
+            
+            # Check 7: Results cached in API order are listed best match first
+            configure()
+            cache = ifdb.open_search_cache()
+            cache.put('the hobbit the tolkien 2013', 'cx', ANSWERS['the hobbit the tolkien'])
+            cache.close()
+            queries.clear()
+            items, _ = find()
+            if queries or not items or urllib.parse.unquote(items[0][0]) != f"?action=getdetails&url={HOBBIT}":
+                print(f"✗ Cached results were not ranked: {[url for url, _ in items]}")
+                return False
+            print("✓ Cached results are listed best match first")
+    finally:
+        scraper.fetch_search_page = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Search Variants Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_ranking() and test_search_movie()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Search variants work as expected")
+    else:
+        print("✗ TEST FAILED: Search variants need corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
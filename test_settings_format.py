@@ -7,7 +7,7 @@ import xml.etree.ElementTree as ET
 import sys
 
 # Valid setting types for Kodi add-ons
-VALID_SETTING_TYPES = ['string', 'text', 'boolean', 'number', 'slider', 'action', 'enum']
+VALID_SETTING_TYPES = ['string', 'text', 'boolean', 'integer', 'number', 'slider', 'action', 'enum']
 
 def test_settings_format(settings_file='resources/settings.xml'):
     """Test that settings.xml follows Kodi 21 format requirements"""
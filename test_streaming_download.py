@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the bounded streaming reader (resources/lib/download.py)
+"""
+
+import io
+import os
+import re
+import sys
+
+from resources.lib.download import read_text
+from resources.lib.extract import extract_fields, is_listing_complete
+
+LISTING = os.path.join('test_data', 'listings', 'star-wars-despecialized.html')
+
+
+class CountingResponse(io.BytesIO):
+    """In-memory response that counts the bytes handed out"""
+    
+    bytes_read = 0
+    
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_streaming_download():
+    """Test incremental decoding, early termination and the byte cap"""
+    
+    print("=" * 70)
+    print("IFDB Scraper - Streaming Download Validation")
+    print("=" * 70)
+    print()
+    
+    # Check 1: Multi-byte characters split across chunks decode correctly
+    text = "Amélie – Le Fabuleux Destin 🎬 " * 1000
+    result, truncated = read_text(io.BytesIO(text.encode('utf-8')), chunk_size=7)
+    if result != text or truncated:
+        print("✗ Text split across chunk boundaries was not decoded correctly")
+        return False
+    print("✓ Incremental decoding handles characters split across chunks")
+    
+    # Check 2: Reading stops once all fields are present
+    with open(LISTING, 'r', encoding='utf-8') as f:
+        html = f.read()
+    comment = '<div class="jrComment"><p>Great edit, watched it twice.</p></div>\n'
+    large_html = html.replace('</body>', comment * 20000 + '</body>')
+    response = CountingResponse(large_html.encode('utf-8'))
+    result, truncated = read_text(response, is_complete=is_listing_complete)
+    if not truncated or response.bytes_read >= len(large_html) // 10:
+        print(f"✗ Download did not stop early ({response.bytes_read} of {len(large_html)} bytes read)")
+        return False
+    if extract_fields(result) != extract_fields(large_html):
+        print("✗ Fields from the partial download differ from the full page")
+        return False
+    print(f"✓ Stopped after {response.bytes_read} of {len(large_html)} bytes with identical fields")
+    
+    # Check 3: Listings without an optional field stop at the end of their content
+    partial_html = large_html.replace('Tagline:', 'Slogan:')
+    response = CountingResponse(partial_html.encode('utf-8'))
+    result, truncated = read_text(response, is_complete=is_listing_complete)
+    if not truncated or response.bytes_read >= len(partial_html) // 10:
+        print(f"✗ Listing without a tagline was read to {response.bytes_read} of {len(partial_html)} bytes")
+        return False
+    if extract_fields(result) != extract_fields(partial_html) or 'tagline' in extract_fields(result):
+        print("✗ Fields from the partial download of a listing without a tagline differ")
+        return False
+    print(f"✓ Listing without a tagline stopped after {response.bytes_read} of {len(partial_html)} bytes")
+    
+    # Pages missing a required field or the end of the content are read to the end
+    for broken_html in (re.sub(r'<h1[^>]*>.*?</h1>', '', partial_html),
+                        partial_html.replace('jrReviewsContainer', 'jrComments')):
+        result, truncated = read_text(io.BytesIO(broken_html.encode('utf-8')), is_complete=is_listing_complete)
+        if result != broken_html or truncated:
+            print("✗ Page without a title or the end of its content was not read completely")
+            return False
+    print("✓ Pages without a title or the end of their content are read to the end")
+    
+    # Check 4: The byte cap stops runaway responses
+    response = CountingResponse(b'x' * 100000)
+    result, truncated = read_text(response, max_bytes=4096, chunk_size=1000)
+    if not truncated or len(result) != 4096 or response.bytes_read > 4097:
+        print("✗ Byte cap was not enforced")
+        return False
+    result, truncated = read_text(io.BytesIO(b'x' * 4096), max_bytes=4096)
+    if truncated:
+        print("✗ Body exactly at the byte cap was reported as truncated")
+        return False
+    print("✓ Byte cap is enforced")
+    
+    print()
+    return True
+
+
+def main():
+    """Main function"""
+    success = test_streaming_download()
+    
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Streaming download works as expected")
+    else:
+        print("✗ TEST FAILED: Streaming download needs corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
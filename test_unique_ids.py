@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test script to validate fanedit.org unique IDs and getdetails by listing ID
+Runs ifdb.py with the stub xbmc modules in benchmarks/stubs; the network is
+replaced by a fake urlopen() serving a saved listing page.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.stubs.fake_response import FakeResponse
+from resources.lib.nfo import build_movie_nfo
+from resources.lib.records import find_listing_url, listing_id, parse_listing, resolve_listing
+
+LISTING = os.path.join('test_data', 'listings', 'star-wars-despecialized.html')
+URL = 'https://fanedit.org/star-wars-despecialized/'
+
+
+def test_listing_ids():
+    """Test that listing IDs are extracted, resolved and written to .nfo files"""
+    
+    # Check 1: The ID is the slug of a listing URL
+    cases = [
+        (URL, 'star-wars-despecialized'),
+        ('https://www.fanedit.org/star-wars-despecialized?ref=1', 'star-wars-despecialized'),
+        ('https://fanedit.org/forum/thread/', None),
+        ('https://fanedit.org/a/b/', None),
+        ('file:///tmp/listing.html', None),
+    ]
+    for url, expected in cases:
+        if listing_id(url) != expected:
+            print(f"✗ listing_id({url!r}) = {listing_id(url)!r}, expected {expected!r}")
+            return False
+    print("✓ Listing IDs are taken from listing URLs")
+    
+    # Check 2: getdetails references resolve to URLs
+    cases = [
+        (URL, URL),
+        ('star-wars-despecialized', URL),
+        ('{"fanedit": "star-wars-despecialized", "imdb": "tt0076759"}', URL),
+        ('{"imdb": "tt0076759"}', None),
+        ('not a listing!', None),
+    ]
+    for reference, expected in cases:
+        if resolve_listing(reference) != expected:
+            print(f"✗ resolve_listing({reference!r}) = {resolve_listing(reference)!r}, expected {expected!r}")
+            return False
+    print("✓ URLs, listing IDs and unique ID objects resolve to listing URLs")
+    
+    # Check 3: .nfo files carry the ID, which NfoUrl finds again
+    with open(LISTING, 'r', encoding='utf-8') as f:
+        record = parse_listing(f.read())
+    nfo = build_movie_nfo(record, listing_id(URL))
+    if '<uniqueid type="fanedit" default="true">star-wars-despecialized</uniqueid>' not in nfo:
+        print("✗ .nfo has no default fanedit unique ID")
+        return False
+    if find_listing_url(nfo) != URL:
+        print("✗ NfoUrl does not find the listing of a written .nfo")
+        return False
+    print("✓ Written .nfo files carry the listing ID")
+    return True
+
+
+def test_getdetails_by_id():
+    """Test that getdetails sets the unique ID and accepts it in place of the URL"""
+    
+    import xbmcplugin
+    
+    with open(LISTING, 'rb') as f:
+        listing = f.read()
+    requests = []
+    
+    def fake_urlopen(req, timeout=None):
+        requests.append(req)
+        if req.get_header('If-none-match') == '"v1"':
+            raise urllib.error.HTTPError(req.full_url, 304, 'Not Modified', {}, io.BytesIO(b''))
+        return FakeResponse(listing, {'ETag': '"v1"'})
+    
+    def run(url):
+        del xbmcplugin.items[:]
+        sys.argv = ['ifdb.py', '1', f'?action=getdetails&url={urllib.parse.quote(url)}']
+        ifdb.main()
+        return xbmcplugin.items[0][1] if xbmcplugin.items else None
+    
+    original = urllib.request.urlopen
+    urllib.request.urlopen = fake_urlopen
+    try:
+        with tempfile.TemporaryDirectory() as profile:
+            os.environ['IFDB_STUB_PROFILE'] = profile
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps({'artwork_cache_enabled': False})
+            import ifdb
+            ifdb._addon = None
+            
+            # Check 4: Details by URL set the listing ID as the default unique ID
+            listitem = run(URL)
+            unique_ids = listitem.getVideoInfoTag().values.get('UniqueIDs') if listitem else None
+            if unique_ids != ({'fanedit': 'star-wars-despecialized'}, 'fanedit'):
+                print(f"✗ Unexpected unique IDs: {unique_ids}")
+                return False
+            print("✓ getdetails sets the listing ID as the default unique ID")
+            
+            # Check 5: Details by ID come from the cache without a request
+            listitem = run('star-wars-despecialized')
+            if listitem is None or len(requests) != 1:
+                print(f"✗ getdetails by ID made {len(requests) - 1} request(s)")
+                return False
+            if listitem.getVideoInfoTag().values.get('Title') != "Star Wars: Despecialized Edition":
+                print("✗ getdetails by ID returned the wrong listing")
+                return False
+            print("✓ getdetails by ID is served from the details cache")
+            
+            # Check 6: A stale entry costs one conditional request
+            os.environ['IFDB_STUB_SETTINGS'] = json.dumps({'artwork_cache_enabled': False, 'details_cache_ttl': 0})
+            ifdb._addon = None
+            listitem = run('{"fanedit": "star-wars-despecialized"}')
+            if listitem is None or len(requests) != 2 or requests[-1].full_url != URL:
+                print(f"✗ Stale refresh by ID made {len(requests) - 1} request(s)")
+                return False
+            if requests[-1].get_header('If-none-match') != '"v1"':
+                print("✗ Stale refresh by ID was not a conditional request")
+                return False
+            print("✓ A stale refresh by ID costs one conditional request")
+    finally:
+        urllib.request.urlopen = original
+        os.environ.pop('IFDB_STUB_PROFILE', None)
+        os.environ.pop('IFDB_STUB_SETTINGS', None)
+    return True
+
+
+def main():
+    """Main function"""
+    print("=" * 70)
+    print("IFDB Scraper - Unique ID Validation")
+    print("=" * 70)
+    print()
+    
+    success = test_listing_ids() and test_getdetails_by_id()
+    
+    print()
+    print("=" * 70)
+    if success:
+        print("✓ TEST PASSED: Unique IDs work as expected")
+    else:
+        print("✗ TEST FAILED: Unique IDs need corrections")
+    print("=" * 70)
+    print()
+    
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())